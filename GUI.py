@@ -1,14 +1,12 @@
 import pyvisa
-import time
-from datetime import date
 import numpy as np
-import pandas as pd
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QPushButton, QLabel,
     QComboBox, QTextEdit, QMessageBox
 )
 from PyQt5.QtCore import QThread, pyqtSignal
 import sys
+from protocol import ProtocolEngine
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 
@@ -22,6 +20,7 @@ class Worker(QThread):
         super().__init__()
         self.resource_name = resource_name
         self.running = True
+        self.engine = None
 
     def log(self, msg):
         self.log_signal.emit(msg)
@@ -32,62 +31,38 @@ class Worker(QThread):
             pwr = rm.open_resource(self.resource_name)
 
             current_values = [0.25 + 1.25 * i for i in range(33)]
-            voltage_limit = 1.95
-            activation_time = 1
-            interval_time = 20
-
-            self.log("Starting activation...")
-            pwr.write('output on')
-            pwr.write('CURR 1.0')
-            time.sleep(activation_time)
-
-            self.log("Set current to 0.01A and wait for stabilization.")
-            pwr.write('CURR 0.01')
-            input("Please press Enter in the console after voltage stabilizes...")
-            voltage_0 = float(pwr.query('MEASure:VOLTage?'))
-            self.log(f'{date.today()} {time.strftime("%H:%M:%S")} - 0A {voltage_0:.3f}V')
-            self.plot_signal.emit(0.0, voltage_0)
-
-            voltage_data = [voltage_0]
-            current_data = [0.0]
-
-            for curr in current_values:
-                if not self.running:
-                    self.log("⚠️ Measurement stopped by user.")
-                    break
-
-                measured_voltage = float(pwr.query('MEASure:VOLTage?'))
-                if measured_voltage >= voltage_limit:
-                    self.log("Voltage limit exceeded. Shutting down.")
-                    pwr.write('CURR 0')
-                    break
-
-                pwr.write(f'CURR {curr}')
-                time.sleep(interval_time)
-                measured_voltage = float(pwr.query('MEASure:VOLTage?'))
-                voltage_data.append(measured_voltage)
-                current_data.append(curr)
-
-                self.log(f'{date.today()} {time.strftime("%H:%M:%S")} - {curr}A {measured_voltage:.3f}V')
-                self.plot_signal.emit(curr, measured_voltage)
-
-            df = pd.DataFrame({'Current (A)': current_data, 'Voltage (V)': voltage_data})
-            try:
-                df.to_excel("output.xlsx", index=False)
-                self.log("Data saved to output.xlsx")
-            except PermissionError:
-                self.log("❌ Error saving Excel. Please close it and retry.")
-
-            pwr.write('CURR 0')
-            pwr.write('output off')
+            protocol = {
+                'name': 'Polarization',
+                'voltage_limit': 1.95,
+                'output': 'output.xlsx',
+                'stop_message': "⚠️ Measurement stopped by user.",
+                'steps': [
+                    {'type': 'output', 'state': 'on'},
+                    {'type': 'hold', 'current': 1.0, 'duration': 1, 'message': "Starting activation..."},
+                    {'type': 'wait_stable', 'current': 0.01,
+                     'message': "Set current to 0.01A and wait for stabilization."},
+                    {'type': 'measure', 'current': 0.0},
+                    {'type': 'sweep', 'currents': current_values, 'interval': 20},
+                ],
+            }
+            self.engine = ProtocolEngine(pwr, protocol, log=self.log, publish_point=self.plot_signal.emit,
+                                         request_confirmation=self.confirm_in_console)
+            self.engine.running = self.running
+            self.engine.run()
             pwr.close()
         except Exception as e:
             self.log(f"⚠️ Error: {e}")
         finally:
             self.finished_signal.emit()
-            
+
+    def confirm_in_console(self):
+        input("Please press Enter in the console after voltage stabilizes...")
+        self.engine.confirm()
+
     def stop(self):
         self.running = False
+        if self.engine is not None:
+            self.engine.stop()
 
 class LivePlotCanvas(FigureCanvas):
     def __init__(self):
@@ -0,0 +1,268 @@
+import atexit
+import multiprocessing
+import queue
+import signal
+import threading
+
+import numpy as np
+
+from instrument import configure_simulator, get_pool
+from protocol import ProtocolEngine
+from sample_buffer import SampleBuffer
+from shared_ring import SharedSampleRing
+
+# Acquisition in a process of its own, one per instrument. The GUI process
+# starts it the first time the instrument runs (acquisition_process()); it
+# then stays up, holding the instrument's pooled session open between runs
+# like the GUI's SessionPool would, and runs one protocol at a time. The
+# engine runs there, away from Matplotlib redraws, exports and the GUI's
+# share of the GIL.
+#
+#   samples   shared-memory ring per run (shared_ring.py), read by the GUI
+#   control   pipe to the process: ('run', protocol, output_folder,
+#             ring name, ring capacity, options), ('stop',), ('confirm',),
+#             ('voltage_limit', V), ('quit',)
+#   events    queue to the GUI: ('log', line), ('request_confirmation',),
+#             ('stabilized',), ('finished', RunStatus) at the end of each run
+#
+# Processes are spawned, not forked, so no Qt state is copied into them and
+# this module must stay free of Qt imports. They are not daemons: on exit the
+# GUI asks them to quit (shutdown_all), and SIGTERM stops a running protocol
+# the normal way, so the supply is always switched off before they end.
+
+CONTEXT = multiprocessing.get_context('spawn')
+
+
+class RunStatus:
+    # How a run in the acquisition process ended. Stands in for the engine's
+    # watchdog on the GUI side (see BaseWorker.watchdog).
+    def __init__(self, tripped=False, trip_voltage=None, error=None, samples=0):
+        self.tripped = tripped
+        self.trip_voltage = trip_voltage
+        self.error = error
+        self.samples = samples
+
+
+class MirroredSamples(SampleBuffer):
+    # The engine's own buffer, which also publishes each new sample to the
+    # ring. Bulk extend() (restoring a journal) is not mirrored; the GUI
+    # restores those samples itself.
+    def __init__(self, ring):
+        super().__init__()
+        self.ring = ring
+
+    def append(self, t, current, voltage, dwell=np.nan, flags=0, measured_current=np.nan):
+        super().append(t, current, voltage, dwell, flags, measured_current)
+        self.ring.append(t, current, voltage, dwell, flags, measured_current)
+
+
+class AcquisitionProcess:
+    # GUI-side handle of the process of one instrument
+    def __init__(self, resource_name, simulator=None):
+        self.resource_name = resource_name
+        self.control, child_control = CONTEXT.Pipe()
+        self.events = CONTEXT.Queue()
+        self.process = CONTEXT.Process(target=serve_instrument, name=f"acquisition {resource_name}",
+                                       args=(resource_name, child_control, self.events, simulator))
+        self.process.start()
+        child_control.close()
+
+    def is_alive(self):
+        return self.process.is_alive()
+
+    @property
+    def exitcode(self):
+        return self.process.exitcode
+
+    def send(self, *command):
+        try:
+            self.control.send(command)
+        except (OSError, ValueError):
+            pass  # the process has already ended
+
+    def start_run(self, protocol, output_folder, ring_capacity=None, **options):
+        # options: watchdog_rate, journal_path, resume
+        ring = SharedSampleRing() if ring_capacity is None else SharedSampleRing(capacity=ring_capacity)
+        self.send('run', protocol, output_folder, ring.name, ring.capacity, options)
+        return AcquisitionRun(self, ring)
+
+    def shutdown(self, timeout=None):
+        # Stops a running protocol, closes the session and waits for the
+        # process; terminate() is the last resort, and the process handles
+        # its SIGTERM by stopping the run as well
+        self.send('quit')
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout)
+        self.control.close()
+
+
+class AcquisitionRun:
+    # One run in an AcquisitionProcess, as seen by the worker relaying it
+    def __init__(self, process, ring):
+        self.process = process
+        self.ring = ring
+        self.events = process.events
+
+    def send(self, *command):
+        self.process.send(*command)
+
+    def close(self):
+        self.ring.close()
+
+
+_processes = {}
+_processes_lock = threading.Lock()
+
+
+def acquisition_process(resource_name, simulator=None):
+    # The process of resource_name, started on first use or after it died
+    with _processes_lock:
+        process = _processes.get(resource_name)
+        if process is None or not process.is_alive():
+            process = _processes[resource_name] = AcquisitionProcess(resource_name, simulator)
+        return process
+
+
+def stop_acquisition_process(resource_name, timeout=10.0):
+    # Frees the instrument, e.g. before this process opens it itself
+    with _processes_lock:
+        process = _processes.pop(resource_name, None)
+    if process is not None:
+        process.shutdown(timeout)
+
+
+def shutdown_all(timeout=10.0):
+    with _processes_lock:
+        processes = list(_processes.values())
+        _processes.clear()
+    for process in processes:
+        process.send('quit')
+    for process in processes:
+        process.shutdown(timeout)
+
+
+# Registered after multiprocessing's own exit handler, so it runs first and
+# the processes are told to quit before anything waits for them
+atexit.register(shutdown_all)
+
+
+class RunControl:
+    # Commands from the GUI, read by a thread of their own so a run can be
+    # stopped while the main thread is inside it. A stop or voltage limit
+    # that arrives before the engine exists is applied when it is attached.
+    def __init__(self, control):
+        self.control = control
+        self.runs = queue.Queue()
+        self.lock = threading.RLock()  # also taken by the SIGTERM handler
+        self.engine = None
+        self.stop_requested = False
+        self.voltage_limit = None
+        self.quitting = False
+
+    def listen(self):
+        while not self.quitting:
+            try:
+                command = self.control.recv()
+            except (EOFError, OSError):
+                # The GUI process is gone; nobody could stop the run any more
+                self.quit()
+                return
+            kind = command[0]
+            with self.lock:
+                if kind == 'run':
+                    self.stop_requested = False
+                    self.voltage_limit = None
+                    self.runs.put(command[1:])
+                elif kind == 'stop':
+                    self.stop_requested = True
+                    if self.engine is not None:
+                        self.engine.stop()
+                elif kind == 'confirm':
+                    if self.engine is not None:
+                        self.engine.confirm()
+                elif kind == 'voltage_limit':
+                    self.voltage_limit = command[1]
+                    if self.engine is not None:
+                        self.engine.set_voltage_limit(command[1])
+                elif kind == 'quit':
+                    self.quit()
+
+    def quit(self, *signal_args):
+        with self.lock:
+            self.quitting = True
+            self.stop_requested = True
+            if self.engine is not None:
+                self.engine.stop()
+
+    def attach(self, engine):
+        with self.lock:
+            self.engine = engine
+            if engine is None:
+                return
+            if self.stop_requested:
+                engine.stop()
+            if self.voltage_limit is not None:
+                engine.set_voltage_limit(self.voltage_limit)
+
+    def next_run(self):
+        # The next ('run', ...) arguments, None once the process should end
+        while not self.quitting:
+            try:
+                return self.runs.get(timeout=0.2)
+            except queue.Empty:
+                pass
+        return None
+
+
+def serve_instrument(resource_name, control, events, simulator=None):
+    # Entry point of the acquisition process
+    # Ctrl+C in the terminal is for the GUI, which then stops the runs
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    commands = RunControl(control)
+    signal.signal(signal.SIGTERM, commands.quit)
+    if simulator:
+        configure_simulator(**simulator)
+    threading.Thread(target=commands.listen, name="control", daemon=True).start()
+    pool = get_pool()
+    try:
+        while True:
+            run = commands.next_run()
+            if run is None:
+                break
+            run_acquisition(resource_name, pool, commands, events, *run)
+    finally:
+        pool.close_all()
+        events.close()
+        events.join_thread()
+
+
+def run_acquisition(resource_name, pool, commands, events, protocol, output_folder, ring_name, ring_capacity,
+                    options):
+    ring = SharedSampleRing(ring_name, ring_capacity)
+    owner = RunStatus()  # any object unique to this run will do
+    status = RunStatus()
+    try:
+        pwr = pool.acquire(resource_name, owner)
+        try:
+            engine = ProtocolEngine(pwr, protocol, output_folder, lambda message: events.put(('log', message)),
+                                    request_confirmation=lambda: events.put(('request_confirmation',)),
+                                    on_stabilized=lambda: events.put(('stabilized',)),
+                                    watchdog_rate=options.get('watchdog_rate', 10.0), samples=MirroredSamples(ring),
+                                    journal_path=options.get('journal_path'), resume=options.get('resume'),
+                                    resource_name=resource_name)
+            commands.attach(engine)
+            engine.run()
+            engine.wait_for_exports()
+            status = RunStatus(engine.watchdog.tripped, engine.watchdog.trip_voltage,
+                               None if engine.error is None else str(engine.error), len(engine.samples))
+        finally:
+            commands.attach(None)
+            pool.release(resource_name, owner)
+    except Exception as e:
+        events.put(('log', f"Error: {e}"))
+        status.error = str(e)
+    finally:
+        ring.close()
+        events.put(('finished', status))
@@ -0,0 +1,59 @@
+class AdaptiveCurrentGrid:
+    # Chooses the next current of a rising polarization sweep from the points
+    # measured so far. The step is sized like an ODE step-size controller:
+    # the last three points give a curvature estimate, and the step shrinks
+    # where the curve bends (activation knee, mass-transport tail) and grows
+    # where it is straight (ohmic region). Points are only ever added in
+    # increasing current, since stepping back down would disturb the cell.
+    def __init__(self, start=0.0, stop=40.0, initial_step=0.05, min_step=0.05, max_step=2.5, tolerance=0.005):
+        self.start = start
+        self.stop = stop
+        self.initial_step = initial_step
+        self.min_step = min_step
+        self.max_step = max_step
+        self.tolerance = tolerance  # V, allowed deviation from a straight line
+        self.currents = []
+        self.voltages = []
+        self._step = initial_step
+
+    def __iter__(self):
+        # Yields currents until the sweep is done; the caller must add() the
+        # measured voltage before asking for the next one
+        while True:
+            current = self.next_current()
+            if current is None:
+                return
+            yield current
+
+    def add(self, current, voltage):
+        self.currents.append(current)
+        self.voltages.append(voltage)
+
+    def deviation(self):
+        # Distance of the middle of the last three points from the straight
+        # line through its neighbours: the error of linear interpolation.
+        if len(self.currents) < 3:
+            return None
+        (i0, i1, i2), (v0, v1, v2) = self.currents[-3:], self.voltages[-3:]
+        if i2 == i0:
+            return None
+        return abs(v1 - (v0 + (v2 - v0) * (i1 - i0) / (i2 - i0)))
+
+    def next_current(self):
+        # Returns the next current to measure, or None when the sweep is done
+        if not self.currents:
+            return self.start
+        last = self.currents[-1]
+        if last >= self.stop:
+            return None
+        if len(self.currents) < 3:
+            # Start fine so the activation region is resolved from the outset
+            step = self.initial_step
+        else:
+            error = self.deviation()
+            # Interpolation error grows with the square of the step
+            scale = 2.0 if error == 0 else min(2.0, max(0.25, 0.9 * (self.tolerance / error) ** 0.5))
+            step = self._step * scale
+        step = min(self.max_step, max(self.min_step, step))
+        self._step = step
+        return round(min(self.stop, last + step), 6)
@@ -0,0 +1,116 @@
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from PyQt5.QtCore import QCoreApplication, QTimer
+
+from instrument import SIMULATED_RESOURCE, configure_simulator
+from worker.activation_worker import ActivationWorker
+from worker.measurement_worker import MeasurementWorker
+from worker.stability_worker import StabilityWorker
+
+
+def run_worker(app, worker, max_points=None, timeout=600.0):
+    # Runs one worker against the simulated supply and records the arrival
+    # time of every batch of plotted points on the GUI side.
+    arrivals = []
+    points = [0]
+
+    def on_points(xs, ys):
+        arrivals.append(time.perf_counter())
+        points[0] += len(xs)
+        if max_points is not None and points[0] >= max_points:
+            worker.stop()
+
+    def confirm_stable():
+        worker.confirm_stabilization()
+
+    worker.plot_signal.connect(on_points)
+    worker.finished_signal.connect(app.quit)
+    if hasattr(worker, 'request_user_input'):
+        worker.request_user_input.connect(confirm_stable)
+    QTimer.singleShot(int(timeout * 1000), worker.stop)
+    start = time.perf_counter()
+    worker.start()
+    app.exec_()
+    worker.wait()
+    elapsed = time.perf_counter() - start
+    gaps = [b - a for a, b in zip(arrivals, arrivals[1:])]
+    return {
+        'points': points[0],
+        'frames': len(arrivals),
+        'elapsed_s': elapsed,
+        'points_per_s': points[0] / elapsed if elapsed > 0 else 0.0,
+        'gap_mean_ms': statistics.mean(gaps) * 1000 if gaps else 0.0,
+        'gap_max_ms': max(gaps) * 1000 if gaps else 0.0,
+    }
+
+
+def measure_startup(timeout=120.0):
+    # Starts the GUI in a fresh interpreter (offscreen unless a platform is
+    # set) and returns the startup milestones it reports, in s
+    env = dict(os.environ)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    main_py = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    result = subprocess.run([sys.executable, main_py, '--startup-check'], capture_output=True, text=True,
+                            timeout=timeout, env=env)
+    for line in result.stdout.splitlines():
+        if line.startswith("Startup:"):
+            return {name.strip(): float(ms) / 1000 for name, ms in re.findall(r"([a-z ]+?) (\d+) ms", line[len("Startup:"):])}
+    raise RuntimeError(f"main.py did not report its startup time:\n{result.stderr}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the acquisition pipeline against the simulated supply.")
+    parser.add_argument('--latency', type=float, default=0.005, help="Simulated SCPI latency per command (s)")
+    parser.add_argument('--noise', type=float, default=0.001, help="Simulated voltage noise (V)")
+    parser.add_argument('--points', type=int, default=200, help="Points to collect in the stability benchmark")
+    parser.add_argument('--output', help="Append the results to this file")
+    parser.add_argument('--skip-startup', action='store_true', help="Do not measure the GUI startup time")
+    args = parser.parse_args(argv)
+
+    configure_simulator(latency=args.latency, noise=args.noise, time_constant=0.0, seed=0)
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+    output_folder = tempfile.mkdtemp(prefix="aemwe_bench_")
+    if args.output:
+        args.output = os.path.abspath(args.output)
+    # MeasurementWorker saves to the working directory
+    os.chdir(output_folder)
+
+    results = {}
+    results['measurement'] = run_worker(app, MeasurementWorker(
+        SIMULATED_RESOURCE, activation_time=0, voltage_limit=1.95, interval_time=0,
+        current_start=0.0, current_step=0.25))
+    results['activation'] = run_worker(app, ActivationWorker(
+        SIMULATED_RESOURCE, activation_time=0, voltage_limit=1.95, num_cycles=1,
+        interval_time=0, output_folder=output_folder))
+    results['stability'] = run_worker(app, StabilityWorker(
+        SIMULATED_RESOURCE, interval_time=0, input_current=1.0, voltage_limit=1.95,
+        output_folder=output_folder), max_points=args.points)
+
+    lines = [f"latency={args.latency}s noise={args.noise}V"]
+    for name, result in results.items():
+        lines.append(
+            f"{name:12s} points={result['points']:5d} frames={result['frames']:5d} elapsed={result['elapsed_s']:8.3f}s "
+            f"rate={result['points_per_s']:9.1f}/s gap_mean={result['gap_mean_ms']:7.2f}ms "
+            f"gap_max={result['gap_max_ms']:7.2f}ms")
+    if not args.skip_startup:
+        startup = measure_startup()
+        lines.append("startup      " + " ".join(f"{name.replace(' ', '_')}={seconds * 1000:.0f}ms"
+                                              for name, seconds in startup.items()))
+        results['startup'] = startup
+    report = "\n".join(lines)
+    print(report)
+    if args.output:
+        with open(args.output, 'a') as f:
+            f.write(report + "\n")
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+import numpy as np
+
+from sample_buffer import SegmentStore
+
+# Per-point bursts: instead of one reading after the dwell, a point takes
+# 'samples' readings (or as many as fit in 'window' s) 'period' s apart and
+# records a robust estimate of them. The summary of every burst and its raw
+# readings are kept for export.
+ESTIMATORS = ('mean', 'median', 'trimmed_mean', 'clipped_mean')
+SUMMARY_FIELDS = ('n', 'mean', 'median', 'std', 'trimmed_mean', 'clipped_mean', 'outliers')
+RAW_COLUMNS = (
+    ('time', np.float64),  # s since the first reading of the burst
+    ('voltage', np.float64),
+    ('outlier', np.bool_),
+)
+
+
+def validate_burst(burst):
+    if burst is None:
+        return
+    if burst.get('estimator', 'trimmed_mean') not in ESTIMATORS:
+        raise ValueError(f"Unknown burst estimator '{burst['estimator']}', use one of {', '.join(ESTIMATORS)}")
+    if not 0 <= burst.get('trim', 0.1) < 0.5:
+        raise ValueError("burst trim must be at least 0 and below 0.5")
+
+
+def robust_summary(readings, trim=0.1, outlier_k=3.5):
+    # Statistics of one burst and a boolean outlier mask. Outliers have a
+    # modified z-score 0.6745 |x - median| / MAD above outlier_k (Iglewicz &
+    # Hoaglin); if more than half the readings are equal (MAD 0), none are.
+    # trimmed_mean drops the lowest and highest trim fraction, clipped_mean
+    # the outliers.
+    x = np.asarray(readings, dtype=float)
+    n = len(x)
+    median = float(np.median(x))
+    deviation = np.abs(x - median)
+    mad = float(np.median(deviation))
+    if mad > 0:
+        outliers = 0.6745 * deviation / mad > outlier_k
+    else:
+        outliers = np.zeros(n, dtype=bool)
+    cut = int(n * trim)
+    ordered = np.sort(x)
+    summary = {
+        'n': n,
+        'mean': float(x.mean()),
+        'median': median,
+        'std': float(x.std(ddof=1)) if n > 1 else 0.0,
+        'trimmed_mean': float(ordered[cut:n - cut].mean()),
+        'clipped_mean': float(x[~outliers].mean()),
+        'outliers': int(outliers.sum()),
+    }
+    return summary, outliers
+
+
+class BurstRecorder:
+    # Summaries and raw readings of the bursts of a run, keyed by the index
+    # of the sample (SampleBuffer row) each burst produced
+    def __init__(self):
+        self.summary = {name: [] for name in ('sample', 'current', 'value') + SUMMARY_FIELDS}
+        self.raw = SegmentStore(RAW_COLUMNS)
+
+    def __len__(self):
+        return len(self.raw)
+
+    def add(self, sample, current, value, times, readings, summary, outliers):
+        for name, item in (('sample', sample), ('current', current), ('value', value)):
+            self.summary[name].append(item)
+        for name in SUMMARY_FIELDS:
+            self.summary[name].append(summary[name])
+        self.raw.add(sample, time=times, voltage=readings, outlier=outliers)
+
+    def summary_columns(self):
+        s = self.summary
+        return {
+            'Sample': s['sample'], 'Current (A)': s['current'], 'Voltage (V)': s['value'], 'Readings': s['n'],
+            'Mean (V)': s['mean'], 'Median (V)': s['median'], 'Std (V)': s['std'],
+            'Trimmed Mean (V)': s['trimmed_mean'], 'Clipped Mean (V)': s['clipped_mean'],
+            'Outliers': s['outliers'],
+        }
+
+    def raw_columns(self):
+        raw = self.raw.columns('Sample')
+        return {'Sample': raw['Sample'], 'Time (s)': raw['time'], 'Voltage (V)': raw['voltage'],
+                'Outlier': raw['outlier']}
@@ -0,0 +1,196 @@
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+import time
+
+from instrument import SIMULATED_RESOURCE, configure_simulator, get_pool, list_devices
+from journal import JOURNAL_NAME, find_resumable
+from protocol import PROTOCOL_KEYS, STEP_KEYS, UNATTENDED_STABILIZATION, ProtocolEngine, validate_protocol
+
+# Headless runner: executes a protocol file (see recipes/) against one
+# instrument and streams the results to disk, without importing Qt or
+# Matplotlib. Ctrl+C stops the run cleanly (supply off, data saved); a
+# second Ctrl+C aborts.
+#
+#   python cli.py recipes/polarization.json --resource USB0::...::INSTR --output run1
+#   python cli.py recipes/stability.json --resource SIM::ELECTROLYZER::INSTR --set voltage_limit=1.9
+#   python cli.py recipes/activation.json --set steps.1.count=5 --set steps.1.steps.0.duration=30
+#   python cli.py --resume --output run1
+#
+# Every run is journaled to <output>/run.journal; --resume continues an
+# interrupted monitoring run from it. A new run in a folder with an
+# interrupted one needs --new; the old journal is then kept, not overwritten.
+
+
+class HeadlessRun:
+    owner_name = "command-line run"
+
+    def __init__(self, resource_name, protocol, output_folder, interactive, resume=None):
+        self.resource_name = resource_name
+        self.protocol = protocol
+        self.output_folder = output_folder
+        self.interactive = interactive
+        self.resume = resume
+        self.engine = None
+        self._listener = None
+        self._print_lock = threading.Lock()
+
+    def log(self, message):
+        # Also called from the background export thread
+        with self._print_lock:
+            print(message, flush=True)
+
+    def request_confirmation(self):
+        # Read Enter on a separate thread; the engine keeps sampling the
+        # voltage limit while it waits
+        if not self.interactive or (self._listener is not None and self._listener.is_alive()):
+            return
+        print("Press Enter to continue before the voltage has stabilized.", flush=True)
+        self._listener = threading.Thread(target=self._wait_for_enter, name="confirm", daemon=True)
+        self._listener.start()
+
+    def _wait_for_enter(self):
+        try:
+            sys.stdin.readline()
+        except (OSError, ValueError):
+            return
+        if self.engine is not None and self.engine.waiting_for_user:
+            self.engine.confirm()
+
+    def stop(self, signum=None, frame=None):
+        if self.engine is None or not self.engine.running:
+            raise KeyboardInterrupt
+        self.log("Stop requested, shutting down (press Ctrl+C again to abort)...")
+        self.engine.stop()
+
+    def run(self):
+        os.makedirs(self.output_folder, exist_ok=True)
+        pool = get_pool()
+        pwr = pool.acquire(self.resource_name, self)
+        try:
+            self.engine = ProtocolEngine(pwr, self.protocol, self.output_folder, self.log,
+                                         request_confirmation=self.request_confirmation,
+                                         journal_path=os.path.join(self.output_folder, JOURNAL_NAME),
+                                         resume=self.resume, resource_name=self.resource_name)
+            start = time.monotonic()
+            self.engine.run()
+            self.engine.wait_for_exports()
+            self.log(f"{self.protocol.get('name', 'Run')} finished after {time.monotonic() - start:.0f}s, "
+                     f"{len(self.engine.samples)} samples, results in {os.path.abspath(self.output_folder)}")
+            return 1 if self.engine.error is not None else 0
+        finally:
+            pool.release(self.resource_name, self)
+            pool.close_all()
+
+
+def load_protocol(path, overrides=()):
+    with open(path, encoding='utf-8') as f:
+        protocol = json.load(f)
+    for override in overrides:
+        apply_override(protocol, override)
+    validate_protocol(protocol)
+    return protocol
+
+
+def apply_override(protocol, override):
+    # KEY=VALUE, VALUE as JSON or else a string. KEY is a top-level key or a
+    # dotted path into the steps, e.g. steps.1.duration; a key the engine
+    # would not read is an error rather than silently ignored
+    path, sep, value = override.partition('=')
+    if not sep:
+        raise ValueError(f"Override '{override}' is not key=value")
+    try:
+        value = json.loads(value)
+    except json.JSONDecodeError:
+        pass
+    parts = path.split('.')
+    target, keys = protocol, PROTOCOL_KEYS
+    for depth, part in enumerate(parts):
+        where = '.'.join(parts[:depth]) or "the protocol"
+        if isinstance(target, list):
+            if not part.isdigit() or int(part) >= len(target):
+                raise ValueError(f"Override '{path}': {where} has no item {part}")
+            part = int(part)
+        elif not isinstance(target, dict):
+            raise ValueError(f"Override '{path}': {where} is not a list or an object")
+        elif keys is not None and part not in keys:
+            hint = " (step values are set by path, e.g. steps.1.duration)" if depth == 0 else ""
+            raise ValueError(f"Override '{path}': {where} does not use '{part}'{hint}")
+        if depth == len(parts) - 1:
+            target[part] = value
+            return
+        if part == 'steps':
+            child_keys = 'steps'
+        elif keys == 'steps':
+            child_keys = STEP_KEYS.get(target[part].get('type'), ())
+        else:
+            child_keys = None  # settings such as 'stabilization' or 'adaptive'
+        if isinstance(target, dict) and part not in target:
+            if child_keys is not None:
+                raise ValueError(f"Override '{path}': {where} has no '{part}'")
+            target[part] = {}
+        target, keys = target[part], child_keys
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a measurement protocol without the GUI.")
+    parser.add_argument("protocol", nargs='?', help="protocol JSON file, e.g. recipes/polarization.json")
+    parser.add_argument("--resource", help=f"VISA resource name (default {SIMULATED_RESOURCE})")
+    parser.add_argument("--output", default=".", help="output folder")
+    parser.add_argument("--set", action='append', default=[], metavar="KEY=VALUE",
+                        help="override a protocol value (JSON), e.g. voltage_limit=1.9 or steps.1.duration=30")
+    parser.add_argument("--no-input", action='store_true',
+                        help="never wait for Enter; operator confirmations time out automatically")
+    parser.add_argument("--resume", action='store_true',
+                        help="continue the interrupted run journaled in the output folder")
+    parser.add_argument("--new", action='store_true',
+                        help="start over even if the output folder holds an interrupted run "
+                             "(its journal is kept under another name)")
+    parser.add_argument("--list-devices", action='store_true', help="list VISA resources and exit")
+    parser.add_argument("--sim-latency", type=float, help="SCPI latency of the simulated supply (s)")
+    args = parser.parse_args(argv)
+
+    if args.list_devices:
+        print("\n".join(list_devices()))
+        return 0
+    if args.protocol is None and not args.resume:
+        parser.error("a protocol file is required")
+    if args.sim_latency is not None:
+        configure_simulator(latency=args.sim_latency)
+
+    resume = None
+    if args.resume:
+        resume = find_resumable(args.output)
+        if resume is None:
+            print(f"Error: no interrupted run to resume in {os.path.abspath(args.output)}", file=sys.stderr)
+            return 2
+        # The journal has the protocol as it ran, overrides included
+        protocol = resume.protocol
+        resource = args.resource or resume.resource_name
+    else:
+        if not args.new and find_resumable(args.output) is not None:
+            print(f"Error: {os.path.abspath(args.output)} holds an interrupted run; "
+                  f"pass --resume to continue it or --new to start over", file=sys.stderr)
+            return 2
+        try:
+            protocol = load_protocol(args.protocol, args.set)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 2
+        resource = args.resource or SIMULATED_RESOURCE
+
+    interactive = not args.no_input and sys.stdin.isatty()
+    if not interactive and protocol.get('stabilization') is None:
+        protocol['stabilization'] = dict(UNATTENDED_STABILIZATION)
+
+    run = HeadlessRun(resource, protocol, args.output, interactive, resume)
+    signal.signal(signal.SIGINT, run.stop)
+    print(f"Running {protocol.get('name', args.protocol)} on {resource}", flush=True)
+    return run.run()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
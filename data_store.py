@@ -0,0 +1,310 @@
+import csv
+import os
+import queue
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+
+class ChunkedCsvStore:
+    # Append-only CSV file. Rows are buffered in memory and each flush writes
+    # only the new rows and fsyncs the tail, so a save costs O(new points)
+    # no matter how long the run has been going.
+    def __init__(self, path, columns, mode='w'):
+        self.path = path
+        self.columns = list(columns)
+        self._pending = []
+        write_header = mode == 'w' or not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, mode, newline='')
+        self._writer = csv.writer(self._file)
+        if write_header:
+            self._writer.writerow(self.columns)
+            self._sync()
+
+    def append(self, row):
+        self._pending.append(row)
+
+    def pending_count(self):
+        return len(self._pending)
+
+    def flush(self):
+        if not self._pending:
+            return 0
+        count = len(self._pending)
+        self._writer.writerows(self._pending)
+        self._pending.clear()
+        self._sync()
+        return count
+
+    def discard_pending(self):
+        self._pending.clear()
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+
+def last_csv_row(path, tail_bytes=65536):
+    # Fields of the last complete line of a CSV file, None if there is none.
+    # A line torn by a crash mid-write is cut off the file first, so rows
+    # appended afterwards start on a line of their own.
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb+') as f:
+        size = f.seek(0, os.SEEK_END)
+        tail_start = max(0, size - tail_bytes)
+        f.seek(tail_start)
+        tail = f.read()
+        end = tail.rfind(b'\n') + 1
+        if end < len(tail):
+            f.truncate(tail_start + end)
+            tail = tail[:end]
+    lines = tail.decode('utf-8', errors='replace').splitlines()
+    if tail_start > 0:
+        lines = lines[1:]  # may start mid-line
+    if not lines:
+        return None
+    return next(csv.reader([lines[-1]]))
+
+
+def fallback_path(path):
+    # Sibling file with a timestamp, used when path cannot be written (e.g.
+    # it is open in Excel, which locks it on Windows)
+    base, ext = os.path.splitext(path)
+    return f"{base}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{ext}"
+
+
+def write_with_retry(write, path, retries=3, retry_delay=1.0):
+    # Calls write(path), retrying PermissionError/OSError, then falls back to
+    # a timestamped sibling and finally to the temp folder. Returns the path
+    # actually written; re-raises if every attempt failed.
+    candidates = [path] * (retries + 1) + [fallback_path(path),
+                                           os.path.join(tempfile.gettempdir(), os.path.basename(fallback_path(path)))]
+    error = None
+    for attempt, candidate in enumerate(candidates):
+        try:
+            write(candidate)
+            return candidate
+        except OSError as e:
+            error = e
+            if candidate == path and attempt < retries:
+                time.sleep(retry_delay)
+    raise error
+
+
+class AsyncCsvWriter:
+    # Appends rows to a CSV file from a dedicated writer thread. append()
+    # only puts the row on a queue, so a slow disk, an antivirus scan or a
+    # file locked by Excel never stalls the acquisition loop. Rows are
+    # written in batches every flush_interval seconds (or once max_batch rows
+    # are waiting) and fsynced. A failing write is retried; if the file stays
+    # unwritable the remaining rows go to a fallback file next to it.
+    def __init__(self, path, columns, mode='w', flush_interval=1.0, max_batch=500, retries=3, retry_delay=0.5,
+                 log=None):
+        self.requested_path = path
+        self.path = path
+        self.columns = list(columns)
+        self.mode = mode
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.log = log
+        self.rows_queued = 0
+        self.rows_written = 0
+        self.batches = 0
+        self.retry_count = 0
+        self.max_queue_depth = 0
+        self.max_write_time = 0.0
+        self.fallback_active = False
+        self.error = None
+        self._queue = queue.Queue()
+        self._store = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="csv-writer", daemon=True)
+        self._thread.start()
+
+    def append(self, row):
+        if self._closed:
+            raise ValueError("Writer is closed")
+        self._queue.put(row)
+        self.rows_queued += 1
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def close(self, timeout=None):
+        # Writes everything still queued; returns False if the thread did
+        # not finish within timeout
+        if not self._closed:
+            self._closed = True
+            self._queue.put(_CLOSE)
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def stats(self):
+        return {
+            'path': self.path,
+            'queue_depth': self.queue_depth(),
+            'max_queue_depth': self.max_queue_depth,
+            'rows_queued': self.rows_queued,
+            'rows_written': self.rows_written,
+            'batches': self.batches,
+            'retries': self.retry_count,
+            'max_write_time': self.max_write_time,
+            'fallback_active': self.fallback_active,
+        }
+
+    def summary(self):
+        text = (f"Writer: {self.rows_written} rows in {self.batches} batches, "
+                f"max queue depth {self.max_queue_depth}, slowest write {self.max_write_time * 1000:.0f} ms, "
+                f"{self.retry_count} retries")
+        if self.fallback_active:
+            text += f", data continued in {self.path}"
+        return text
+
+    def _run(self):
+        closing = False
+        while not closing:
+            # Block for the first row, then collect whatever arrives within
+            # flush_interval so each fsync covers a batch
+            row = self._queue.get()
+            if row is _CLOSE:
+                break
+            batch = [row]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch:
+                try:
+                    row = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if row is _CLOSE:
+                    closing = True
+                    break
+                batch.append(row)
+            self._write(batch)
+        if self._store is not None:
+            try:
+                self._store.close()
+            except OSError:
+                pass
+
+    def _write(self, batch):
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            try:
+                if self._store is None:
+                    self._store = ChunkedCsvStore(self.path, self.columns, self.mode)
+                for row in batch:
+                    self._store.append(row)
+                self._store.flush()
+                break
+            except OSError as e:
+                self.error = e
+                if self._store is not None:
+                    # Rows that did not make it are still in batch
+                    self._store.discard_pending()
+                attempt += 1
+                self.retry_count += 1
+                if attempt <= self.retries:
+                    time.sleep(self.retry_delay)
+                    continue
+                if not self._switch_to_fallback(e):
+                    return
+                attempt = 0
+        self.rows_written += len(batch)
+        self.batches += 1
+        self.max_write_time = max(self.max_write_time, time.monotonic() - start)
+
+    def _switch_to_fallback(self, error):
+        if self.fallback_active and os.path.dirname(self.path) == tempfile.gettempdir():
+            self._report(f"Error writing {self.path}: {error}. {self.rows_queued - self.rows_written} rows lost.")
+            return False
+        if self._store is not None:
+            self._store.discard_pending()
+            try:
+                self._store.close()
+            except OSError:
+                pass
+            self._store = None
+        if self.fallback_active:
+            new_path = os.path.join(tempfile.gettempdir(), os.path.basename(fallback_path(self.requested_path)))
+        else:
+            new_path = fallback_path(self.requested_path)
+        self._report(f"Could not write {self.path} ({error}). Continuing in {new_path}")
+        self.path = new_path
+        self.mode = 'w'
+        self.fallback_active = True
+        return True
+
+    def _report(self, message):
+        if self.log is not None:
+            self.log(message)
+
+
+_CLOSE = object()
+
+
+def export_to_excel(csv_path, xlsx_path):
+    import pandas as pd
+    df = pd.read_csv(csv_path)
+    df.to_excel(xlsx_path, index=False)
+    return xlsx_path
+
+
+def export_in_background(csv_path, xlsx_path, on_done=None):
+    # Converting a long run to .xlsx can take seconds, so it never runs on the
+    # acquisition path. If the file is open in Excel the export is retried and
+    # then written next to it. on_done(message) is called from the export
+    # thread.
+    def _export():
+        try:
+            written = write_with_retry(lambda path: export_to_excel(csv_path, path), xlsx_path)
+            message = f"Data exported to {written}"
+            if written != xlsx_path:
+                message += f" ({xlsx_path} could not be written)"
+        except Exception as e:
+            message = f"Error exporting Excel: {e}. Raw data is kept in {csv_path}"
+        if on_done is not None:
+            on_done(message)
+
+    thread = threading.Thread(target=_export, name="xlsx-export")
+    thread.start()
+    return thread
+
+
+def save_columns_in_background(columns, xlsx_path, on_done=None):
+    # Same as export_in_background for data held in memory, given as
+    # {column name: array}; the arrays must not change while saving. A .csv
+    # path is written as CSV, which suits long raw data better.
+    def _save():
+        def write(path):
+            import pandas as pd
+            if path.endswith('.csv'):
+                pd.DataFrame(columns).to_csv(path, index=False)
+            else:
+                pd.DataFrame(columns).to_excel(path, index=False)
+        try:
+            written = write_with_retry(write, xlsx_path)
+            message = f"Data saved to {written}"
+            if written != xlsx_path:
+                message += f" ({xlsx_path} could not be written)"
+        except Exception as e:
+            message = f"Error saving Excel: {e}"
+        if on_done is not None:
+            on_done(message)
+
+    thread = threading.Thread(target=_save, name="xlsx-save")
+    thread.start()
+    return thread
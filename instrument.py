@@ -0,0 +1,331 @@
+import json
+import math
+import os
+import random
+import threading
+import time
+
+SIMULATED_RESOURCE = "SIM::ELECTROLYZER::INSTR"
+NO_DEVICES = "No VISA devices found"
+
+# Last devices found by list_devices(), shown at startup until a new scan ends
+DEVICE_CACHE = "device_cache.json"
+
+# Default parameters of the simulated cell. Values are per cell (25 cm²), so
+# currents are in A like the real supply. Edit through configure_simulator().
+SIMULATOR_SETTINGS = {
+    'reversible_voltage': 1.23,  # V
+    'tafel_slope': 0.05,  # V, activation term b * asinh(I / 2 i0)
+    'exchange_current': 1e-3,  # A
+    'resistance': 0.008,  # Ohm
+    'limiting_current': 60.0,  # A
+    'mass_transport_coeff': 0.05,  # V, term -c * ln(1 - I / I_L)
+    'time_constant': 2.0,  # s, relaxation of the overpotential after a step
+    'noise': 0.001,  # V, standard deviation of each reading
+    'drift_per_hour': 0.0,  # V/h, linear degradation while the output is on
+    'latency': 0.005,  # s, added to every SCPI write/query
+    'seed': None,
+}
+
+
+def configure_simulator(**settings):
+    unknown = set(settings) - set(SIMULATOR_SETTINGS)
+    if unknown:
+        raise ValueError(f"Unknown simulator settings: {', '.join(sorted(unknown))}")
+    SIMULATOR_SETTINGS.update(settings)
+
+
+def _scpi_matches(command, pattern):
+    # SCPI nodes accept either the short (upper case) or the long form,
+    # e.g. 'MEAS:VOLT?' and 'MEASure:VOLTage?' are the same query.
+    tokens = command.strip().lstrip(':').upper().split(':')
+    nodes = pattern.split(':')
+    if len(tokens) != len(nodes):
+        return False
+    for token, node in zip(tokens, nodes):
+        short = ''.join(c for c in node if not c.islower())
+        if token not in (short.upper(), node.upper()):
+            return False
+    return True
+
+
+class SimulatedSupply:
+    # Stand-in for a pyvisa resource driving an electrolyzer cell. It answers
+    # the subset of SCPI the workers use and models the polarization curve as
+    # reversible voltage + activation (Butler-Volmer) + ohmic + mass-transport
+    # terms, with a first-order transient, noise and drift.
+    def __init__(self, resource_name=SIMULATED_RESOURCE, **overrides):
+        settings = dict(SIMULATOR_SETTINGS)
+        settings.update(overrides)
+        self.resource_name = resource_name
+        self.settings = settings
+        self._random = random.Random(settings['seed'])
+        self._lock = threading.Lock()
+        self._output_on = False
+        self._current = 0.0
+        self._overpotential = 0.0
+        self._last_update = time.monotonic()
+        self._on_time = 0.0
+
+    def write(self, command):
+        self._delay()
+        with self._lock:
+            self._advance()
+            self._execute_message(command)
+        return len(command)
+
+    def query(self, command):
+        self._delay()
+        with self._lock:
+            self._advance()
+            return self._execute_message(command)
+
+    def close(self):
+        with self._lock:
+            self._output_on = False
+
+    def _delay(self):
+        latency = self.settings['latency']
+        if latency > 0:
+            time.sleep(latency)
+
+    def _execute_message(self, message):
+        # One message may hold several ';'-separated commands (each given
+        # from the root with ':'), answered together like a real supply does
+        # and for the cost of a single round trip
+        responses = [self._execute(command) for command in message.split(';') if command.strip()]
+        responses = [response.strip() for response in responses if response is not None]
+        return ";".join(responses) + "\n" if responses else None
+
+    def _execute(self, command):
+        command = command.strip()
+        name, _, argument = command.partition(' ')
+        argument = argument.strip()
+        if _scpi_matches(name, '*IDN?'):
+            return "SIMULATED,AEMWE-CELL,0,1.0\n"
+        if _scpi_matches(name, 'OUTPut') or _scpi_matches(name, 'OUTPut:STATe'):
+            self._output_on = argument.upper() in ('ON', '1')
+            return None
+        if _scpi_matches(name, 'OUTPut?') or _scpi_matches(name, 'OUTPut:STATe?'):
+            return f"{int(self._output_on)}\n"
+        if _scpi_matches(name, 'CURRent') or _scpi_matches(name, 'SOURce:CURRent'):
+            self._current = max(0.0, float(argument))
+            return None
+        if _scpi_matches(name, 'CURRent?'):
+            return f"{self._current:.4f}\n"
+        if _scpi_matches(name, 'MEASure:VOLTage?'):
+            return f"{self._read_voltage():.4f}\n"
+        if _scpi_matches(name, 'MEASure:CURRent?'):
+            return f"{self._effective_current():.4f}\n"
+        raise ValueError(f"Simulated supply does not understand '{command}'")
+
+    def _effective_current(self):
+        return self._current if self._output_on else 0.0
+
+    def _steady_overpotential(self, current):
+        s = self.settings
+        activation = s['tafel_slope'] * math.asinh(current / (2 * s['exchange_current']))
+        fraction = min(current / s['limiting_current'], 0.999)
+        mass_transport = -s['mass_transport_coeff'] * math.log(1 - fraction)
+        return activation + mass_transport
+
+    def _advance(self):
+        now = time.monotonic()
+        dt = now - self._last_update
+        self._last_update = now
+        if self._output_on:
+            self._on_time += dt
+        target = self._steady_overpotential(self._effective_current())
+        tau = self.settings['time_constant']
+        weight = 1.0 if tau <= 0 else 1.0 - math.exp(-dt / tau)
+        self._overpotential += (target - self._overpotential) * weight
+
+    def _read_voltage(self):
+        s = self.settings
+        voltage = s['reversible_voltage'] + self._overpotential
+        voltage += self._effective_current() * s['resistance']
+        voltage += s['drift_per_hour'] * self._on_time / 3600.0
+        voltage += self._random.gauss(0.0, s['noise'])
+        return voltage
+
+
+def is_simulated(resource_name):
+    return resource_name.upper().startswith('SIM::')
+
+
+def open_instrument(resource_name, resource_manager=None):
+    if is_simulated(resource_name):
+        return SimulatedSupply(resource_name)
+    if resource_manager is None:
+        import pyvisa
+        resource_manager = pyvisa.ResourceManager()
+    return resource_manager.open_resource(resource_name)
+
+
+class DeviceBusyError(RuntimeError):
+    pass
+
+
+class PooledSession:
+    # Proxy handed out by SessionPool. An I/O error triggers one reconnect
+    # and retry, which covers supplies that drop off the USB bus briefly.
+    def __init__(self, pool, resource_name, session):
+        self.pool = pool
+        self.resource_name = resource_name
+        self.session = session
+
+    def write(self, command):
+        return self._call('write', command)
+
+    def query(self, command):
+        return self._call('query', command)
+
+    def query_without_retry(self, command):
+        # For probes, where a timeout is an answer rather than a lost connection
+        return self.session.query(command)
+
+    def close(self):
+        # Sessions stay open in the pool; release the device instead
+        pass
+
+    def _call(self, method, command):
+        try:
+            return getattr(self.session, method)(command)
+        except Exception as e:
+            if not _is_connection_error(e):
+                raise
+            self.session = self.pool.reconnect(self.resource_name)
+            return getattr(self.session, method)(command)
+
+
+def _is_connection_error(error):
+    # pyvisa is an optional import here, so match its errors by name
+    return isinstance(error, OSError) or type(error).__name__ in ('VisaIOError', 'InvalidSession')
+
+
+class SessionPool:
+    # Process-wide cache of open instrument sessions. Opening a USB-TMC
+    # session is slow and repeated opens can hang some supplies, so sessions
+    # are opened once, health-checked when handed out and kept open between
+    # runs. Each device has a single owner at a time.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._resource_manager = None
+        self._sessions = {}
+        self._owners = {}
+
+    def resource_manager(self):
+        if self._resource_manager is None:
+            import pyvisa
+            self._resource_manager = pyvisa.ResourceManager()
+        return self._resource_manager
+
+    def list_resources(self):
+        return list(self.resource_manager().list_resources())
+
+    def acquire(self, resource_name, owner):
+        with self._lock:
+            current = self._owners.get(resource_name)
+            if current is not None and current is not owner:
+                raise DeviceBusyError(f"{resource_name} is in use by {_describe(current)}")
+            self._owners[resource_name] = owner
+        try:
+            session = self._sessions.get(resource_name)
+            if session is None or not self._healthy(session):
+                session = self.reconnect(resource_name)
+        except Exception:
+            self.release(resource_name, owner)
+            raise
+        return PooledSession(self, resource_name, session)
+
+    def reserve(self, resource_name, owner):
+        # Claims a device for an owner that opens it in another process; a
+        # session cached here is closed so the device is free to be opened
+        with self._lock:
+            current = self._owners.get(resource_name)
+            if current is not None and current is not owner:
+                raise DeviceBusyError(f"{resource_name} is in use by {_describe(current)}")
+            self._owners[resource_name] = owner
+            session = self._sessions.pop(resource_name, None)
+        if session is not None:
+            try:
+                session.close()
+            except Exception:
+                pass
+
+    def release(self, resource_name, owner):
+        with self._lock:
+            if self._owners.get(resource_name) is owner:
+                del self._owners[resource_name]
+
+    def owner(self, resource_name):
+        with self._lock:
+            return self._owners.get(resource_name)
+
+    def reconnect(self, resource_name):
+        old = self._sessions.pop(resource_name, None)
+        if old is not None:
+            try:
+                old.close()
+            except Exception:
+                pass
+        rm = None if is_simulated(resource_name) else self.resource_manager()
+        session = open_instrument(resource_name, rm)
+        self._sessions[resource_name] = session
+        return session
+
+    def close_all(self):
+        for name in list(self._sessions):
+            try:
+                self._sessions.pop(name).close()
+            except Exception:
+                pass
+
+    def _healthy(self, session):
+        try:
+            return bool(session.query('*IDN?').strip())
+        except Exception:
+            return False
+
+
+def _describe(owner):
+    return getattr(owner, 'owner_name', type(owner).__name__)
+
+
+_pool = None
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        _pool = SessionPool()
+    return _pool
+
+
+def list_devices():
+    try:
+        devices = get_pool().list_resources()
+    except Exception:
+        devices = []
+    if not devices:
+        devices.append(NO_DEVICES)
+    devices.append(SIMULATED_RESOURCE)
+    return devices
+
+
+def load_cached_devices(path=DEVICE_CACHE):
+    # The last known device list plus the simulator; never touches the bus
+    try:
+        with open(path, encoding='utf-8') as f:
+            devices = [str(name) for name in json.load(f)['devices']]
+    except (OSError, ValueError, KeyError, TypeError):
+        devices = []
+    return [name for name in devices if name != SIMULATED_RESOURCE] + [SIMULATED_RESOURCE]
+
+
+def save_cached_devices(devices, path=DEVICE_CACHE):
+    devices = [name for name in devices if name not in (NO_DEVICES, SIMULATED_RESOURCE)]
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'devices': devices, 'saved': time.time()}, f, indent=2)
+    os.replace(tmp_path, path)
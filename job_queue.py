@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+QUEUE_FILE = "job_queue.json"
+
+PENDING = "Pending"
+RUNNING = "Running"
+DONE = "Done"
+FAILED = "Failed"
+STOPPED = "Stopped"
+INTERRUPTED = "Interrupted"
+
+FINISHED_STATES = (DONE, FAILED, STOPPED, INTERRUPTED)
+
+
+class JobQueue:
+    # Ordered list of runs (activation, polarization, stability, ...), each
+    # bound to a device. Jobs for one device run strictly in order; different
+    # devices are independent. Every change is written to a JSON file so the
+    # queue survives a restart. A job that was running when the application
+    # went away is marked Interrupted rather than restarted, since half of an
+    # activation or stability run has already been applied to the cell.
+    def __init__(self, path=QUEUE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self.jobs = []
+        self._next_id = 1
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding='utf-8') as f:
+            state = json.load(f)
+        self.jobs = state.get('jobs', [])
+        self._next_id = state.get('next_id', len(self.jobs) + 1)
+        changed = False
+        for job in self.jobs:
+            if job['status'] == RUNNING:
+                job['status'] = INTERRUPTED
+                job['finished'] = job.get('finished') or _now()
+                changed = True
+        if changed:
+            self.save()
+
+    def save(self):
+        # Write to a temporary file and swap it in, so a crash mid-write
+        # never leaves a truncated queue behind
+        with self._lock:
+            state = {'next_id': self._next_id, 'jobs': self.jobs}
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+    def add(self, device, kind, params):
+        job = {
+            'id': self._next_id,
+            'device': device,
+            'kind': kind,
+            'params': dict(params),
+            'status': PENDING,
+            'created': _now(),
+            'started': None,
+            'finished': None,
+            'output_folder': None,
+        }
+        self._next_id += 1
+        self.jobs.append(job)
+        self.save()
+        return job
+
+    def get(self, job_id):
+        for job in self.jobs:
+            if job['id'] == job_id:
+                return job
+        return None
+
+    def remove(self, job_id):
+        job = self.get(job_id)
+        if job is None or job['status'] == RUNNING:
+            return False
+        self.jobs.remove(job)
+        self.save()
+        return True
+
+    def retry(self, job_id):
+        job = self.get(job_id)
+        if job is None or job['status'] not in FINISHED_STATES:
+            return False
+        job['status'] = PENDING
+        job['started'] = None
+        job['finished'] = None
+        self.save()
+        return True
+
+    def move(self, job_id, offset):
+        # Reorders a pending job among the jobs of the queue
+        job = self.get(job_id)
+        if job is None or job['status'] != PENDING:
+            return False
+        index = self.jobs.index(job)
+        target = index + offset
+        if target < 0 or target >= len(self.jobs):
+            return False
+        self.jobs[index], self.jobs[target] = self.jobs[target], self.jobs[index]
+        self.save()
+        return True
+
+    def clear_finished(self):
+        self.jobs = [job for job in self.jobs if job['status'] not in FINISHED_STATES]
+        self.save()
+
+    def devices(self):
+        return list(dict.fromkeys(job['device'] for job in self.jobs))
+
+    def running(self, device):
+        for job in self.jobs:
+            if job['device'] == device and job['status'] == RUNNING:
+                return job
+        return None
+
+    def next_pending(self, device):
+        # The next job for device, or None while one is still running
+        if self.running(device) is not None:
+            return None
+        for job in self.jobs:
+            if job['device'] == device and job['status'] == PENDING:
+                return job
+        return None
+
+    def mark_started(self, job, output_folder):
+        job['status'] = RUNNING
+        job['started'] = _now()
+        job['output_folder'] = output_folder
+        self.save()
+
+    def mark_finished(self, job, status):
+        job['status'] = status
+        job['finished'] = _now()
+        self.save()
+
+
+def _now():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
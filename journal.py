@@ -0,0 +1,162 @@
+import json
+import os
+import time
+
+import numpy as np
+
+JOURNAL_NAME = "run.journal"
+
+# Fields of a sample line, in order. measured_current came last, so lines
+# written without it still load (as NaN).
+SAMPLE_FIELDS = ('time', 'current', 'voltage', 'dwell', 'flags', 'wall', 'measured_current')
+
+
+class RunJournal:
+    # Write-ahead log of a run: one line per sample and one JSON line per
+    # state change (start, step, monitor start, trip, end). Every line is
+    # handed to the OS as soon as it is written, so an application crash
+    # loses nothing; fsync runs on every state change and at most every
+    # sync_interval seconds for samples, which bounds the loss on power
+    # failure. Samples are plain comma-separated numbers so a long journal
+    # can be read back in one vectorized parse.
+    def __init__(self, path, mode='w', sync_interval=1.0):
+        self.path = path
+        self.sync_interval = sync_interval
+        self._file = open(path, mode, encoding='utf-8')
+        self._last_sync = time.monotonic()
+
+    def event(self, kind, **fields):
+        record = {'event': kind, 'wall': time.time()}
+        record.update(fields)
+        self._file.write(json.dumps(record) + "\n")
+        self._sync()
+
+    def sample(self, t, current, voltage, dwell, flags, measured_current=np.nan):
+        dwell = 'nan' if dwell is None else repr(float(dwell))
+        self._file.write(f"{float(t)!r},{float(current)!r},{float(voltage)!r},{dwell},{int(flags)},{time.time():.3f},"
+                         f"{float(measured_current)!r}\n")
+        self._file.flush()
+        if time.monotonic() - self._last_sync >= self.sync_interval:
+            self._sync()
+
+    def close(self):
+        if not self._file.closed:
+            self._sync()
+            self._file.close()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._last_sync = time.monotonic()
+
+
+class JournalState:
+    # What load_journal() recovered: the protocol and device of the run,
+    # where it was interrupted and all samples up to that point
+    def __init__(self, path):
+        self.path = path
+        self.protocol = None
+        self.resource_name = None
+        self.output_folder = None
+        self.events = []
+        self.step_index = None
+        self.monitor_start = None  # s, run time at which the interrupted monitor step began
+        self.end = None  # the 'end' event, None if the run never finished
+        self.samples = {name: np.empty(0) for name in SAMPLE_FIELDS}
+
+    @property
+    def finished(self):
+        return self.end is not None
+
+    @property
+    def sample_count(self):
+        return len(self.samples['time'])
+
+    def last_time(self):
+        return float(self.samples['time'][-1]) if self.sample_count else 0.0
+
+    def last_wall(self):
+        if self.sample_count:
+            return float(self.samples['wall'][-1])
+        return self.events[-1]['wall'] if self.events else time.time()
+
+    def resumable(self):
+        # Only constant-current monitoring continues meaningfully after a
+        # break; a sweep or activation would have to start over
+        if self.finished or self.protocol is None or self.step_index is None:
+            return False
+        steps = self.protocol.get('steps', [])
+        return self.step_index < len(steps) and steps[self.step_index]['type'] == 'monitor'
+
+
+def load_journal(path):
+    state = JournalState(path)
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    lines = text.split("\n")
+    # A crash can leave a partial last line behind; it is dropped
+    lines = lines[:-1]
+    sample_lines = []
+    for line in lines:
+        if not line:
+            continue
+        if line.startswith('{'):
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            state.events.append(event)
+            _apply(state, event)
+        elif line.count(',') == len(SAMPLE_FIELDS) - 1:
+            sample_lines.append(line)
+        elif line.count(',') == len(SAMPLE_FIELDS) - 2:
+            sample_lines.append(line + ",nan")
+    if sample_lines:
+        values = np.fromstring(",".join(sample_lines), sep=',').reshape(-1, len(SAMPLE_FIELDS))
+        state.samples = {name: values[:, i].copy() for i, name in enumerate(SAMPLE_FIELDS)}
+    if state.protocol is None:
+        raise ValueError(f"{path} is not a run journal")
+    return state
+
+
+def _apply(state, event):
+    kind = event['event']
+    if kind == 'start':
+        state.protocol = event['protocol']
+        state.resource_name = event.get('resource')
+        state.output_folder = event.get('output_folder')
+    elif kind == 'step':
+        state.step_index = event['index']
+        state.monitor_start = None
+    elif kind == 'monitor_start':
+        state.monitor_start = event['t']
+    elif kind == 'end':
+        state.end = event
+    elif kind == 'resume':
+        state.end = None
+
+
+def find_resumable(output_folder):
+    # The journal in output_folder if its run can be resumed, else None
+    return resumable_journal(os.path.join(output_folder, JOURNAL_NAME))
+
+
+def resumable_journal(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        state = load_journal(path)
+    except (OSError, ValueError):
+        return None
+    return state if state.resumable() else None
+
+
+def keep_interrupted_journal(path):
+    # Before a new run reuses path: renames a journal that could still be
+    # resumed to <path>.<date-time> instead of letting it be overwritten.
+    # Returns the new name, or None if there was nothing to keep.
+    if resumable_journal(path) is None:
+        return None
+    kept = f"{path}.{time.strftime('%Y%m%d-%H%M%S')}"
+    os.replace(path, kept)
+    return kept
@@ -0,0 +1,190 @@
+import numpy as np
+
+
+class _Column:
+    # Growable float array with amortized doubling
+    def __init__(self, capacity=1024):
+        self.data = np.empty(capacity)
+        self.size = 0
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=float)
+        end = self.size + len(values)
+        if end > len(self.data):
+            grown = np.empty(max(end, 2 * len(self.data)))
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size:end] = values
+        self.size = end
+
+    def view(self, start=0, stop=None):
+        stop = self.size if stop is None else min(stop, self.size)
+        return self.data[start:stop]
+
+
+class _SourceColumn:
+    # Read-only column of a SampleBuffer. Its size only advances on
+    # MinMaxPyramid.sync(), so the pyramid sees a consistent snapshot while
+    # the acquisition thread keeps appending.
+    def __init__(self, buffer, name):
+        self.buffer = buffer
+        self.name = name
+        self.size = 0
+
+    def view(self, start=0, stop=None):
+        stop = self.size if stop is None else min(stop, self.size)
+        return self.buffer.view(self.name, start, stop)
+
+
+class _Level:
+    # One pyramid level: for every bucket the position and value of its
+    # minimum and maximum, so the envelope of the signal survives decimation
+    def __init__(self):
+        self.x_min = _Column()
+        self.y_min = _Column()
+        self.x_max = _Column()
+        self.y_max = _Column()
+
+    @property
+    def size(self):
+        return self.y_min.size
+
+
+class MinMaxPyramid:
+    # Multi-resolution min/max summary of a time series with increasing x.
+    # Level k holds one bucket per factor**k raw points and is maintained
+    # incrementally as points arrive, so drawing any x range at a bounded
+    # number of vertices never touches more than ~2 * budget values.
+    # With a SampleBuffer as source the raw points are not copied: the
+    # pyramid reads the buffer's columns and sync() aggregates new rows.
+    def __init__(self, factor=4, source=None, x='time', y='voltage'):
+        self.factor = factor
+        self.source = source
+        self._x_name = x
+        self._y_name = y
+        self._levels = []
+        self._x, self._y = self._raw_columns()
+
+    def _raw_columns(self):
+        if self.source is None:
+            return _Column(), _Column()
+        return _SourceColumn(self.source, self._x_name), _SourceColumn(self.source, self._y_name)
+
+    def __len__(self):
+        return self._x.size
+
+    @property
+    def x(self):
+        return self._x.view()
+
+    @property
+    def y(self):
+        return self._y.view()
+
+    def clear(self):
+        self._x, self._y = self._raw_columns()
+        self._levels = []
+
+    def append(self, x, y):
+        self.extend([x], [y])
+
+    def extend(self, xs, ys):
+        self._x.extend(xs)
+        self._y.extend(ys)
+        self._update_levels()
+
+    def sync(self):
+        # Takes in the rows the source buffer gained since the last call
+        size = len(self.source)
+        if size < self._x.size:
+            # The buffer was cleared for a new run
+            self.clear()
+        self._x.size = self._y.size = size
+        self._update_levels()
+
+    def _update_levels(self):
+        child_size = self._x.size
+        level_index = 0
+        while child_size // self.factor > 0:
+            if level_index == len(self._levels):
+                self._levels.append(_Level())
+            level = self._levels[level_index]
+            complete = child_size // self.factor
+            if complete > level.size:
+                self._aggregate(level_index, level.size, complete)
+            child_size = level.size
+            level_index += 1
+
+    def _child_arrays(self, level_index, start, stop):
+        if level_index == 0:
+            x = self._x.view(start, stop)
+            y = self._y.view(start, stop)
+            return x, y, x, y
+        child = self._levels[level_index - 1]
+        return (child.x_min.view(start, stop), child.y_min.view(start, stop),
+                child.x_max.view(start, stop), child.y_max.view(start, stop))
+
+    def _aggregate(self, level_index, first_bucket, stop_bucket):
+        f = self.factor
+        x_min, y_min, x_max, y_max = self._child_arrays(level_index, first_bucket * f, stop_bucket * f)
+        rows = np.arange(stop_bucket - first_bucket)
+        y_min = y_min.reshape(-1, f)
+        y_max = y_max.reshape(-1, f)
+        lo = y_min.argmin(axis=1)
+        hi = y_max.argmax(axis=1)
+        level = self._levels[level_index]
+        level.x_min.extend(x_min.reshape(-1, f)[rows, lo])
+        level.y_min.extend(y_min[rows, lo])
+        level.x_max.extend(x_max.reshape(-1, f)[rows, hi])
+        level.y_max.extend(y_max[rows, hi])
+
+    def query(self, x_start=None, x_stop=None, max_points=2000):
+        # Returns (x, y) covering [x_start, x_stop] with at most about
+        # max_points vertices, using the finest level that fits the budget.
+        n = self._x.size
+        if n == 0:
+            return np.empty(0), np.empty(0)
+        raw_x = self._x.view()
+        first = 0 if x_start is None else max(0, int(np.searchsorted(raw_x, x_start, side='left')) - 1)
+        last = n if x_stop is None else min(n, int(np.searchsorted(raw_x, x_stop, side='right')) + 1)
+        if last <= first:
+            return np.empty(0), np.empty(0)
+        level_index = 0
+        vertices = last - first
+        while vertices > max_points and level_index < len(self._levels):
+            level_index += 1
+            # each bucket contributes two vertices
+            vertices = 2 * (last - first) // self.factor ** level_index
+        x, y = self._collect(level_index, first, last)
+        if level_index > 0:
+            # keep the true end points so the extent of the run is exact
+            x = np.concatenate([raw_x[first:first + 1], x, raw_x[last - 1:last]])
+            y = np.concatenate([self._y.view(first, first + 1), y, self._y.view(last - 1, last)])
+        return x, y
+
+    def _collect(self, level_index, first, last):
+        # Whole buckets come from the chosen level; the partial bucket at
+        # each end is filled in from the next finer level.
+        if level_index == 0:
+            return self._x.view(first, last).copy(), self._y.view(first, last).copy()
+        bucket = self.factor ** level_index
+        level = self._levels[level_index - 1]
+        start_bucket = -(-first // bucket)
+        stop_bucket = min(last // bucket, level.size)
+        if stop_bucket <= start_bucket:
+            return self._collect(level_index - 1, first, last)
+        head = self._collect(level_index - 1, first, start_bucket * bucket)
+        tail = self._collect(level_index - 1, stop_bucket * bucket, last)
+        x_min = level.x_min.view(start_bucket, stop_bucket)
+        y_min = level.y_min.view(start_bucket, stop_bucket)
+        x_max = level.x_max.view(start_bucket, stop_bucket)
+        y_max = level.y_max.view(start_bucket, stop_bucket)
+        min_first = x_min <= x_max
+        body_x = np.empty(2 * len(x_min))
+        body_y = np.empty(2 * len(x_min))
+        body_x[0::2] = np.where(min_first, x_min, x_max)
+        body_y[0::2] = np.where(min_first, y_min, y_max)
+        body_x[1::2] = np.where(min_first, x_max, x_min)
+        body_y[1::2] = np.where(min_first, y_max, y_min)
+        return (np.concatenate([head[0], body_x, tail[0]]),
+                np.concatenate([head[1], body_y, tail[1]]))
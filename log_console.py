@@ -0,0 +1,175 @@
+import glob
+import logging
+import os
+import re
+from logging.handlers import RotatingFileHandler
+
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QPlainTextEdit, QLineEdit, QPushButton, QLabel, QDialog
+)
+
+LOG_FOLDER = "logs"
+
+
+class LogConsole(QWidget):
+    # Log view for long runs. Only the last max_lines lines are kept in the
+    # widget (QPlainTextEdit drops the oldest blocks itself), appends are
+    # collected and inserted once per refresh tick, and every line also goes
+    # to a rotating log file on disk, which search_history() reads back.
+    REFRESH_HZ = 20
+
+    def __init__(self, name, max_lines=5000, max_bytes=5 * 1024 * 1024, backup_count=5):
+        super().__init__()
+        self.name = name
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.log_path = None
+        self._pending = []
+        self._logger = logging.getLogger(f"console.{name}.{id(self)}")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self._handler = None
+
+        self.view = QPlainTextEdit()
+        self.view.setReadOnly(True)
+        self.view.setUndoRedoEnabled(False)
+        self.view.setMaximumBlockCount(max_lines)
+
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search log")
+        self.search_input.returnPressed.connect(self.find_next)
+        find_button = QPushButton("Find")
+        find_button.clicked.connect(self.find_next)
+        history_button = QPushButton("Search Full Log")
+        history_button.clicked.connect(self.show_history_matches)
+        search_layout = QHBoxLayout()
+        search_layout.addWidget(self.search_input, 1)
+        search_layout.addWidget(find_button)
+        search_layout.addWidget(history_button)
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addLayout(search_layout)
+        layout.addWidget(self.view)
+        self.setLayout(layout)
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(int(1000 / self.REFRESH_HZ))
+        self._timer.timeout.connect(self.flush)
+
+    def open_log(self, folder):
+        # Sends the history to <folder>/logs/<name>.log from now on
+        path = os.path.join(folder, LOG_FOLDER, f"{self.name}.log")
+        if path == self.log_path:
+            return
+        self.flush()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handler = RotatingFileHandler(path, maxBytes=self.max_bytes, backupCount=self.backup_count,
+                                      encoding='utf-8')
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        self._close_handler()
+        self._logger.addHandler(handler)
+        self._handler = handler
+        self.log_path = path
+
+    def append(self, text):
+        self._pending.append(text)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def append_lines(self, lines):
+        if lines:
+            self._pending.extend(lines)
+            if not self._timer.isActive():
+                self._timer.start()
+
+    def flush(self):
+        self._timer.stop()
+        if not self._pending:
+            return
+        lines, self._pending = self._pending, []
+        if self._handler is None:
+            self.open_log(".")
+        for line in lines:
+            self._logger.info(line)
+        # Follow the end only if the user has not scrolled up to read
+        scroll_bar = self.view.verticalScrollBar()
+        at_bottom = scroll_bar.value() >= scroll_bar.maximum() - 2
+        self.view.appendPlainText("\n".join(lines))
+        if at_bottom:
+            scroll_bar.setValue(scroll_bar.maximum())
+
+    def text(self):
+        self.flush()
+        return self.view.toPlainText()
+
+    def find_next(self):
+        # Searches the visible lines, wrapping around at the end
+        pattern = self.search_input.text()
+        if not pattern:
+            return
+        self.flush()
+        if not self.view.find(pattern):
+            cursor = self.view.textCursor()
+            cursor.movePosition(cursor.Start)
+            self.view.setTextCursor(cursor)
+            self.view.find(pattern)
+
+    def search_history(self, pattern, max_results=1000):
+        self.flush()
+        if self._handler is not None:
+            self._handler.flush()
+        return search_log(self.log_path, pattern, max_results) if self.log_path else []
+
+    def show_history_matches(self):
+        pattern = self.search_input.text()
+        if not pattern:
+            return
+        matches = self.search_history(pattern)
+        dialog = QDialog(self)
+        dialog.setWindowTitle(f"'{pattern}' in {self.log_path}")
+        results = QPlainTextEdit()
+        results.setReadOnly(True)
+        results.setPlainText("\n".join(matches))
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel(f"{len(matches)} matching lines" if matches else "No matching lines"))
+        layout.addWidget(results)
+        dialog.setLayout(layout)
+        dialog.resize(800, 500)
+        dialog.show()
+
+    def _close_handler(self):
+        if self._handler is not None:
+            self._logger.removeHandler(self._handler)
+            self._handler.close()
+            self._handler = None
+
+    def closeEvent(self, event):
+        self.flush()
+        self._close_handler()
+        super().closeEvent(event)
+
+
+def search_log(path, pattern, max_results=1000):
+    # Case-insensitive substring search over a log file and its rotated
+    # backups, oldest first; returns at most max_results matching lines
+    paths = sorted(glob.glob(glob.escape(path) + ".*"), key=_backup_number, reverse=True)
+    paths.append(path)
+    needle = re.compile(re.escape(pattern), re.IGNORECASE)
+    matches = []
+    for log_path in paths:
+        if not os.path.exists(log_path):
+            continue
+        with open(log_path, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                if needle.search(line):
+                    matches.append(line.rstrip("\n"))
+                    if len(matches) >= max_results:
+                        return matches
+    return matches
+
+
+def _backup_number(path):
+    suffix = path.rsplit('.', 1)[-1]
+    return int(suffix) if suffix.isdigit() else 0
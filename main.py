@@ -1,9 +1,29 @@
-from PyQt5.QtWidgets import QApplication
+import time
+STARTED = time.perf_counter()  # before the Qt and application imports
+
 import sys
-from main_window import MainWindow
 
-if __name__ == '__main__':
+
+def main():
+    # Imports stay in here: acquisition processes are spawned and re-import
+    # this module, and must not load Qt or the pages
+    from PyQt5.QtWidgets import QApplication
+    from main_window import MainWindow, format_startup_times
+
+    # --startup-check exits as soon as startup is complete (see benchmark.py)
+    startup_check = '--startup-check' in sys.argv
     app = QApplication(sys.argv)
-    window = MainWindow()
+    window = MainWindow(started=STARTED)
+
+    def report_startup(times):
+        print(f"Startup: {format_startup_times(times)}", flush=True)
+        if startup_check:
+            app.quit()
+
+    window.startup_complete.connect(report_startup)
     window.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    return app.exec_()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,25 +1,53 @@
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QStackedWidget
+from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QStackedWidget
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+import importlib
 import os
-from pages.measurement_page import MeasurementPage
-from pages.activation_page import ActivationPage
-from pages.stability_page import StabilityPage
+import time
+from instrument import NO_DEVICES, is_simulated, load_cached_devices
+from worker.discovery_worker import DeviceDiscoveryWorker
+
+# Navigation entries: button text, attribute, module and class of the page.
+# Pages are imported and built on first use, so Matplotlib and pandas load
+# after the window is already on screen.
+PAGES = [
+    ("Measurement", 'measurement_page', 'pages.measurement_page', 'MeasurementPage'),
+    ("Activation", 'activation_page', 'pages.activation_page', 'ActivationPage'),
+    ("Stability Test", 'stability_page', 'pages.stability_page', 'StabilityPage'),
+    ("Multi-Channel", 'multichannel_page', 'pages.multichannel_page', 'MultiChannelPage'),
+    ("Job Queue", 'queue_page', 'pages.queue_page', 'QueuePage'),
+]
+DEFAULT_PAGE = 'measurement_page'
+
+
+def format_startup_times(times):
+    return ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in times.items())
+
 
 class MainWindow(QWidget):
-    def __init__(self):
+    # Emitted once the default page is built and the first device scan has
+    # ended, with the time of each startup milestone (see main.py)
+    startup_complete = pyqtSignal(dict)
+
+    def __init__(self, started=None):
         super().__init__()
+        self.started = time.perf_counter() if started is None else started
+        self.startup_times = {}
+        self._mark_startup('imports')
         self.setWindowTitle("AEMWE Measurement Platform")
         self.setGeometry(100, 100, 900, 600)
 
         from PyQt5.QtWidgets import QLabel, QComboBox, QPushButton, QFileDialog
-        import pyvisa
         device_label = QLabel("Select VISA Device:")
         device_combo = QComboBox()
-        try:
-            device_combo.addItems(pyvisa.ResourceManager().list_resources())
-        except Exception as e:
-            device_combo.addItem("No VISA devices found")
+        # Last known devices until the background scan ends; the simulated
+        # supply is always listed so every page can run without hardware
+        device_combo.addItems(load_cached_devices())
         self.device_label = device_label
         self.device_combo = device_combo
+        self.refresh_devices_btn = QPushButton("Refresh Devices")
+        self.refresh_devices_btn.clicked.connect(self.refresh_devices)
+        self.device_status = QLabel()
+        self.discovery = None
 
 
         # User name input and display (replaces output folder selection)
@@ -36,33 +64,21 @@ class MainWindow(QWidget):
         self.username_display.setStyleSheet("color: #222; font-size: 15pt; font-weight: bold;")
 
         self.stack = QStackedWidget()
-        self.measurement_page = MeasurementPage()
-        self.activation_page = ActivationPage()
-        self.stability_page = StabilityPage()
-
-        self.stack.addWidget(self.measurement_page)
-        self.stack.addWidget(self.activation_page)
-        self.stack.addWidget(self.stability_page)
-
-        self.measurement_btn = QPushButton("Measurement")
-        self.measurement_btn.clicked.connect(lambda: self.stack.setCurrentWidget(self.measurement_page))
-
-        self.activation_btn = QPushButton("Activation")
-        self.activation_btn.clicked.connect(lambda: self.stack.setCurrentWidget(self.activation_page))
-
-        self.stability_btn = QPushButton("Stability Test")
-        self.stability_btn.clicked.connect(lambda: self.stack.setCurrentWidget(self.stability_page))
-
         nav_layout = QVBoxLayout()
-        nav_layout.addWidget(self.measurement_btn)
-        nav_layout.addWidget(self.activation_btn)
-        nav_layout.addWidget(self.stability_btn)
+        for text, name, _, _ in PAGES:
+            setattr(self, name, None)
+            button = QPushButton(text)
+            button.clicked.connect(lambda checked=False, name=name: self.show_page(name))
+            setattr(self, name.replace('_page', '_btn'), button)
+            nav_layout.addWidget(button)
         nav_layout.addStretch()
 
         # Top layout for device selection and user name
         top_layout = QHBoxLayout()
         top_layout.addWidget(self.device_label)
         top_layout.addWidget(self.device_combo)
+        top_layout.addWidget(self.refresh_devices_btn)
+        top_layout.addWidget(self.device_status)
         top_layout.addSpacing(30)
         top_layout.addWidget(self.username_input)
         top_layout.addWidget(self.username_btn)
@@ -77,6 +93,64 @@ class MainWindow(QWidget):
         content_layout.addWidget(self.stack)
         main_layout.addLayout(content_layout)
         self.setLayout(main_layout)
+
+        # Runs once the event loop has started, i.e. after show()
+        QTimer.singleShot(0, self._finish_startup)
+
+    def _finish_startup(self):
+        self._mark_startup('window')
+        self.refresh_devices()
+        self.show_page(DEFAULT_PAGE)
+        self._mark_startup('first page')
+        self._check_startup_complete()
+
+    def _mark_startup(self, milestone):
+        self.startup_times[milestone] = time.perf_counter() - self.started
+
+    def _check_startup_complete(self):
+        if 'first page' in self.startup_times and 'devices' in self.startup_times:
+            if 'complete' not in self.startup_times:
+                self.startup_times['complete'] = max(self.startup_times.values())
+                self.startup_complete.emit(dict(self.startup_times))
+
+    def page(self, name):
+        page = getattr(self, name)
+        if page is None:
+            module, class_name = next((m, c) for _, n, m, c in PAGES if n == name)
+            page = getattr(importlib.import_module(module), class_name)()
+            setattr(self, name, page)
+            self.stack.addWidget(page)
+        return page
+
+    def show_page(self, name):
+        self.stack.setCurrentWidget(self.page(name))
+
+    def refresh_devices(self):
+        if self.discovery is not None and self.discovery.isRunning():
+            return
+        self.refresh_devices_btn.setEnabled(False)
+        self.device_status.setText("Searching for devices...")
+        self.discovery = DeviceDiscoveryWorker()
+        self.discovery.devices_found.connect(self._on_devices_found)
+        self.discovery.start()
+
+    def _on_devices_found(self, devices):
+        current = self.device_combo.currentText()
+        self.device_combo.clear()
+        self.device_combo.addItems(devices)
+        if current in devices:
+            self.device_combo.setCurrentText(current)
+        found = sum(1 for name in devices if name != NO_DEVICES and not is_simulated(name))
+        self.device_status.setText(f"{found} device(s) found in {self.discovery.duration:.1f}s")
+        self.refresh_devices_btn.setEnabled(True)
+        # Pages with their own device list pick it up when shown; update the visible one now
+        page = self.stack.currentWidget()
+        if hasattr(page, 'refresh_devices'):
+            page.refresh_devices()
+        if 'devices' not in self.startup_times:
+            self._mark_startup('devices')
+            self._check_startup_complete()
+
     def set_username(self):
         name = self.username_input.text().strip()
         if name:
@@ -88,7 +162,27 @@ class MainWindow(QWidget):
             self.username_input.show()
             self.username_btn.show()
 
+    def closeEvent(self, event):
+        from instrument import get_pool
+        from acquisition_process import shutdown_all
+        from worker.worker import BaseWorker
+        if self.discovery is not None:
+            self.discovery.wait(2000)
+        # Runs still going are stopped the normal way, so every supply is
+        # switched off and the data saved before the processes go away
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            BaseWorker.stop_all()
+            shutdown_all()
+        finally:
+            QApplication.restoreOverrideCursor()
+        get_pool().close_all()
+        super().closeEvent(event)
+
     def get_selected_device(self):
         return self.device_combo.currentText()
 
+    def get_output_folder(self):
+        return os.path.abspath(".")
+
     # Output folder selection removed; user name is now used instead
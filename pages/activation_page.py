@@ -1,9 +1,11 @@
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QTextEdit, QPushButton, QLineEdit, QFormLayout, QMessageBox
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QLineEdit, QFormLayout, QMessageBox
 )
 from PyQt5.QtGui import QPixmap
 from PyQt5.QtCore import Qt
 import os
+from log_console import LogConsole
+from pages.sweep_form import SweepSettingsForm, StabilizationPrompt
 from worker.activation_worker import ActivationWorker
 
 class ActivationPage(QWidget):
@@ -17,12 +19,14 @@ class ActivationPage(QWidget):
         self.voltage_limit_input = QLineEdit("1.95")
         self.num_cycles_input = QLineEdit("30")
         self.interval_time_input = QLineEdit("60")
+        self.sweep_form = SweepSettingsForm()
 
         form_layout = QFormLayout()
         form_layout.addRow("Activation Time (s):", self.activation_time_input)
         form_layout.addRow("Voltage Limit (V):", self.voltage_limit_input)
         form_layout.addRow("Number of Cycles:", self.num_cycles_input)
         form_layout.addRow("Interval Time (s):", self.interval_time_input)
+        form_layout.addRow(self.sweep_form)
 
         # Horizontal layout: form on left, logo/author on right (copied from measurement page)
         form_and_logo_layout = QHBoxLayout()
@@ -76,20 +80,22 @@ class ActivationPage(QWidget):
 
         layout.addWidget(QLabel("Activation Mode"))
 
-        self.log_output = QTextEdit()
-        self.log_output.setReadOnly(True)
+        self.log_output = LogConsole("activation")
         layout.addWidget(self.log_output)
 
         self.setLayout(layout)
         self.worker = None
-        self.voltage_data = []
+        self.stabilization_prompt = StabilizationPrompt(self)
 
     def log(self, msg):
         self.log_output.append(msg)
 
-    def update_plot(self, x, y):
-        self.canvas.update_plot(x, y)
-        self.voltage_data.append([y])
+    def log_lines(self, lines):
+        self.log_output.append_lines(lines)
+
+    def update_plot(self, xs, ys):
+        # The points themselves are read from the worker's sample buffer
+        self.canvas.sync()
 
     def start_activation(self):
         main_window = self.window()
@@ -108,13 +114,13 @@ class ActivationPage(QWidget):
         num_cycles = int(self.num_cycles_input.text())
         interval_time = float(self.interval_time_input.text())
 
-        self.worker = ActivationWorker(selected_resource, activation_time, voltage_limit, num_cycles, interval_time, output_folder)
-        self.worker.log_signal.connect(self.log)
+        self.worker = ActivationWorker(selected_resource, activation_time, voltage_limit, num_cycles, interval_time, output_folder, **self.sweep_form.settings())
+        self.canvas.show_samples(self.worker.samples)
+        self.worker.log_signal.connect(self.log_lines)
         self.worker.finished_signal.connect(self.on_activation_finished)
-        self.worker.request_user_input.connect(self.prompt_user_to_continue)
-        # Connect plot signal if implemented in worker
-        if hasattr(self.worker, 'plot_signal'):
-            self.worker.plot_signal.connect(self.update_plot)
+        self.stabilization_prompt.connect(self.worker)
+        self.worker.plot_signal.connect(self.update_plot)
+        self.log_output.open_log(self.worker.output_folder)
         self.worker.start()
         self.start_button.setEnabled(False)
         self.stop_button.setEnabled(True)
@@ -125,12 +131,8 @@ class ActivationPage(QWidget):
             self.log("Stop requested. Waiting for shutdown...")
             self.stop_button.setEnabled(False)
 
-    def prompt_user_to_continue(self):
-        QMessageBox.information(self, "Stabilization", "Press OK when voltage stabilizes.")
-        if self.worker:
-            self.worker._wait_for_user = False
-
     def on_activation_finished(self):
+        self.stabilization_prompt.close()
         self.start_button.setEnabled(True)
         self.stop_button.setEnabled(False)
         self.log("Activation completed.")
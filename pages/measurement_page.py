@@ -1,9 +1,9 @@
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QPushButton, QLabel, QComboBox, QTextEdit, QMessageBox, QInputDialog, QLineEdit, QFormLayout, QFileDialog, QHBoxLayout
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QPushButton, QLabel, QComboBox, QMessageBox, QInputDialog, QLineEdit, QFormLayout, QFileDialog, QHBoxLayout
 from PyQt5.QtGui import QPixmap
 from PyQt5.QtCore import Qt
-import pyvisa
 import os
-import pandas as pd
+from log_console import LogConsole
+from pages.sweep_form import SweepSettingsForm, StabilizationPrompt
 from plot_canvas import LivePlotCanvas
 from worker.measurement_worker import MeasurementWorker
 
@@ -13,7 +13,7 @@ class MeasurementPage(QWidget):
         self.setWindowTitle("PyQt Power Supply Measurement")
         self.setGeometry(200, 200, 700, 600)
         self.worker = None
-        self.voltage_data = []
+        self.stabilization_prompt = StabilizationPrompt(self)
 
         layout = QVBoxLayout()
 
@@ -21,8 +21,12 @@ class MeasurementPage(QWidget):
         self.activation_time_input = QLineEdit("60")
         self.voltage_limit_input = QLineEdit("1.95")
         self.interval_time_input = QLineEdit("20")
+        self.current_start_input = QLineEdit("0.0")
+        self.current_step_input = QLineEdit("0.25")
+        self.sweep_form = SweepSettingsForm()
 
         self.current_list_input = QLineEdit("")
+        self.current_list_input.textChanged.connect(self.on_current_list_input_changed)
         self.import_current_btn = QPushButton("Import")
         self.import_current_btn.setToolTip("Import current list from CSV or text file")
         self.import_current_btn.clicked.connect(self.import_current_list)
@@ -48,6 +52,9 @@ class MeasurementPage(QWidget):
         form_layout.addRow("Activation Time (s):", self.activation_time_input)
         form_layout.addRow("Voltage Limit (V):", self.voltage_limit_input)
         form_layout.addRow("Interval Time (s):", self.interval_time_input)
+        form_layout.addRow("Current Start (A):", self.current_start_input)
+        form_layout.addRow("Current Step (A):", self.current_step_input)
+        form_layout.addRow(self.sweep_form)
         form_layout.addRow("Current List (comma/space separated or import):", current_list_hbox)
         form_layout.addRow("Current List (A):", self.current_list_scroll)
 
@@ -106,8 +113,7 @@ class MeasurementPage(QWidget):
         self.save_data_button.clicked.connect(self.save_data)
         layout.addWidget(self.save_data_button)
 
-        self.log_output = QTextEdit()
-        self.log_output.setReadOnly(True)
+        self.log_output = LogConsole("polarization")
         layout.addWidget(self.log_output)
 
         self.setLayout(layout)
@@ -195,18 +201,16 @@ class MeasurementPage(QWidget):
     def on_current_list_input_changed(self):
         self.update_current_list_display()
 
-        # Connect current list input changes to update display
-        self.current_list_input.textChanged.connect(self.on_current_list_input_changed)
-
     def export_plot(self):
         options = QFileDialog.Options()
         file_path, _ = QFileDialog.getSaveFileName(self, "Export Plot As", "plot.png", "PNG Files (*.png);;JPEG Files (*.jpg);;All Files (*)", options=options)
         if file_path:
-            self.canvas.fig.savefig(file_path)
+            self.canvas.save_figure(file_path)
             self.append_log(f"Plot exported to: {file_path}")
 
     def save_data(self):
-        if not self.voltage_data:
+        samples = self.worker.samples if self.worker else None
+        if samples is None or not len(samples):
             QMessageBox.warning(self, "No Data", "No voltage data to save.")
             return
 
@@ -214,7 +218,9 @@ class MeasurementPage(QWidget):
         file_path, _ = QFileDialog.getSaveFileName(self, "Save Voltage Data As", "voltage_data.xlsx", "Excel Files (*.xlsx);;CSV Files (*.csv);;All Files (*)", options=options)
 
         if file_path:
-            df = pd.DataFrame(self.voltage_data, columns=["Voltage (V)"])
+            import pandas as pd
+            df = pd.DataFrame({"Current (A)": samples.current, "Measured Current (A)": samples.measured_current,
+                               "Voltage (V)": samples.voltage})
             try:
                 if file_path.endswith(".csv"):
                     df.to_csv(file_path, index=False)
@@ -227,9 +233,12 @@ class MeasurementPage(QWidget):
     def append_log(self, text):
         self.log_output.append(text)
 
-    def update_plot(self, x, y):
-        self.canvas.update_plot(x, y)
-        self.voltage_data.append([y])
+    def append_logs(self, lines):
+        self.log_output.append_lines(lines)
+
+    def update_plot(self, xs, ys):
+        # The points themselves are read from the worker's sample buffer
+        self.canvas.sync()
 
     def start_measurement(self):
         main_window = self.window()
@@ -243,10 +252,6 @@ class MeasurementPage(QWidget):
 
         self.start_button.setEnabled(False)
         self.stop_button.setEnabled(True)
-        self.canvas.x_data.clear()
-        self.canvas.y_data.clear()
-        self.canvas.ax.clear()
-        self.voltage_data.clear()
 
         activation_time = float(self.activation_time_input.text())
         voltage_limit = float(self.voltage_limit_input.text())
@@ -264,11 +269,13 @@ class MeasurementPage(QWidget):
                 QMessageBox.warning(self, "Invalid Current List", f"Could not parse current list: {str(e)}")
                 return
 
-        self.worker = MeasurementWorker(selected_resource, activation_time, voltage_limit, interval_time, current_start, current_step, current_list)
-        self.worker.request_user_input.connect(self.prompt_user_to_continue)
-        self.worker.log_signal.connect(self.append_log)
+        self.worker = MeasurementWorker(selected_resource, activation_time, voltage_limit, interval_time, current_start, current_step, current_list, **self.sweep_form.settings())
+        self.canvas.show_samples(self.worker.samples)
+        self.stabilization_prompt.connect(self.worker)
+        self.worker.log_signal.connect(self.append_logs)
         self.worker.plot_signal.connect(self.update_plot)
         self.worker.finished_signal.connect(self.on_measurement_finished)
+        self.log_output.open_log(self.worker.output_folder)
         self.worker.start()
 
     def stop_measurement(self):
@@ -277,17 +284,8 @@ class MeasurementPage(QWidget):
             self.append_log("Stop requested. Waiting for shutdown...")
             self.stop_button.setEnabled(False)
 
-    def prompt_user_to_continue(self):
-        msg = QMessageBox(self)
-        msg.setWindowTitle("Stabilization")
-        msg.setText("Press OK when voltage stabilizes.")
-        msg.setStandardButtons(QMessageBox.Ok)
-        msg.setIcon(QMessageBox.Information)
-        msg.exec_()
-        if self.worker:
-            self.worker._wait_for_user = False
-
     def on_measurement_finished(self):
+        self.stabilization_prompt.close()
         self.start_button.setEnabled(True)
         self.stop_button.setEnabled(False)
         self.append_log("Measurement completed.")
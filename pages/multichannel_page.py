@@ -0,0 +1,173 @@
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QMessageBox,
+    QTabWidget, QTableWidget, QTableWidgetItem, QHeaderView
+)
+from datetime import datetime
+import os
+from log_console import LogConsole
+from lod import MinMaxPyramid
+from plot_canvas import LivePlotCanvas
+from worker.factory import create_worker
+from pages.run_form import RunParametersForm
+
+STATUS_COLUMNS = ["Channel", "Device", "Run", "Status", "Points", "Last Voltage (V)", "Started"]
+
+
+class ChannelPanel(QWidget):
+    # Plot, log and stop button of one channel. Each channel has its own
+    # worker, so runs on different supplies proceed independently.
+    MAX_PLOT_POINTS = 2000
+
+    def __init__(self, number, resource_name, kind, params, worker):
+        super().__init__()
+        self.number = number
+        self.resource_name = resource_name
+        self.kind = kind
+        self.params = params
+        self.worker = worker
+        self.status = "Running"
+        self.points = 0
+        self.last_voltage = None
+        self.started = datetime.now()
+
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel(f"{kind} on {resource_name} (limit {params['voltage_limit']:.3f} V)"))
+        if kind == 'Stability':
+            self.history = MinMaxPyramid(source=worker.samples)
+            self.canvas = LivePlotCanvas(title="Stability Test", xlabel="Time (s)", ylabel="Voltage",
+                                         x_scale=1.0, y_limits=(0, 2))
+        else:
+            self.history = None
+            self.canvas = LivePlotCanvas()
+            self.canvas.show_samples(worker.samples)
+        self.canvas.setMinimumHeight(300)
+        layout.addWidget(self.canvas)
+
+        self.stop_button = QPushButton("Stop Channel")
+        self.stop_button.clicked.connect(self.stop)
+        layout.addWidget(self.stop_button)
+
+        self.log_output = LogConsole(f"channel_{number}")
+        self.log_output.open_log(worker.output_folder)
+        layout.addWidget(self.log_output)
+        self.setLayout(layout)
+
+    def log_lines(self, lines):
+        self.log_output.append_lines(lines)
+
+    def update_plot(self, xs, ys):
+        self.points += len(xs)
+        self.last_voltage = float(ys[-1])
+        if self.history is not None:
+            self.history.sync()
+            self.canvas.set_data(*self.history.query(max_points=self.MAX_PLOT_POINTS))
+        else:
+            self.canvas.sync()
+
+    def stop(self):
+        self.worker.stop()
+        self.status = "Stopping"
+        self.stop_button.setEnabled(False)
+
+    def on_finished(self):
+        self.stop_button.setEnabled(False)
+        watchdog = self.worker.watchdog
+        if self.worker.error is not None:
+            self.status = "Error"
+        elif watchdog is not None and watchdog.tripped:
+            self.status = "Voltage limit"
+        elif not self.worker.running:
+            self.status = "Stopped"
+        else:
+            self.status = "Finished"
+
+
+class MultiChannelPage(QWidget):
+    def __init__(self):
+        super().__init__()
+        self.channels = []
+        layout = QVBoxLayout()
+
+        self.run_form = RunParametersForm()
+        form_layout = QVBoxLayout()
+        form_layout.addWidget(self.run_form)
+
+        buttons_layout = QHBoxLayout()
+        self.add_channel_button = QPushButton("Start Channel")
+        self.add_channel_button.clicked.connect(self.start_channel)
+        buttons_layout.addWidget(self.add_channel_button)
+        self.stop_all_button = QPushButton("Stop All")
+        self.stop_all_button.clicked.connect(self.stop_all)
+        buttons_layout.addWidget(self.stop_all_button)
+        form_layout.addLayout(buttons_layout)
+        form_layout.addStretch()
+
+        top_layout = QHBoxLayout()
+        top_layout.addLayout(form_layout)
+
+        self.status_table = QTableWidget(0, len(STATUS_COLUMNS))
+        self.status_table.setHorizontalHeaderLabels(STATUS_COLUMNS)
+        self.status_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.status_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.status_table.cellDoubleClicked.connect(lambda row, _: self.tabs.setCurrentIndex(row))
+        top_layout.addWidget(self.status_table, 1)
+        layout.addLayout(top_layout)
+
+        self.tabs = QTabWidget()
+        layout.addWidget(self.tabs, 1)
+        self.setLayout(layout)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh_devices()
+
+    def refresh_devices(self):
+        self.run_form.refresh_devices(self.window())
+
+    def start_channel(self):
+        resource_name = self.run_form.device()
+        if not resource_name:
+            QMessageBox.warning(self, "Warning", "Please select a VISA device.")
+            return
+        busy = [c for c in self.channels if c.resource_name == resource_name and c.worker.isRunning()]
+        if busy:
+            QMessageBox.warning(self, "Device Busy", f"Channel {busy[0].number} is already running on {resource_name}.")
+            return
+        try:
+            params = self.run_form.params()
+        except ValueError as e:
+            QMessageBox.warning(self, "Invalid Parameters", str(e))
+            return
+
+        kind = self.run_form.kind()
+        number = len(self.channels) + 1
+        main_window = self.window()
+        base_folder = main_window.get_output_folder() if hasattr(main_window, 'get_output_folder') else "."
+        output_folder = os.path.join(base_folder, f"channel_{number}")
+        worker = create_worker(kind, resource_name, params, output_folder)
+
+        channel = ChannelPanel(number, resource_name, kind, params, worker)
+        worker.log_signal.connect(channel.log_lines)
+        worker.plot_signal.connect(channel.update_plot)
+        worker.plot_signal.connect(lambda *_: self.update_status_row(channel))
+        worker.finished_signal.connect(channel.on_finished)
+        worker.finished_signal.connect(lambda: self.update_status_row(channel))
+        self.channels.append(channel)
+        self.tabs.addTab(channel, f"Ch {number}: {kind}")
+        self.status_table.insertRow(self.status_table.rowCount())
+        self.update_status_row(channel)
+        worker.start()
+
+    def stop_all(self):
+        for channel in self.channels:
+            if channel.worker.isRunning():
+                channel.stop()
+                self.update_status_row(channel)
+
+    def update_status_row(self, channel):
+        row = channel.number - 1
+        last_voltage = "" if channel.last_voltage is None else f"{channel.last_voltage:.3f}"
+        values = [str(channel.number), channel.resource_name, channel.kind, channel.status,
+                  str(channel.points), last_voltage, channel.started.strftime('%Y-%m-%d %H:%M:%S')]
+        for column, value in enumerate(values):
+            self.status_table.setItem(row, column, QTableWidgetItem(value))
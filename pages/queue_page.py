@@ -0,0 +1,228 @@
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QMessageBox,
+    QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView
+)
+import os
+from log_console import LogConsole
+from job_queue import JobQueue, PENDING, DONE, FAILED, STOPPED
+from worker.factory import RUN_TYPES, create_worker
+from pages.run_form import RunParametersForm
+
+QUEUE_COLUMNS = ["Job", "Device", "Run", "Status", "Voltage Limit (V)", "Created", "Started", "Finished"]
+
+
+class QueuePage(QWidget):
+    # Runs queued jobs back to back: as soon as one job on a device finishes
+    # the next pending job for that device starts, so the supply is never
+    # idle between activation, polarization and stability. Reaching the
+    # voltage limit is the normal end of a sweep, but a job that errors or is
+    # stopped halts its device's queue until the queue is started again.
+    def __init__(self, queue=None):
+        super().__init__()
+        self.queue = queue if queue is not None else JobQueue()
+        self.workers = {}  # device -> (job, worker)
+        self.halted = set()
+        self.active = False
+        layout = QVBoxLayout()
+
+        self.run_form = RunParametersForm()
+        form_layout = QVBoxLayout()
+        form_layout.addWidget(self.run_form)
+        self.add_job_button = QPushButton("Add Job")
+        self.add_job_button.clicked.connect(self.add_job)
+        form_layout.addWidget(self.add_job_button)
+        self.add_recipe_button = QPushButton("Add Activation → Polarization → Stability")
+        self.add_recipe_button.clicked.connect(self.add_recipe)
+        form_layout.addWidget(self.add_recipe_button)
+        form_layout.addStretch()
+
+        top_layout = QHBoxLayout()
+        top_layout.addLayout(form_layout)
+
+        table_layout = QVBoxLayout()
+        self.queue_table = QTableWidget(0, len(QUEUE_COLUMNS))
+        self.queue_table.setHorizontalHeaderLabels(QUEUE_COLUMNS)
+        self.queue_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.queue_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.queue_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        table_layout.addWidget(self.queue_table)
+
+        controls_layout = QHBoxLayout()
+        self.start_button = QPushButton("Start Queue")
+        self.start_button.clicked.connect(self.start_queue)
+        self.pause_button = QPushButton("Pause After Current")
+        self.pause_button.clicked.connect(self.pause_queue)
+        self.stop_button = QPushButton("Stop Current")
+        self.stop_button.clicked.connect(self.stop_current)
+        self.up_button = QPushButton("Move Up")
+        self.up_button.clicked.connect(lambda: self.move_selected(-1))
+        self.down_button = QPushButton("Move Down")
+        self.down_button.clicked.connect(lambda: self.move_selected(1))
+        self.retry_button = QPushButton("Retry")
+        self.retry_button.clicked.connect(self.retry_selected)
+        self.remove_button = QPushButton("Remove")
+        self.remove_button.clicked.connect(self.remove_selected)
+        self.clear_button = QPushButton("Clear Finished")
+        self.clear_button.clicked.connect(self.clear_finished)
+        for button in (self.start_button, self.pause_button, self.stop_button, self.up_button,
+                       self.down_button, self.retry_button, self.remove_button, self.clear_button):
+            controls_layout.addWidget(button)
+        table_layout.addLayout(controls_layout)
+        top_layout.addLayout(table_layout, 1)
+        layout.addLayout(top_layout)
+
+        self.log_output = LogConsole("queue")
+        layout.addWidget(self.log_output, 1)
+        self.setLayout(layout)
+        self.refresh_table()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh_devices()
+
+    def refresh_devices(self):
+        self.run_form.refresh_devices(self.window())
+
+    def add_job(self):
+        device = self.run_form.device()
+        if not device:
+            QMessageBox.warning(self, "Warning", "Please select a VISA device.")
+            return
+        try:
+            params = self.run_form.params()
+        except ValueError as e:
+            QMessageBox.warning(self, "Invalid Parameters", str(e))
+            return
+        self.queue.add(device, self.run_form.kind(), params)
+        self.refresh_table()
+        self.schedule()
+
+    def add_recipe(self):
+        device = self.run_form.device()
+        if not device:
+            QMessageBox.warning(self, "Warning", "Please select a VISA device.")
+            return
+        try:
+            params = self.run_form.params()
+        except ValueError as e:
+            QMessageBox.warning(self, "Invalid Parameters", str(e))
+            return
+        for kind in RUN_TYPES:
+            self.queue.add(device, kind, params)
+        self.refresh_table()
+        self.schedule()
+
+    def start_queue(self):
+        self.active = True
+        self.halted.clear()
+        self.append_log("Queue started.")
+        self.schedule()
+        self.refresh_table()
+
+    def pause_queue(self):
+        self.active = False
+        self.append_log("Queue paused; running jobs will finish.")
+
+    def stop_current(self):
+        # Stopping a job also pauses the queue, otherwise the next job would
+        # start straight away
+        self.pause_queue()
+        for job, worker in self.workers.values():
+            worker.stop()
+            self.append_log(f"Stopping job {job['id']} ({job['kind']} on {job['device']}).")
+
+    def schedule(self):
+        if not self.active:
+            return
+        for device in self.queue.devices():
+            if device in self.workers or device in self.halted:
+                continue
+            job = self.queue.next_pending(device)
+            if job is not None:
+                self.start_job(job)
+
+    def start_job(self, job):
+        main_window = self.window()
+        base_folder = main_window.get_output_folder() if hasattr(main_window, 'get_output_folder') else "."
+        self.log_output.open_log(base_folder)
+        output_folder = os.path.join(base_folder, f"job_{job['id']}_{job['kind'].lower()}")
+        try:
+            worker = create_worker(job['kind'], job['device'], job['params'], output_folder)
+        except Exception as e:
+            self.append_log(f"Job {job['id']}: could not start ({e}).")
+            self.queue.mark_finished(job, FAILED)
+            self.halted.add(job['device'])
+            self.refresh_table()
+            return
+        self.queue.mark_started(job, output_folder)
+        self.workers[job['device']] = (job, worker)
+        worker.log_signal.connect(lambda lines, job=job: self.job_log(job, lines))
+        worker.finished_signal.connect(lambda job=job: self.job_finished(job))
+        self.append_log(f"Job {job['id']}: {job['kind']} on {job['device']} started, output in {output_folder}.")
+        self.refresh_table()
+        worker.start()
+
+    def job_log(self, job, lines):
+        self.append_log("\n".join(f"[Job {job['id']}] {line}" for line in lines))
+
+    def job_finished(self, job):
+        _, worker = self.workers.pop(job['device'])
+        if worker.error is not None:
+            status = FAILED
+        elif not worker.running:
+            status = STOPPED
+        else:
+            status = DONE
+        self.queue.mark_finished(job, status)
+        if status != DONE:
+            self.halted.add(job['device'])
+            self.append_log(f"Job {job['id']} ended as {status}; queue for {job['device']} halted.")
+        else:
+            self.append_log(f"Job {job['id']} done.")
+        self.schedule()
+        self.refresh_table()
+
+    def selected_job_ids(self):
+        rows = sorted({index.row() for index in self.queue_table.selectedIndexes()})
+        return [self.queue.jobs[row]['id'] for row in rows if row < len(self.queue.jobs)]
+
+    def move_selected(self, offset):
+        ids = self.selected_job_ids()
+        if len(ids) != 1:
+            return
+        if self.queue.move(ids[0], offset):
+            self.refresh_table()
+            self.queue_table.selectRow(self.queue.jobs.index(self.queue.get(ids[0])))
+
+    def retry_selected(self):
+        for job_id in self.selected_job_ids():
+            job = self.queue.get(job_id)
+            if self.queue.retry(job_id):
+                self.halted.discard(job['device'])
+        self.refresh_table()
+        self.schedule()
+
+    def remove_selected(self):
+        for job_id in self.selected_job_ids():
+            if not self.queue.remove(job_id):
+                self.append_log(f"Job {job_id} is running and cannot be removed.")
+        self.refresh_table()
+
+    def clear_finished(self):
+        self.queue.clear_finished()
+        self.refresh_table()
+
+    def refresh_table(self):
+        self.queue_table.setRowCount(len(self.queue.jobs))
+        for row, job in enumerate(self.queue.jobs):
+            values = [str(job['id']), job['device'], job['kind'], job['status'],
+                      f"{job['params'].get('voltage_limit', 0):.3f}", job['created'],
+                      job['started'] or "", job['finished'] or ""]
+            for column, value in enumerate(values):
+                self.queue_table.setItem(row, column, QTableWidgetItem(value))
+        pending = any(job['status'] == PENDING for job in self.queue.jobs)
+        self.start_button.setEnabled(pending)
+        self.stop_button.setEnabled(bool(self.workers))
+
+    def append_log(self, text):
+        self.log_output.append(text)
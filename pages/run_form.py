@@ -0,0 +1,55 @@
+from PyQt5.QtWidgets import QWidget, QFormLayout, QLineEdit, QComboBox
+from worker.factory import RUN_TYPES
+
+
+class RunParametersForm(QWidget):
+    # Device, run type and the parameters shared by pages that start runs
+    # through worker.factory (multi-channel, job queue)
+    def __init__(self):
+        super().__init__()
+        self.device_combo = QComboBox()
+        self.run_type_combo = QComboBox()
+        self.run_type_combo.addItems(RUN_TYPES)
+        self.voltage_limit_input = QLineEdit("1.95")
+        self.interval_time_input = QLineEdit("20")
+        self.activation_time_input = QLineEdit("60")
+        self.num_cycles_input = QLineEdit("30")
+        self.input_current_input = QLineEdit("1.0")
+
+        self.form_layout = QFormLayout()
+        self.form_layout.setContentsMargins(0, 0, 0, 0)
+        self.form_layout.addRow("Device:", self.device_combo)
+        self.form_layout.addRow("Run:", self.run_type_combo)
+        self.form_layout.addRow("Voltage Limit (V):", self.voltage_limit_input)
+        self.form_layout.addRow("Interval Time (s):", self.interval_time_input)
+        self.form_layout.addRow("Activation Time (s):", self.activation_time_input)
+        self.form_layout.addRow("Number of Cycles (activation):", self.num_cycles_input)
+        self.form_layout.addRow("Input Current (A, stability):", self.input_current_input)
+        self.setLayout(self.form_layout)
+
+    def refresh_devices(self, main_window):
+        if not hasattr(main_window, 'device_combo'):
+            return
+        current = self.device_combo.currentText()
+        self.device_combo.clear()
+        for i in range(main_window.device_combo.count()):
+            name = main_window.device_combo.itemText(i)
+            if "No VISA devices found" not in name:
+                self.device_combo.addItem(name)
+        if current:
+            self.device_combo.setCurrentText(current)
+
+    def device(self):
+        return self.device_combo.currentText()
+
+    def kind(self):
+        return self.run_type_combo.currentText()
+
+    def params(self):
+        return {
+            'voltage_limit': float(self.voltage_limit_input.text()),
+            'interval_time': float(self.interval_time_input.text()),
+            'activation_time': float(self.activation_time_input.text()),
+            'num_cycles': int(self.num_cycles_input.text()),
+            'input_current': float(self.input_current_input.text()),
+        }
@@ -1,10 +1,14 @@
 
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QTextEdit, QPushButton, QLineEdit, QFormLayout, QMessageBox, QFileDialog
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QLineEdit, QFormLayout, QMessageBox, QFileDialog
 )
 from PyQt5.QtGui import QPixmap
 from PyQt5.QtCore import Qt
 import os
+from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT
+from journal import find_resumable
+from log_console import LogConsole
+from lod import MinMaxPyramid
 from plot_canvas import LivePlotCanvas
 from worker.stability_worker import StabilityWorker
 
@@ -48,6 +52,12 @@ class StabilityPage(QWidget):
         self.start_button.clicked.connect(self.start_stability)
         layout.addWidget(self.start_button)
 
+        # Continues a run whose journal in the output folder has no end,
+        # e.g. after a crash or power cut
+        self.resume_button = QPushButton("Resume Interrupted Run")
+        self.resume_button.clicked.connect(self.resume_stability)
+        layout.addWidget(self.resume_button)
+
         self.stop_button = QPushButton("Stop")
         self.stop_button.setStyleSheet("""
             QPushButton {
@@ -67,8 +77,20 @@ class StabilityPage(QWidget):
         layout.addWidget(self.stop_button)
 
 
-        self.canvas = LivePlotCanvas()
+        # The whole run is drawn from a min/max pyramid with at most
+        # MAX_PLOT_POINTS vertices; zooming in pulls finer levels
+        self.history = MinMaxPyramid()
+        self.canvas = LivePlotCanvas(title="Stability Test", xlabel="Time (s)", ylabel="Voltage",
+                                     x_scale=1.0, y_limits=(0, 2))
         self.canvas.setMinimumHeight(450)
+        self.canvas.ax.callbacks.connect('xlim_changed', self._on_view_changed)
+        self.toolbar = NavigationToolbar2QT(self.canvas, self)
+        self.full_view_button = QPushButton("Full Run View")
+        self.full_view_button.clicked.connect(self.show_full_run)
+        toolbar_layout = QHBoxLayout()
+        toolbar_layout.addWidget(self.toolbar)
+        toolbar_layout.addWidget(self.full_view_button)
+        layout.addLayout(toolbar_layout)
         layout.addWidget(self.canvas)
 
         # Export buttons
@@ -83,8 +105,7 @@ class StabilityPage(QWidget):
 
         layout.addWidget(QLabel("Log"))
 
-        self.log_output = QTextEdit()
-        self.log_output.setReadOnly(True)
+        self.log_output = LogConsole("stability")
         layout.addWidget(self.log_output)
 
         self.setLayout(layout)
@@ -93,44 +114,53 @@ class StabilityPage(QWidget):
     def log(self, msg):
         self.log_output.append(msg)
 
-    def update_plot(self, x, y):
-        # x: time (s), y: voltage (V)
-        MAX_PLOT_POINTS = 1000  # Only plot the most recent 1000 points for performance
-        if not hasattr(self, '_time_data'):
-            self._time_data = []
-            self._voltage_data = []
-        self._time_data.append(x)
-        self._voltage_data.append(y)
-        # Only plot the last MAX_PLOT_POINTS points
-        plot_time = self._time_data[-MAX_PLOT_POINTS:]
-        plot_voltage = self._voltage_data[-MAX_PLOT_POINTS:]
-        self.canvas.ax.clear()
-        self.canvas.ax.set_title("Stability Test")
-        self.canvas.ax.set_xlabel("Time (s)")
-        self.canvas.ax.set_ylabel("Voltage")
-        self.canvas.ax.set_ylim(0, 2)  # This sets the y-axis range fixed from 0 to 2
-        self.canvas.ax.plot(plot_time, plot_voltage, marker='o', markersize=3, linestyle='-', color='blue')
-        self.canvas.ax.grid(True)
-        self.canvas.fig.tight_layout(pad=2.0)
-        self.canvas.draw()
+    def log_lines(self, lines):
+        self.log_output.append_lines(lines)
+
+    MAX_PLOT_POINTS = 2000
+
+    def update_plot(self, xs, ys):
+        # One batch per refresh tick; the points themselves are read from the
+        # worker's sample buffer, which the history indexes without copying
+        self.history.sync()
+        self._draw_history()
+
+    def _draw_history(self, draw=True):
+        if self.canvas.auto_range:
+            x, y = self.history.query(max_points=self.MAX_PLOT_POINTS)
+        else:
+            x_start, x_stop = self.canvas.ax.get_xlim()
+            x, y = self.history.query(x_start, x_stop, max_points=self.MAX_PLOT_POINTS)
+        self.canvas.set_data(x, y, draw=draw)
+
+    def _on_view_changed(self, ax):
+        # Zoom/pan: re-query the visible range, the toolbar redraws afterwards
+        if not self.canvas.auto_range:
+            self._draw_history(draw=False)
+
+    def show_full_run(self):
+        self.canvas.auto_range = True
+        x, y = self.history.query(max_points=self.MAX_PLOT_POINTS)
+        self.canvas.set_data(x, y, draw=False)
+        self.canvas.enable_auto_range()
 
     def export_plot(self):
         options = QFileDialog.Options()
         file_path, _ = QFileDialog.getSaveFileName(self, "Export Plot As", "stability_plot.png", "PNG Files (*.png);;JPEG Files (*.jpg);;All Files (*)", options=options)
         if file_path:
-            self.canvas.fig.savefig(file_path)
+            self.canvas.save_figure(file_path)
             self.log(f"Plot exported to: {file_path}")
 
     def save_data(self):
         
-        if not hasattr(self, '_time_data') or not self._time_data:
+        if not len(self.history):
             QMessageBox.warning(self, "No Data", "No stability data to save.")
             return
         import pandas as pd
         options = QFileDialog.Options()
         file_path, _ = QFileDialog.getSaveFileName(self, "Save Stability Data As", "stability_data.xlsx", "Excel Files (*.xlsx);;CSV Files (*.csv);;All Files (*)", options=options)
         if file_path:
-            df = pd.DataFrame({"Time (s)": self._time_data, "Voltage": self._voltage_data})
+            df = pd.DataFrame({"Time (s)": self.history.x, "Voltage": self.history.y})
             try:
                 if file_path.endswith(".csv"):
                     df.to_csv(file_path, index=False)
@@ -152,20 +182,52 @@ class StabilityPage(QWidget):
             QMessageBox.warning(self, "Warning", "Please select a VISA device.")
             return
 
+        if find_resumable(output_folder) is not None:
+            # Starting over instead of resuming is rarely meant after a crash
+            choice = QMessageBox.question(
+                self, "Interrupted Run",
+                f"{output_folder} holds an interrupted stability run that can be resumed.\n"
+                "Resume it? A new run keeps its journal under another name.",
+                QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel, QMessageBox.Yes)
+            if choice == QMessageBox.Yes:
+                self.resume_stability()
+                return
+            if choice == QMessageBox.Cancel:
+                return
+
         interval_time = float(self.interval_time_input.text())
         input_current = float(self.input_current_input.text())
         voltage_limit = float(self.voltage_limit_input.text())
 
-        # Reset plot data
-        self._time_data = []
-        self._voltage_data = []
-
         self.worker = StabilityWorker(selected_resource, interval_time, input_current, voltage_limit, output_folder)
-        self.worker.log_signal.connect(self.log)
+        self._start_worker()
+
+    def resume_stability(self):
+        main_window = self.window()
+        output_folder = main_window.get_output_folder() if hasattr(main_window, 'get_output_folder') else "."
+        state = find_resumable(output_folder)
+        if state is None:
+            QMessageBox.information(self, "Nothing to Resume",
+                                    f"No interrupted stability run was found in {output_folder}.")
+            return
+        self.worker = StabilityWorker.from_journal(state)
+        self.log(f"Resuming the run on {state.resource_name} with {state.sample_count} samples "
+                 f"({state.last_time():.0f}s) from the journal.")
+        self._start_worker()
+        self.history.sync()
+        self._draw_history()
+
+    def _start_worker(self):
+        # Reset plot data
+        self.history = MinMaxPyramid(source=self.worker.samples)
+        self.canvas.reset()
+        self.worker.log_signal.connect(self.log_lines)
         self.worker.plot_signal.connect(self.update_plot)
         self.worker.finished_signal.connect(self.on_stability_finished)
+        self.log_output.open_log(self.worker.output_folder)
         self.worker.start()
         self.start_button.setEnabled(False)
+        self.resume_button.setEnabled(False)
         self.stop_button.setEnabled(True)
 
     def stop_stability(self):
@@ -176,5 +238,6 @@ class StabilityPage(QWidget):
 
     def on_stability_finished(self):
         self.start_button.setEnabled(True)
+        self.resume_button.setEnabled(True)
         self.stop_button.setEnabled(False)
         self.log("Stability test completed.")
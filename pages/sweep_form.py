@@ -0,0 +1,157 @@
+from PyQt5.QtWidgets import QWidget, QFormLayout, QLineEdit, QCheckBox, QMessageBox
+
+
+class SweepSettingsForm(QWidget):
+    # Stabilization, dwell, grid, burst, transient and ramp settings of the
+    # pages that sweep the current (polarization, activation). settings()
+    # gives them as keyword arguments of the sweep workers.
+    def __init__(self):
+        super().__init__()
+        self.auto_stabilize_checkbox = QCheckBox("Detect automatically")
+        self.auto_stabilize_checkbox.setChecked(True)
+        self.stability_threshold_input = QLineEdit("3")
+        self.stabilization_timeout_input = QLineEdit("1800")
+        self.adaptive_dwell_checkbox = QCheckBox("Advance when settled (Interval Time is the maximum)")
+        self.min_dwell_input = QLineEdit("3")
+        self.settle_threshold_input = QLineEdit("0.5")
+        self.adaptive_grid_checkbox = QCheckBox("Refine steps where the curve bends")
+        self.grid_tolerance_input = QLineEdit("5")
+        self.grid_max_current_input = QLineEdit("40")
+        self.burst_readings_input = QLineEdit("1")
+        self.burst_readings_input.setToolTip("More than 1 records a robust average of a burst of readings at every point")
+        self.transient_rate_input = QLineEdit("0")
+        self.transient_rate_input.setToolTip("Records the voltage of every step from the current change on at this rate; 0 turns it off")
+        self.ramp_rate_input = QLineEdit("0")
+        self.ramp_rate_input.setToolTip("Above 0 ramps the current continuously at this rate instead of stepping it")
+        self.ramp_stop_input = QLineEdit("40")
+        self.ramp_sample_rate_input = QLineEdit("20")
+        self.ramp_turn_voltage_input = QLineEdit("")
+        self.ramp_turn_voltage_input.setPlaceholderText("ramp to the end current")
+        self.ramp_reverse_checkbox = QCheckBox("Ramp back down (hysteresis)")
+        self.ramp_reverse_checkbox.setChecked(True)
+
+        self.form_layout = QFormLayout()
+        self.form_layout.setContentsMargins(0, 0, 0, 0)
+        self.form_layout.addRow("Voltage Stabilization:", self.auto_stabilize_checkbox)
+        self.form_layout.addRow("Stable Below (mV/min):", self.stability_threshold_input)
+        self.form_layout.addRow("Stabilization Timeout (s):", self.stabilization_timeout_input)
+        self.form_layout.addRow("Adaptive Dwell:", self.adaptive_dwell_checkbox)
+        self.form_layout.addRow("Min Dwell (s):", self.min_dwell_input)
+        self.form_layout.addRow("Settled Below (mV/s):", self.settle_threshold_input)
+        self.form_layout.addRow("Adaptive Grid:", self.adaptive_grid_checkbox)
+        self.form_layout.addRow("Grid Tolerance (mV):", self.grid_tolerance_input)
+        self.form_layout.addRow("Grid Max Current (A):", self.grid_max_current_input)
+        self.form_layout.addRow("Readings per Point:", self.burst_readings_input)
+        self.form_layout.addRow("Step Transient Rate (Hz):", self.transient_rate_input)
+        self.form_layout.addRow("Ramp Rate (A/s, 0 = steps):", self.ramp_rate_input)
+        self.form_layout.addRow("Ramp End Current (A):", self.ramp_stop_input)
+        self.form_layout.addRow("Ramp Sample Rate (Hz):", self.ramp_sample_rate_input)
+        self.form_layout.addRow("Ramp Turn Voltage (V):", self.ramp_turn_voltage_input)
+        self.form_layout.addRow("Ramp Direction:", self.ramp_reverse_checkbox)
+        self.setLayout(self.form_layout)
+
+    def settings(self):
+        return {
+            'stabilization': self.stabilization_settings(),
+            'dwell': self.dwell_settings(),
+            'adaptive_grid': self.adaptive_grid_settings(),
+            'burst': self.burst_settings(),
+            'transient': self.transient_settings(),
+            'ramp': self.ramp_settings(),
+        }
+
+    def stabilization_settings(self):
+        # None keeps the manual "press OK" wait
+        if not self.auto_stabilize_checkbox.isChecked():
+            return None
+        return {
+            'max_slope': float(self.stability_threshold_input.text()) / 1000 / 60,
+            'timeout': float(self.stabilization_timeout_input.text()),
+        }
+
+    def dwell_settings(self):
+        # None keeps the fixed Interval Time at every step
+        if not self.adaptive_dwell_checkbox.isChecked():
+            return None
+        min_dwell = float(self.min_dwell_input.text())
+        return {
+            'window': max(1.0, min(3.0, min_dwell)),
+            'max_slope': float(self.settle_threshold_input.text()) / 1000,
+            'min_dwell': min_dwell,
+        }
+
+    def adaptive_grid_settings(self):
+        # None keeps the fixed current grid
+        if not self.adaptive_grid_checkbox.isChecked():
+            return None
+        return {
+            'stop': float(self.grid_max_current_input.text()),
+            'tolerance': float(self.grid_tolerance_input.text()) / 1000,
+        }
+
+    def burst_settings(self):
+        # None keeps a single reading per point
+        readings = int(self.burst_readings_input.text())
+        if readings <= 1:
+            return None
+        return {'samples': readings, 'estimator': 'trimmed_mean'}
+
+    def transient_settings(self):
+        # None records no step transients
+        rate = float(self.transient_rate_input.text())
+        if rate <= 0:
+            return None
+        return {'rate': rate}
+
+    def ramp_settings(self):
+        # None sweeps the current in steps
+        rate = float(self.ramp_rate_input.text())
+        if rate <= 0:
+            return None
+        settings = {
+            'rate': rate,
+            'stop': float(self.ramp_stop_input.text()),
+            'sample_rate': float(self.ramp_sample_rate_input.text()),
+            'reverse': self.ramp_reverse_checkbox.isChecked(),
+        }
+        if self.ramp_turn_voltage_input.text().strip():
+            settings['turn_voltage'] = float(self.ramp_turn_voltage_input.text())
+        return settings
+
+
+class StabilizationPrompt:
+    # "Press OK" box for a worker waiting for the voltage to stabilize.
+    # Non-modal so the worker can close it once the voltage is stable.
+    def __init__(self, parent):
+        self.parent = parent
+        self.worker = None
+        self.box = None
+
+    def connect(self, worker):
+        self.worker = worker
+        worker.request_user_input.connect(self.open)
+        worker.stabilized_signal.connect(self.close)
+
+    def open(self):
+        msg = QMessageBox(self.parent)
+        msg.setWindowTitle("Stabilization")
+        if self.worker and self.worker.stabilization is not None:
+            msg.setText("Waiting for the voltage to stabilize automatically.\nPress OK to continue now.")
+        else:
+            msg.setText("Press OK when voltage stabilizes.")
+        msg.setStandardButtons(QMessageBox.Ok)
+        msg.setIcon(QMessageBox.Information)
+        msg.finished.connect(self._confirmed)
+        self.box = msg
+        msg.open()
+
+    def _confirmed(self):
+        self.box = None
+        if self.worker:
+            self.worker.confirm_stabilization()
+
+    def close(self):
+        if self.box is not None:
+            self.box.finished.disconnect(self._confirmed)
+            self.box.close()
+            self.box = None
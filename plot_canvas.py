@@ -1,36 +1,162 @@
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
+from matplotlib.transforms import Affine2D
 from PyQt5.QtWidgets import QSizePolicy
+import numpy as np
 
 class LivePlotCanvas(FigureCanvas):
-    def __init__(self):
+    # Keeps one persistent Line2D over NumPy arrays that are not copied: the
+    # columns of a run's SampleBuffer (show_samples/sync) or arrays handed to
+    # set_data. New points are blitted over a cached background; the full
+    # figure (axes, ticks, layout) is only redrawn when the axis limits have
+    # to grow.
+    HEADROOM = 0.25  # extra span added in the growth direction on relayout
+
+    def __init__(self, title="Polarization Curve", xlabel="Current Density(mA/cm²)", ylabel="Voltage (V)",
+                 x_scale=40.0, y_limits=None):
         self.fig = Figure(figsize=(5, 4))
         self.ax = self.fig.add_subplot(111)
-        self.ax.set_title("Polarization Curve")
-        self.ax.set_xlabel("Current Density(mA/cm²)")
-        self.ax.set_ylabel("Voltage (V)")
-        self.x_data = []
-        self.y_data = []
+        self.ax.set_title(title)
+        self.ax.set_xlabel(xlabel)
+        self.ax.set_ylabel(ylabel)
         self.ax.grid(True)
+        self.ax.set_autoscale_on(False)
+        self.x_scale = x_scale
+        self.fixed_y_limits = y_limits
+        # Cleared when the user zooms or pans, so new data no longer moves the view
+        self.auto_range = True
+        self._setting_limits = False
+        self.samples = None
+        self.columns = None
+        self.x_data = np.empty(0)
+        self.y_data = np.empty(0)
+        self._limits = None
+        self._background = None
+        self._needs_relayout = True
+        self.line, = self.ax.plot([], [], marker='o', markersize=3, linestyle='-', color='blue', animated=True)
+        # x_scale is applied by the line's transform, so the data can stay in
+        # the units it was recorded in (e.g. A for a mA/cm² axis)
+        self.line.set_transform(Affine2D().scale(x_scale, 1.0) + self.ax.transData)
         super().__init__(self.fig)
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         self.updateGeometry()
+        self.mpl_connect('draw_event', self._on_draw)
+        self.ax.callbacks.connect('xlim_changed', self._on_limits_changed)
+        self.ax.callbacks.connect('ylim_changed', self._on_limits_changed)
 
-    def update_plot(self, x, y):
-        self.x_data.append(x)
-        self.y_data.append(y)
-        self.ax.clear()
-        self.ax.set_title("Polarization Curve")
-        self.ax.set_xlabel("Current Density(mA/cm²)")
-        self.ax.set_ylabel("Voltage (V)")
-        self.ax.plot([x * 40 for x in self.x_data], self.y_data, marker='o', markersize='3', linestyle='-', color='blue')
-        self.ax.grid(True)
-        if self.y_data:
-            y_min = min(self.y_data)
-            y_max = max(self.y_data)
-            y_range = y_max - y_min
-            self.ax.set_ylim(y_min - 0.1 * y_range, y_max + 0.1 * y_range if y_range > 0 else y_max + 0.2)
+    def reset(self):
+        self.x_data = np.empty(0)
+        self.y_data = np.empty(0)
+        self._limits = None
+        self.auto_range = True
+        self.line.set_data(self.x_data, self.y_data)
+        self._needs_relayout = True
+        self.draw_idle()
+
+    def show_samples(self, samples, x='current', y='voltage'):
+        # Plots two columns of a SampleBuffer; sync() picks up new rows
+        self.samples = samples
+        self.columns = (x, y)
+        self.reset()
+
+    def sync(self):
+        # Redraws with the rows added to the samples since the last sync
+        first_new = len(self.x_data)
+        count = len(self.samples)
+        x, y = self.columns
+        self.x_data = self.samples.view(x, stop=count)
+        self.y_data = self.samples.view(y, stop=count)
+        self._refresh(first_new)
+
+    def set_data(self, x, y, draw=True):
+        # Replaces the plotted points, e.g. with a downsampled view of a long
+        # run. With draw=False only the line is updated and the caller is
+        # expected to redraw (e.g. the navigation toolbar during a zoom).
+        self.x_data = np.asarray(x, dtype=float)
+        self.y_data = np.asarray(y, dtype=float)
+        if draw:
+            self._refresh(0)
+        else:
+            self.line.set_data(self.x_data, self.y_data)
+
+    def enable_auto_range(self):
+        self.auto_range = True
+        self._needs_relayout = True
+        self._refresh(0)
+
+    def _refresh(self, first_new):
+        x, y = self.x_data, self.y_data
+        self.line.set_data(x, y)
+        new_x, new_y = x[first_new:], y[first_new:]
+        if not self.auto_range:
+            if self._background is None:
+                self.draw_idle()
+            else:
+                self._blit()
+        elif self._limits_exceeded(new_x, new_y) or self._needs_relayout or self._background is None:
+            self._needs_relayout = False
+            self._set_limits(x, y)
+            self.fig.tight_layout(pad=2.0)
+            self.draw()
+        else:
+            self._blit()
+
+    def _limits_exceeded(self, new_x, new_y):
+        # Only the new points are checked, so the per-frame cost does not
+        # depend on how much data is already on screen
+        if self._limits is None:
+            return True
+        if len(new_x) == 0:
+            return False
+        lx0, lx1, ly0, ly1 = self._limits
+        if new_x.min() * self.x_scale < lx0 or new_x.max() * self.x_scale > lx1:
+            return True
+        if self.fixed_y_limits is None and (new_y.min() < ly0 or new_y.max() > ly1):
+            return True
+        return False
+
+    def _set_limits(self, x, y):
+        # Limits grow with headroom so a steadily growing series triggers a
+        # relayout only every so often
+        if len(x) == 0:
+            return
+        x_limits = self._padded(x.min() * self.x_scale, x.max() * self.x_scale, 0.05, fallback=1.0)
+        if self.fixed_y_limits is not None:
+            y_limits = tuple(self.fixed_y_limits)
+        else:
+            y_limits = self._padded(y.min(), y.max(), 0.1, fallback=0.2)
+        self._limits = x_limits + y_limits
+        self._setting_limits = True
+        try:
+            self.ax.set_xlim(*x_limits)
+            self.ax.set_ylim(*y_limits)
+        finally:
+            self._setting_limits = False
+
+    def _on_limits_changed(self, ax):
+        if not self._setting_limits:
+            self.auto_range = False
+
+    def _padded(self, low, high, margin, fallback):
+        span = high - low
+        if span <= 0:
+            return (low - fallback, high + fallback)
+        return (low - margin * span, high + (margin + self.HEADROOM) * span)
+
+    def _on_draw(self, event):
+        self._background = self.copy_from_bbox(self.fig.bbox)
+        self.ax.draw_artist(self.line)
 
-        self.fig.tight_layout(pad=2.0)
-        self.draw()
+    def _blit(self):
+        self.restore_region(self._background)
+        self.ax.draw_artist(self.line)
+        self.blit(self.fig.bbox)
 
+    def save_figure(self, file_path):
+        # Animated artists are skipped by savefig, so render the line normally
+        self.line.set_animated(False)
+        try:
+            self.fig.savefig(file_path)
+        finally:
+            self.line.set_animated(True)
+            self.draw_idle()
@@ -0,0 +1,832 @@
+import os
+import time
+from datetime import date, datetime
+
+import numpy as np
+
+from adaptive_grid import AdaptiveCurrentGrid
+from burst import BurstRecorder, robust_summary, validate_burst
+from data_store import AsyncCsvWriter, export_in_background, last_csv_row, save_columns_in_background
+from journal import RunJournal, keep_interrupted_journal
+from safety import VoltageWatchdog
+from sample_buffer import SampleBuffer, SegmentStore, FLAG_LATE, FLAG_LIMIT, FLAG_MONITOR, FLAG_RAMP, FLAG_REVERSE
+from scheduler import DeadlineScheduler
+from scpi import InstrumentIO
+from stabilization import StabilizationDetector, wait_until_stable
+
+# A protocol describes a run as data:
+#
+#   {'name': 'Polarization', 'voltage_limit': 1.95, 'output': 'output.xlsx',
+#    'stabilization': {...}, 'dwell': {...}, 'stop_message': '...',
+#    'steps': [{'type': 'output', 'state': 'on'},
+#              {'type': 'hold', 'current': 1.0, 'duration': 60},
+#              {'type': 'wait_stable', 'current': 0.01},
+#              {'type': 'measure', 'current': 0.0},
+#              {'type': 'sweep', 'currents': [...], 'interval': 20}]}
+#
+# Step types:
+#   output       state 'on' or 'off'
+#   set_current  current
+#   hold         [current], duration, [message]
+#   cycle        count, steps, [message]; messages may use {cycle} and {count}
+#   wait_stable  [current], [stabilization]; None waits for confirm()
+#   measure      [current] recorded as, [samples], [period], [burst]
+#   sweep        currents list, or start/step/[stop], or start/adaptive
+#                (AdaptiveCurrentGrid settings); interval, [dwell], [burst],
+#                [transient]
+#   ramp         stop, rate (A/s), [start], [sample_rate] (Hz, default 20),
+#                [reverse] (default True), [turn_voltage], [log_interval]
+#   monitor      current, interval, [duration], [file], [flush_interval]
+#
+# 'stabilization' and 'dwell' hold StabilizationDetector settings (see
+# wait_stable_voltage and dwell_and_measure); step values override the
+# protocol-wide ones. 'burst' measures each point as a burst of readings
+# with a robust estimate instead of a single reading (see measure_burst);
+# the burst summaries and raw readings are saved next to 'output'.
+# 'transient': {'rate': Hz} records every reading of each sweep step from
+# the current change on, sampled at least at that rate, keyed by the index
+# of the step's point and saved next to 'output' as well.
+# A ramp step sweeps the current linearly in time (galvanodynamic) from
+# start to stop, or until the voltage reaches turn_voltage, and with reverse
+# back down to start, setting the current and reading the voltage every
+# 1/sample_rate s. Its points carry FLAG_RAMP (and FLAG_REVERSE on the way
+# down) and are also saved with their times and branch as <output>_ramp.xlsx.
+# Points from measure, sweep and ramp steps are saved to
+# 'output' (.xlsx) at the end, and appended to 'stream' (.csv) as they are
+# taken if given; monitor steps stream to their own CSV file. All file I/O
+# happens on writer threads (data_store), never in the sampling loop.
+#
+# With a journal_path every sample and state change is also appended to a
+# write-ahead journal (journal.py). An interrupted run can be continued by
+# passing the loaded JournalState as resume: the samples are restored, the
+# run clock continues across the gap and the interrupted monitor step picks
+# up where it stopped. A new run never overwrites a journal that could
+# still be resumed; that one is renamed first (keep_interrupted_journal).
+#
+# Instrument I/O goes through scpi.InstrumentIO: setting a current also
+# reads the voltage and current in the same transaction, and so does every
+# recorded point ('pipelining': false sends the commands separately; so
+# does a supply that fails the check at the start of the run). The current
+# the supply measured is kept next to the setpoint in the samples and the
+# exports. The latency of every command is summarized in the log and saved
+# to 'latency_file' at the end of the run.
+
+STEP_TYPES = ('output', 'set_current', 'hold', 'cycle', 'wait_stable', 'measure', 'sweep', 'ramp', 'monitor')
+
+# Keys the engine reads from a protocol and from each type of step
+PROTOCOL_KEYS = ('name', 'voltage_limit', 'output', 'stream', 'stabilization', 'dwell', 'burst', 'transient',
+                 'pipelining', 'latency_file', 'start_message', 'stop_message', 'steps')
+STEP_KEYS = {
+    'output': ('type', 'state'),
+    'set_current': ('type', 'current', 'message'),
+    'hold': ('type', 'current', 'duration', 'message'),
+    'cycle': ('type', 'count', 'steps', 'message'),
+    'wait_stable': ('type', 'current', 'stabilization', 'message'),
+    'measure': ('type', 'current', 'samples', 'period', 'burst'),
+    'sweep': ('type', 'currents', 'start', 'step', 'stop', 'adaptive', 'interval', 'dwell', 'burst', 'transient',
+              'message'),
+    'ramp': ('type', 'start', 'stop', 'rate', 'sample_rate', 'reverse', 'turn_voltage', 'log_interval', 'message'),
+    'monitor': ('type', 'current', 'interval', 'duration', 'file', 'flush_interval', 'message'),
+}
+
+# 'stabilization' for runs nobody can confirm (queued, multi-channel and
+# --no-input command-line runs): detect it with the default thresholds
+UNATTENDED_STABILIZATION = {'timeout': 1800}
+
+SWEEP_COLUMNS = ['Current (A)', 'Measured Current (A)', 'Voltage (V)', 'Dwell (s)']
+TRANSIENT_COLUMNS = (('time', np.float64), ('voltage', np.float64))
+RAMP_COLUMNS = ['Time (s)', 'Current (A)', 'Measured Current (A)', 'Voltage (V)', 'Branch']
+MONITOR_COLUMNS = ['Time (s)', 'Voltage (V)', 'Measured Current (A)', 'Jitter (ms)']
+
+
+def validate_protocol(protocol):
+    if 'voltage_limit' not in protocol:
+        raise ValueError("Protocol has no voltage_limit")
+    validate_burst(protocol.get('burst'))
+    _validate_transient(protocol.get('transient'))
+    _validate_steps(protocol.get('steps', []))
+
+
+def _validate_steps(steps):
+    for step in steps:
+        kind = step.get('type')
+        if kind not in STEP_TYPES:
+            raise ValueError(f"Unknown protocol step '{kind}'")
+        if kind == 'set_current' and 'current' not in step:
+            raise ValueError("set_current step needs a current")
+        if kind == 'hold' and 'duration' not in step:
+            raise ValueError("hold step needs a duration")
+        if kind == 'cycle':
+            _validate_steps(step.get('steps', []))
+        if kind == 'sweep' and not ('currents' in step or 'step' in step or 'adaptive' in step):
+            raise ValueError("sweep step needs currents, a step or adaptive settings")
+        if kind == 'ramp' and not ('stop' in step and step.get('rate', 0) > 0 and step.get('sample_rate', 1) > 0):
+            raise ValueError("ramp step needs a stop current and a rate and sample rate above 0")
+        if kind == 'monitor' and 'current' not in step:
+            raise ValueError("monitor step needs a current")
+        validate_burst(step.get('burst'))
+        _validate_transient(step.get('transient'))
+
+
+def _validate_transient(transient):
+    if transient is not None and not transient.get('rate', 0) > 0:
+        raise ValueError("transient capture needs a rate above 0")
+
+
+class ProtocolEngine:
+    # Executes a protocol on an open instrument session. All waits sample
+    # through a VoltageWatchdog, so the limit is enforced the same way for
+    # every protocol, and the supply is always switched off at the end, also
+    # after an error. It has no Qt dependency: the GUI workers and headless
+    # runners supply the log/publish_point/request_confirmation callbacks.
+    def __init__(self, pwr, protocol, output_folder=".", log=print, publish_point=None,
+                 request_confirmation=None, on_stabilized=None, watchdog_rate=10.0, samples=None,
+                 journal_path=None, resume=None, resource_name=None):
+        validate_protocol(protocol)
+        self.pwr = InstrumentIO(pwr, protocol.get('pipelining', True), log)
+        self.protocol = protocol
+        self.output_folder = output_folder
+        self.log = log
+        self.publish_point = publish_point or (lambda x, y: None)
+        self.request_confirmation = request_confirmation
+        self.on_stabilized = on_stabilized
+        self.watchdog_rate = watchdog_rate  # Hz, voltage limit sampling while waiting
+        self.watchdog = None
+        self.running = True
+        self.waiting_for_user = False
+        self.setpoint = 0.0
+        # Every reading of the run; the host may pass its own buffer to read it live
+        self.samples = samples if samples is not None else SampleBuffer()
+        self.bursts = BurstRecorder()
+        # Readings of each sweep step from its current change on, keyed by sample index
+        self.transients = SegmentStore(TRANSIENT_COLUMNS)
+        self.start_time = None
+        self.error = None
+        self.exports = []  # background .xlsx threads, still running after run()
+        self.journal_path = journal_path
+        self.resume = resume
+        self.resource_name = resource_name
+        self.journal = None
+        self._stream = None
+        self._context = {}
+        self._resume_monitor = False
+
+    def stop(self):
+        self.running = False
+
+    def confirm(self):
+        # Operator override: ends the current wait_stable step
+        self.waiting_for_user = False
+
+    def set_voltage_limit(self, voltage_limit):
+        # Takes effect with the next reading
+        self.protocol['voltage_limit'] = voltage_limit
+        if self.watchdog is not None:
+            self.watchdog.voltage_limit = voltage_limit
+
+    def should_continue(self):
+        return self.running and not self.watchdog.tripped
+
+    def run(self):
+        self.watchdog = VoltageWatchdog(self.pwr, self.protocol['voltage_limit'], self.watchdog_rate, self.log)
+        self.start_time = time.monotonic()
+        try:
+            self.pwr.check_pipelining()
+            if self.journal_path is not None:
+                if self.resume is None:
+                    kept = keep_interrupted_journal(self.journal_path)
+                    if kept is not None:
+                        self.log(f"The interrupted run's journal was kept as {kept}.")
+                self.journal = RunJournal(self.journal_path, 'a' if self.resume is not None else 'w')
+            steps = self.protocol.get('steps', [])
+            if self.resume is not None:
+                first = self._prepare_resume(steps)
+            else:
+                first = 0
+                self._journal('start', protocol=self.protocol, resource=self.resource_name,
+                              output_folder=os.path.abspath(self.output_folder))
+            if self.protocol.get('stream'):
+                self._stream = AsyncCsvWriter(os.path.join(self.output_folder, self.protocol['stream']),
+                                              SWEEP_COLUMNS, 'a' if self.resume is not None else 'w',
+                                              flush_interval=0.0, log=self.log)
+            if self.protocol.get('start_message') and self.resume is None:
+                self.log(self.protocol['start_message'])
+            for index in range(first, len(steps)):
+                if not self.should_continue():
+                    break
+                self._journal('step', index=index, type=steps[index]['type'])
+                getattr(self, f"_step_{steps[index]['type']}")(steps[index])
+            if not self.running:
+                self.log(self.protocol.get('stop_message', "Run stopped by user."))
+        except Exception as e:
+            self.error = e
+            self.log(f"Error: {e}")
+        finally:
+            self._shutdown()
+            if self._stream is not None:
+                self._stream.close()
+                self.log(self._stream.summary())
+            self._save()
+            self._report_latency()
+            self._close_journal()
+
+    def _prepare_resume(self, steps):
+        # Restores the samples, continues the run clock across the gap and
+        # returns the index of the step to continue with. Output steps
+        # before it are replayed, since the supply may have been reset.
+        state = self.resume
+        if not state.resumable():
+            raise ValueError("The journal does not describe an interrupted monitoring run")
+        if len(self.samples) == 0:
+            restore_samples(self.samples, state)
+        gap = max(0.0, time.time() - state.last_wall())
+        self.start_time = time.monotonic() - (state.last_time() + gap)
+        self.log(f"Resuming from {state.path}: {state.sample_count} samples restored, "
+                 f"interrupted for {gap:.0f}s.")
+        self._journal('resume', step_index=state.step_index, gap=gap)
+        for step in steps[:state.step_index]:
+            if step['type'] == 'output':
+                self._step_output(step)
+        self._resume_monitor = True
+        return state.step_index
+
+    def _report_latency(self):
+        for line in self.pwr.summary_lines():
+            self.log(line)
+        path = self.protocol.get('latency_file', "scpi_latency.json")
+        if path:
+            try:
+                self.pwr.save(os.path.join(self.output_folder, path))
+            except OSError as e:
+                self.log(f"Error: could not save the SCPI latencies ({e})")
+
+    def _journal(self, kind, **fields):
+        if self.journal is not None:
+            self.journal.event(kind, **fields)
+
+    def _close_journal(self):
+        if self.journal is None:
+            return
+        if self.error is not None:
+            reason = 'error'
+        elif self.watchdog.tripped:
+            reason = 'voltage limit'
+        elif not self.running:
+            reason = 'stopped'
+        else:
+            reason = 'completed'
+        try:
+            self._journal('end', reason=reason, samples=len(self.samples))
+            self.journal.close()
+        except OSError as e:
+            self.log(f"Error: could not close the journal ({e})")
+
+    def run_steps(self, steps):
+        # Returns False once the run should not continue
+        for step in steps:
+            if not self.should_continue():
+                return False
+            getattr(self, f"_step_{step['type']}")(step)
+        return self.should_continue()
+
+    def set_current(self, current):
+        # The reading taken with the new setpoint is checked against the limit
+        # and saves the watchdog its first query of the step. Returns the
+        # current the supply measured with it.
+        self.setpoint = current
+        sample_start = time.monotonic()
+        voltage, measured = self.pwr.set_and_measure(current)
+        self.watchdog.check(voltage, sample_start)
+        return measured
+
+    def hold(self, duration):
+        # Returns False if the run should not continue
+        self.watchdog.sleep(duration, lambda: self.running)
+        return self.should_continue()
+
+    def wait_stable_voltage(self, stabilization):
+        # The operator can always confirm to continue before the detector does
+        self.waiting_for_user = True
+        if self.request_confirmation is not None:
+            self.request_confirmation()
+        if stabilization is None:
+            self.log("Waiting for user to confirm voltage stabilization...")
+            while self.waiting_for_user and self.should_continue():
+                self.watchdog.sleep(0.1)
+            return
+        settings = dict(stabilization)
+        timeout = settings.pop('timeout', None)
+        sample_period = settings.pop('sample_period', None)
+        detector = StabilizationDetector(**settings)
+        sample_period = min(sample_period or detector.window / 10, 1.0 / self.watchdog_rate)
+        self.log("Waiting for voltage to stabilize...")
+        voltage, elapsed, reason = wait_until_stable(
+            self.watchdog.read, detector, sample_period, timeout,
+            should_continue=lambda: self.waiting_for_user and self.should_continue())
+        self.waiting_for_user = False
+        if self.on_stabilized is not None:
+            self.on_stabilized()
+        if reason == 'stable':
+            self.log(f"Voltage stable at {voltage:.3f}V after {elapsed:.0f}s.")
+        elif reason == 'timeout':
+            self.log(f"Voltage not stable after {elapsed:.0f}s timeout, continuing at {voltage:.3f}V.")
+        elif self.should_continue():
+            self.log(f"Continuing on user request after {elapsed:.0f}s.")
+
+    def dwell_and_measure(self, interval_time, dwell=None, burst=None):
+        # Returns (voltage, measured current, dwell time) for the current
+        # step. None dwells the fixed interval; a dict of
+        # StabilizationDetector settings plus 'min_dwell' and 'sample_period'
+        # advances as soon as the step has settled (interval is the maximum).
+        # The point is then one reading, or a burst if given. If the limit
+        # trips, the tripping reading is returned, without a current.
+        start = time.monotonic()
+        if dwell is None:
+            self.watchdog.sleep(interval_time, lambda: self.running)
+        else:
+            settings = dict(dwell)
+            min_dwell = settings.pop('min_dwell', 0.0)
+            sample_period = settings.pop('sample_period', None)
+            detector = StabilizationDetector(**settings)
+            sample_period = min(sample_period or detector.window / 10, 1.0 / self.watchdog.sample_rate)
+            wait_until_stable(self.watchdog.read, detector, sample_period, timeout=interval_time,
+                              should_continue=self.should_continue, min_time=min_dwell)
+        elapsed = time.monotonic() - start
+        if self.watchdog.tripped:
+            return self.watchdog.trip_voltage, np.nan, elapsed
+        # Stopped during the dwell: one last reading instead of a burst
+        voltage, measured = self.measure_point(burst if self.should_continue() else None)
+        return voltage, measured, elapsed
+
+    def measure_point(self, burst=None, current=None):
+        # (voltage, measured current) of one reading, or the robust estimate
+        # of a burst of readings with their mean current
+        if burst is None:
+            return self.watchdog.read_point()
+        return self.measure_burst(burst, current)
+
+    def measure_burst(self, burst, current=None):
+        # Takes 'samples' readings (default 10), or as many as fit in
+        # 'window' s, 'period' s apart, and returns their 'estimator'
+        # (default trimmed_mean, see burst.py). Every reading is checked
+        # against the limit; a trip ends the burst and returns the tripping
+        # reading. Returns (voltage, mean measured current), or (None, NaN)
+        # if stopped before the first reading.
+        count = burst.get('samples')
+        window = burst.get('window')
+        if count is None and window is None:
+            count = 10
+        period = burst.get('period', 1.0 / self.watchdog_rate)
+        times = []
+        readings = []
+        currents = []
+        start = time.monotonic()
+        while self.should_continue():
+            times.append(time.monotonic() - start)
+            voltage, measured = self.watchdog.read_point()
+            readings.append(voltage)
+            currents.append(measured)
+            taken = len(readings)
+            if (count is not None and taken >= count) or (window is not None and taken * period > window):
+                break
+            delay = start + taken * period - time.monotonic()
+            if delay > 0:
+                self.watchdog.sleep(delay, lambda: self.running)
+        if not readings:
+            return None, np.nan
+        summary, outliers = robust_summary(readings, burst.get('trim', 0.1), burst.get('outlier_k', 3.5))
+        if self.watchdog.tripped:
+            value = self.watchdog.trip_voltage
+        else:
+            value = summary[burst.get('estimator', 'trimmed_mean')]
+        current = self.setpoint if current is None else current
+        self.bursts.add(len(self.samples), current, value, times, readings, summary, outliers)
+        if summary['outliers']:
+            self.log(f"{summary['outliers']} of {summary['n']} readings at {current:.2f}A rejected as outliers "
+                     f"(median {summary['median']:.4f}V, std {summary['std'] * 1000:.1f}mV)")
+        return value, float(np.mean(currents))
+
+    def elapsed(self):
+        return time.monotonic() - self.start_time
+
+    def _flags(self, voltage, flags=0):
+        if voltage >= self.watchdog.voltage_limit:
+            flags |= FLAG_LIMIT
+        return flags
+
+    def add_sample(self, t, current, voltage, dwell=None, flags=0, measured_current=np.nan):
+        flags = self._flags(voltage, flags)
+        self.samples.append(t, current, voltage, dwell, flags, measured_current)
+        if self.journal is not None:
+            self.journal.sample(t, current, voltage, dwell, flags, measured_current)
+
+    def record(self, current, voltage, dwell=None, measured_current=np.nan):
+        self.add_sample(self.elapsed(), current, voltage, dwell, measured_current=measured_current)
+        if self._stream is not None:
+            self._stream.append((current, measured_current, voltage, dwell))
+        timestamp = f'[{date.today()} {time.strftime("%H:%M:%S")}]'
+        if dwell is None:
+            self.log(f'{timestamp} {current:6.2f}A {voltage:7.3f}V')
+        else:
+            self.log(f'{timestamp} {current:6.2f}A {voltage:7.3f}V {dwell:6.1f}s')
+        self.publish_point(current, voltage)
+
+    def _message(self, step):
+        if step.get('message'):
+            self.log(step['message'].format(**self._context))
+
+    def _step_output(self, step):
+        state = step.get('state', 'on')
+        if state is True or str(state).lower() in ('on', '1'):
+            self.pwr.write('output on')
+        else:
+            self.pwr.write('output off')
+
+    def _step_set_current(self, step):
+        self._message(step)
+        self.set_current(step['current'])
+
+    def _step_hold(self, step):
+        self._message(step)
+        if 'current' in step:
+            self.set_current(step['current'])
+        self.hold(step['duration'])
+
+    def _step_cycle(self, step):
+        count = step.get('count', 1)
+        for i in range(count):
+            self._context = {'cycle': i + 1, 'count': count}
+            self._message(step)
+            if not self.run_steps(step.get('steps', [])):
+                break
+        self._context = {}
+
+    def _step_wait_stable(self, step):
+        self._message(step)
+        if 'current' in step:
+            self.set_current(step['current'])
+        self.wait_stable_voltage(step.get('stabilization', self.protocol.get('stabilization')))
+
+    def _step_measure(self, step):
+        # Records a burst against 'current' (default: the present setpoint);
+        # without burst settings, the mean of 'samples' readings taken
+        # 'period' s apart
+        current = step.get('current', self.setpoint)
+        burst = step.get('burst', self.protocol.get('burst'))
+        if burst is None and step.get('samples', 1) > 1:
+            burst = {'samples': step['samples'], 'period': step.get('period', 1.0 / self.watchdog_rate),
+                     'estimator': 'mean'}
+        if not self.should_continue():
+            return
+        voltage, measured = self.measure_point(burst, current)
+        if voltage is None:
+            return
+        self.record(current, voltage, measured_current=measured)
+
+    def _sweep_currents(self, step):
+        if 'currents' in step:
+            return step['currents'], None
+        if 'adaptive' in step:
+            grid = AdaptiveCurrentGrid(start=step.get('start', 0.0), **step['adaptive'])
+            # Continue from the point a preceding measure step took at the start
+            last = self.samples.last()
+            if last is not None and last[1] == grid.start:
+                grid.add(last[1], last[2])
+            return grid, grid
+        return _stepped(step.get('start', 0.0), step['step'], step.get('stop')), None
+
+    def _step_sweep(self, step):
+        self._message(step)
+        currents, grid = self._sweep_currents(step)
+        dwell_settings = step.get('dwell', self.protocol.get('dwell'))
+        burst = step.get('burst', self.protocol.get('burst'))
+        transient = step.get('transient', self.protocol.get('transient'))
+        for current in currents:
+            if not self.should_continue():
+                break
+            capture = self._capture_transient(transient['rate']) if transient else None
+            try:
+                self.set_current(current)
+                voltage, measured, dwell = self.dwell_and_measure(step['interval'], dwell_settings, burst)
+            finally:
+                if capture is not None:
+                    self._store_transient(capture)
+            if voltage is None:
+                break
+            if grid is not None:
+                grid.add(current, voltage)
+            self.record(current, voltage, dwell, measured)
+
+    def _step_ramp(self, step):
+        # Galvanodynamic sweep: the setpoint follows start + rate * t on a
+        # fixed time grid (see DeadlineScheduler), each tick one pipelined
+        # set-and-measure, so the curve is as dense as the sample rate allows
+        self._message(step)
+        start = step.get('start', self.setpoint)
+        rate = step['rate']
+        turn_voltage = step.get('turn_voltage')
+        log_interval = step.get('log_interval', 1.0)
+        branches = [(start, step['stop'], 0)]
+        if step.get('reverse', True):
+            branches.append((step['stop'], start, FLAG_REVERSE))
+        scheduler = DeadlineScheduler(1.0 / step.get('sample_rate', 20.0))
+        first_sample = len(self.samples)
+        self.log(f"Ramping {start:g}A to {step['stop']:g}A at {rate:g}A/s, "
+                 f"sampling every {scheduler.interval * 1000:g} ms.")
+        for first, last, branch in branches:
+            turned = self._ramp(first, last, rate, turn_voltage if not branch else None, scheduler,
+                                FLAG_RAMP | branch, log_interval)
+            if not self.should_continue():
+                break
+            if branch == 0 and turned is not None and len(branches) > 1:
+                # Come back down from where the forward branch turned
+                branches[1] = (turned, start, FLAG_REVERSE)
+        self.log(scheduler.summary())
+        self._log_hysteresis(first_sample)
+
+    def _ramp(self, first, last, rate, turn_voltage, scheduler, flags, log_interval):
+        # One branch of a ramp. Returns the current it turned at if
+        # turn_voltage was reached before last, otherwise None.
+        direction = 1.0 if last >= first else -1.0
+        duration = abs(last - first) / rate
+        scheduler.start()
+        offset = 0.0
+        next_log = 0.0
+        while self.should_continue():
+            if offset >= duration:
+                current = last
+            else:
+                current = round(first + direction * rate * offset, 6)
+            measured = self.set_current(current)
+            voltage = self.watchdog.trip_voltage if self.watchdog.tripped else self.watchdog.last_voltage
+            late = FLAG_LATE if scheduler.last_jitter > scheduler.late_tolerance else 0
+            self.add_sample(self.elapsed(), current, voltage, None, flags | late, measured)
+            if self._stream is not None:
+                self._stream.append((current, measured, voltage, None))
+            self.publish_point(current, voltage)
+            if offset >= next_log:
+                self.log(f'[{date.today()} {time.strftime("%H:%M:%S")}] {current:6.2f}A {voltage:7.3f}V')
+                next_log = offset + log_interval
+            if self.watchdog.tripped or current == last:
+                return None
+            if turn_voltage is not None and voltage >= turn_voltage:
+                self.log(f"Turning at {current:.2f}A: {voltage:.3f}V reached.")
+                return current
+            offset = scheduler.wait(lambda delay: self.watchdog.sleep(delay, lambda: self.running))
+        return None
+
+    def _log_hysteresis(self, first_sample):
+        # Largest voltage difference between the branches of the ramp whose
+        # samples start at first_sample
+        flags = self.samples.view('flags', first_sample)
+        current = self.samples.view('current', first_sample)
+        voltage = self.samples.view('voltage', first_sample)
+        backward = (flags & FLAG_REVERSE) != 0
+        forward = ((flags & FLAG_RAMP) != 0) & ~backward
+        if forward.sum() < 2 or backward.sum() < 2:
+            return
+        up_current, up_voltage = current[forward], voltage[forward]
+        down_current, down_voltage = current[backward][::-1], voltage[backward][::-1]
+        low = max(up_current.min(), down_current.min())
+        high = min(up_current.max(), down_current.max())
+        if high <= low:
+            return
+        grid = np.linspace(low, high, 200)
+        difference = np.interp(grid, up_current, up_voltage) - np.interp(grid, down_current, down_voltage)
+        worst = int(np.argmax(np.abs(difference)))
+        self.log(f"Hysteresis: up to {difference[worst] * 1000:+.1f} mV (forward - backward) "
+                 f"at {grid[worst]:.2f}A.")
+
+    def _capture_transient(self, rate):
+        # Collects every reading from now on in two lists; the watchdog
+        # samples at least at rate while waiting
+        times = []
+        voltages = []
+        start = time.monotonic()
+
+        def on_reading(sample_start, voltage):
+            times.append(sample_start - start)
+            voltages.append(voltage)
+
+        self.watchdog.on_reading = on_reading
+        self.watchdog.sample_rate = max(self.watchdog_rate, rate)
+        return times, voltages
+
+    def _store_transient(self, capture):
+        # Keyed by the index the step's point is about to get
+        self.watchdog.on_reading = None
+        self.watchdog.sample_rate = self.watchdog_rate
+        times, voltages = capture
+        if times:
+            self.transients.add(len(self.samples), time=times, voltage=voltages)
+
+    def _step_monitor(self, step):
+        # Holds a current and streams (elapsed, voltage, measured current,
+        # jitter) to a CSV file
+        # on a fixed time grid (see DeadlineScheduler), for 'duration' s or
+        # until stopped or the limit trips
+        self._message(step)
+        csv_path = os.path.join(self.output_folder, step.get('file', "stability_output.csv"))
+        flush_interval = step.get('flush_interval', 1.0)
+        duration = step.get('duration')
+        resuming, self._resume_monitor = self._resume_monitor, False
+        if resuming and self.resume.monitor_start is not None:
+            monitor_start = self.resume.monitor_start
+        else:
+            monitor_start = self.elapsed()
+        self._journal('monitor_start', t=monitor_start)
+        missing = self._unwritten_monitor_rows(csv_path, monitor_start) if resuming else []
+        store = AsyncCsvWriter(csv_path, MONITOR_COLUMNS, 'a' if resuming else 'w',
+                               flush_interval=flush_interval, log=self.log)
+        for row in missing:
+            store.append(row)
+        if missing:
+            self.log(f"{len(missing)} journaled samples added to {csv_path}.")
+        scheduler = DeadlineScheduler(step['interval'])
+        try:
+            self.set_current(step['current'])
+            if resuming:
+                self.log(f"Stability test resumed at {step['current']}A.")
+            else:
+                self.log(f"Stability test started at {step['current']}A.")
+            self.log(f"Streaming data to {csv_path}")
+            scheduler.start()
+            # Run time already spent in this step before the scheduler started
+            offset = self.elapsed() - monitor_start
+            while self.running:
+                elapsed = self.elapsed()
+                measured_voltage, measured_current = self.watchdog.read_point()
+                flags = FLAG_MONITOR | (FLAG_LATE if scheduler.last_jitter > scheduler.late_tolerance else 0)
+                self.add_sample(elapsed, self.setpoint, measured_voltage, None, flags, measured_current)
+                store.append((elapsed, measured_voltage, measured_current, scheduler.last_jitter * 1000))
+                self.log(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {measured_voltage:7.3f}V")
+                self.publish_point(elapsed, measured_voltage)
+                if self.watchdog.tripped:
+                    self.log("Stopping test.")
+                    break
+                if duration is not None and offset + scheduler.next_offset() > duration:
+                    self.log("Stability test finished.")
+                    break
+                scheduler.wait(lambda delay: self.watchdog.sleep(delay, lambda: self.running))
+                if self.watchdog.tripped:
+                    self.log("Stopping test.")
+                    break
+        finally:
+            # Final save, then convert to .xlsx off the acquisition thread
+            store.close()
+            self.log(store.summary())
+            self.log(scheduler.summary())
+            xlsx_path = os.path.splitext(csv_path)[0] + ".xlsx"
+            self.exports.append(export_in_background(store.path, xlsx_path, self.log))
+
+    def _unwritten_monitor_rows(self, csv_path, monitor_start):
+        # Samples of the interrupted monitor step that reached the journal
+        # but not the CSV file; their jitter was not journaled
+        last = last_csv_row(csv_path)
+        try:
+            written_until = float(last[0])
+        except (TypeError, ValueError, IndexError):
+            written_until = -np.inf  # no file, or only the header
+        data = self.resume.samples
+        keep = ((data['flags'].astype(np.int64) & FLAG_MONITOR) != 0) & (data['time'] >= monitor_start) \
+            & (data['time'] > written_until)
+        return [(float(t), float(voltage), float(current), np.nan)
+                for t, voltage, current in zip(data['time'][keep], data['voltage'][keep],
+                                               data['measured_current'][keep])]
+
+    def _shutdown(self):
+        try:
+            self.pwr.write('CURR 0')
+            self.pwr.write('output off')
+        except Exception as e:
+            self.log(f"Error: could not switch the supply off ({e})")
+
+    def _save(self):
+        output = self.protocol.get('output')
+        sweep = self.samples.without(FLAG_MONITOR)
+        if not output or not sweep.any():
+            return
+        output_path = os.path.abspath(os.path.join(self.output_folder, output))
+        # Boolean indexing copies, so the export thread owns its data
+        columns = {SWEEP_COLUMNS[0]: self.samples.current[sweep],
+                   SWEEP_COLUMNS[1]: self.samples.measured_current[sweep],
+                   SWEEP_COLUMNS[2]: self.samples.voltage[sweep], SWEEP_COLUMNS[3]: self.samples.dwell[sweep]}
+        self.exports.append(save_columns_in_background(columns, output_path, self.log))
+        stem = os.path.splitext(output_path)[0]
+        ramp = (self.samples.flags & FLAG_RAMP) != 0
+        if ramp.any():
+            reverse = (self.samples.flags[ramp] & FLAG_REVERSE) != 0
+            columns = {RAMP_COLUMNS[0]: self.samples.time[ramp], RAMP_COLUMNS[1]: self.samples.current[ramp],
+                       RAMP_COLUMNS[2]: self.samples.measured_current[ramp],
+                       RAMP_COLUMNS[3]: self.samples.voltage[ramp],
+                       RAMP_COLUMNS[4]: np.where(reverse, 'backward', 'forward')}
+            self.exports.append(save_columns_in_background(columns, stem + "_ramp.xlsx", self.log))
+        if len(self.bursts):
+            self.exports.append(save_columns_in_background(self.bursts.summary_columns(),
+                                                           stem + "_bursts.xlsx", self.log))
+            self.exports.append(save_columns_in_background(self.bursts.raw_columns(),
+                                                           stem + "_bursts_raw.csv", self.log))
+        if len(self.transients):
+            transients = self.transients.columns('Sample')
+            columns = {'Sample': transients['Sample'], 'Time (s)': transients['time'],
+                       'Voltage (V)': transients['voltage']}
+            self.exports.append(save_columns_in_background(columns, stem + "_transients.csv", self.log))
+
+    def wait_for_exports(self, timeout=None):
+        for thread in self.exports:
+            thread.join(timeout)
+
+
+def restore_samples(samples, state):
+    # Loads the samples of a JournalState into a SampleBuffer in one go
+    data = state.samples
+    samples.extend(data['time'], data['current'], data['voltage'], data['dwell'], data['flags'],
+                   data['measured_current'])
+
+
+def _stepped(start, step, stop=None):
+    # start + step, start + 2 step, ... up to stop (inclusive), or without
+    # end when stop is None (the sweep then ends at the voltage limit)
+    i = 1
+    while True:
+        current = round(start + i * step, 6)
+        if stop is not None and current > stop + 1e-9:
+            return
+        yield current
+        i += 1
+
+
+def polarization_protocol(activation_time, voltage_limit, interval_time, current_start=0.0, current_step=0.25,
+                          current_list=None, stabilization=None, dwell=None, adaptive_grid=None, burst=None,
+                          transient=None, ramp=None):
+    if ramp is not None:
+        sweep = dict(ramp, type='ramp', start=current_start)
+    elif current_list:
+        sweep = {'type': 'sweep', 'currents': list(current_list), 'interval': interval_time}
+    elif adaptive_grid is not None:
+        sweep = {'type': 'sweep', 'start': current_start, 'adaptive': dict(adaptive_grid), 'interval': interval_time}
+    else:
+        sweep = {'type': 'sweep', 'start': current_start, 'step': current_step, 'interval': interval_time}
+    return {
+        'name': 'Polarization',
+        'voltage_limit': voltage_limit,
+        'stabilization': stabilization,
+        'dwell': dwell,
+        'burst': burst,
+        'transient': transient,
+        'output': 'output.xlsx',
+        'stop_message': "Measurement stopped by user.",
+        'steps': [
+            {'type': 'output', 'state': 'on'},
+            {'type': 'hold', 'current': 1.0, 'duration': activation_time, 'message': "Starting activation..."},
+            {'type': 'wait_stable', 'current': 0.01},
+            {'type': 'measure', 'current': current_start},
+            sweep,
+        ],
+    }
+
+
+def activation_protocol(activation_time, voltage_limit, num_cycles, interval_time, stabilization=None,
+                        dwell=None, adaptive_grid=None, burst=None, transient=None, ramp=None):
+    if ramp is not None:
+        sweep = dict(ramp, type='ramp', start=0.0)
+    elif adaptive_grid is not None:
+        sweep = {'type': 'sweep', 'start': 0.0, 'adaptive': dict(adaptive_grid), 'interval': interval_time}
+    else:
+        sweep = {'type': 'sweep', 'start': 0.0, 'step': 0.25, 'stop': 40.0, 'interval': interval_time}
+    return {
+        'name': 'Activation',
+        'voltage_limit': voltage_limit,
+        'stabilization': stabilization,
+        'dwell': dwell,
+        'burst': burst,
+        'transient': transient,
+        'output': 'activation_output.xlsx',
+        'start_message': "Starting activation cycles...",
+        'stop_message': "Activation stopped by user.",
+        'steps': [
+            {'type': 'output', 'state': 'on'},
+            {'type': 'cycle', 'count': num_cycles, 'steps': [
+                {'type': 'hold', 'current': 1.0, 'duration': activation_time,
+                 'message': "Cycle {cycle}/{count}: 1A Activating..."},
+                {'type': 'hold', 'current': 10.0, 'duration': activation_time,
+                 'message': "Cycle {cycle}/{count}: 10A Activating..."},
+            ]},
+            {'type': 'wait_stable', 'current': 0.01},
+            {'type': 'measure', 'current': 0.0},
+            sweep,
+        ],
+    }
+
+
+def stability_protocol(interval_time, input_current, voltage_limit, duration=None):
+    return {
+        'name': 'Stability',
+        'voltage_limit': voltage_limit,
+        'stop_message': "Stability test stopped by user.",
+        'steps': [
+            {'type': 'output', 'state': 'on'},
+            {'type': 'monitor', 'current': input_current, 'interval': interval_time, 'duration': duration,
+             'file': "stability_output.csv"},
+        ],
+    }
@@ -0,0 +1,77 @@
+import time
+
+
+class VoltageWatchdog:
+    # Checks every voltage reading against the limit and cuts the supply the
+    # moment one is at or above it. Waits go through sleep(), which keeps
+    # sampling at sample_rate, so an excursion during a long dwell is caught
+    # within one sample period plus the SCPI round trips instead of at the end
+    # of the dwell. It runs in the thread that owns the instrument session.
+    def __init__(self, pwr, voltage_limit, sample_rate=10.0, log=None):
+        self.pwr = pwr
+        self.voltage_limit = voltage_limit
+        self.sample_rate = sample_rate
+        self.log = log
+        self.tripped = False
+        self.trip_voltage = None
+        self.reaction_latency = None  # s, from the tripping sample to output off
+        self.samples = 0
+        self.last_sample = None  # monotonic time of the latest reading
+        self.last_voltage = None
+        # Called with (monotonic time, voltage) for every reading, e.g. to
+        # record step transients; must be quick, it runs in the sampling loop
+        self.on_reading = None
+
+    def read(self):
+        sample_start = time.monotonic()
+        return self.check(float(self.pwr.query('MEASure:VOLTage?')), sample_start)
+
+    def read_point(self):
+        # (voltage, measured current) in one transaction, for a recorded
+        # point; the voltage is checked like any other reading
+        sample_start = time.monotonic()
+        voltage, current = self.pwr.measure()
+        return self.check(voltage, sample_start), current
+
+    def check(self, voltage, sample_start):
+        # Applies the limit to a reading, also one taken elsewhere, e.g. in a
+        # combined set-and-measure transaction started at sample_start
+        self.last_sample = sample_start
+        self.last_voltage = voltage
+        self.samples += 1
+        if voltage >= self.voltage_limit and not self.tripped:
+            self._trip(voltage, sample_start)
+        if self.on_reading is not None:
+            self.on_reading(sample_start, voltage)
+        return voltage
+
+    def _trip(self, voltage, sample_start):
+        self.pwr.write('CURR 0')
+        self.pwr.write('output off')
+        self.tripped = True
+        self.trip_voltage = voltage
+        self.reaction_latency = time.monotonic() - sample_start
+        if self.log is not None:
+            self.log(f"Voltage limit exceeded ({voltage:.3f}V >= {self.voltage_limit:.3f}V). "
+                     f"Supply shut off {self.reaction_latency * 1000:.1f} ms after the sample "
+                     f"(sampling every {1000 / self.sample_rate:.0f} ms).")
+
+    def sleep(self, duration, should_continue=None):
+        # Waits for duration seconds while sampling; returns early when the
+        # limit trips or should_continue() returns False. A reading taken by
+        # the caller less than a period ago counts, so short waits between
+        # fast samples add no extra queries. Returns the last voltage read
+        # here, or None if no reading was due.
+        deadline = time.monotonic() + duration
+        period = 1.0 / self.sample_rate
+        voltage = None
+        while not self.tripped:
+            now = time.monotonic()
+            if now >= deadline or (should_continue is not None and not should_continue()):
+                break
+            if self.last_sample is None or now - self.last_sample >= period:
+                voltage = self.read()
+            delay = min(deadline, self.last_sample + period) - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        return voltage
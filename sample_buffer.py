@@ -0,0 +1,179 @@
+import numpy as np
+
+# Bits of the 'flags' column
+FLAG_LIMIT = 1  # reading at or above the voltage limit
+FLAG_LATE = 2  # taken after a missed sampling deadline
+FLAG_MONITOR = 4  # constant-current monitoring sample rather than a sweep point
+FLAG_RAMP = 8  # taken during a continuous current ramp
+FLAG_REVERSE = 16  # on the backward (decreasing) branch of a ramp
+
+COLUMNS = (
+    ('time', np.float64),  # s since the start of the run
+    ('current', np.float64),  # A, set current
+    ('voltage', np.float64),  # V, measured
+    ('dwell', np.float64),  # s spent at the step, NaN if not a sweep step
+    ('flags', np.uint8),
+    ('measured_current', np.float64),  # A, read back with the voltage, NaN if not read
+)
+
+
+class SampleBuffer:
+    # Columnar store of every sample of a run, shared by the acquisition
+    # thread (the only writer) and the GUI, plots and exporters, which read
+    # zero-copy NumPy views. Capacity doubles as needed, so appends are
+    # amortized O(1). A row is complete before the count that makes it
+    # visible is raised, and growth swaps in new arrays without touching the
+    # old ones, so readers never need a lock: a view taken earlier stays
+    # valid, it just does not see later rows.
+    def __init__(self, capacity=1024):
+        self._arrays = {name: np.empty(capacity, dtype=dtype) for name, dtype in COLUMNS}
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def capacity(self):
+        return len(self._arrays['time'])
+
+    def append(self, t, current, voltage, dwell=np.nan, flags=0, measured_current=np.nan):
+        n = self._count
+        arrays = self._arrays
+        if n == len(arrays['time']):
+            arrays = self._grow(max(1, 2 * n))
+        arrays['time'][n] = t
+        arrays['current'][n] = current
+        arrays['voltage'][n] = voltage
+        arrays['dwell'][n] = np.nan if dwell is None else dwell
+        arrays['flags'][n] = flags
+        arrays['measured_current'][n] = measured_current
+        self._count = n + 1
+
+    def extend(self, t, current, voltage, dwell, flags, measured_current):
+        # Bulk append of equally long arrays, e.g. when restoring a run
+        n = self._count
+        end = n + len(t)
+        arrays = self._arrays
+        if end > len(arrays['time']):
+            arrays = self._grow(max(end, 2 * n))
+        arrays['time'][n:end] = t
+        arrays['current'][n:end] = current
+        arrays['voltage'][n:end] = voltage
+        arrays['dwell'][n:end] = dwell
+        arrays['flags'][n:end] = flags
+        arrays['measured_current'][n:end] = measured_current
+        self._count = end
+
+    def _grow(self, capacity):
+        n = self._count
+        grown = {}
+        for name, dtype in COLUMNS:
+            grown[name] = np.empty(capacity, dtype=dtype)
+            grown[name][:n] = self._arrays[name][:n]
+        self._arrays = grown
+        return grown
+
+    def clear(self):
+        # Writer side only, before a new run
+        self._count = 0
+
+    def view(self, name, start=0, stop=None):
+        count = self._count
+        stop = count if stop is None else min(stop, count)
+        return self._arrays[name][start:stop]
+
+    @property
+    def time(self):
+        return self.view('time')
+
+    @property
+    def current(self):
+        return self.view('current')
+
+    @property
+    def voltage(self):
+        return self.view('voltage')
+
+    @property
+    def dwell(self):
+        return self.view('dwell')
+
+    @property
+    def flags(self):
+        return self.view('flags')
+
+    @property
+    def measured_current(self):
+        return self.view('measured_current')
+
+    def last(self):
+        # (time, current, voltage, dwell, flags, measured_current) of the newest
+        # row, or None
+        n = self._count
+        if n == 0:
+            return None
+        arrays = self._arrays
+        return tuple(arrays[name][n - 1] for name, _ in COLUMNS)
+
+    def without(self, flag):
+        # Boolean mask of the rows that do not have flag set
+        return (self.flags & flag) == 0
+
+    def nbytes(self):
+        return sum(array.nbytes for array in self._arrays.values())
+
+
+class SegmentStore:
+    # Variable-length groups of rows, e.g. the raw readings of each burst,
+    # in flat columns that grow like SampleBuffer's, plus the key and first
+    # row of every group. Written by one thread; groups are added whole.
+    def __init__(self, columns, capacity=1024):
+        self._dtypes = columns
+        self._arrays = {name: np.empty(capacity, dtype=dtype) for name, dtype in columns}
+        self._rows = 0
+        self._keys = []
+        self._starts = []
+
+    def __len__(self):
+        return len(self._keys)
+
+    @property
+    def rows(self):
+        return self._rows
+
+    @property
+    def keys(self):
+        return np.asarray(self._keys, dtype=np.int64)
+
+    @property
+    def capacity(self):
+        return len(self._arrays[self._dtypes[0][0]])
+
+    def add(self, key, **values):
+        start = self._rows
+        end = start + len(values[self._dtypes[0][0]])
+        if end > self.capacity:
+            capacity = max(end, 2 * self.capacity)
+            for name, dtype in self._dtypes:
+                grown = np.empty(capacity, dtype=dtype)
+                grown[:start] = self._arrays[name][:start]
+                self._arrays[name] = grown
+        for name, _ in self._dtypes:
+            self._arrays[name][start:end] = values[name]
+        self._starts.append(start)
+        self._keys.append(key)
+        self._rows = end
+
+    def segment(self, index):
+        # Views of the rows of the index-th group
+        start = self._starts[index]
+        stop = self._starts[index + 1] if index + 1 < len(self._starts) else self._rows
+        return {name: self._arrays[name][start:stop] for name, _ in self._dtypes}
+
+    def columns(self, key_name='key'):
+        # Copies of all rows, with each group's key repeated on its rows
+        lengths = np.diff(np.append(self._starts, self._rows)).astype(np.int64)
+        columns = {key_name: np.repeat(self.keys, lengths)}
+        for name, _ in self._dtypes:
+            columns[name] = self._arrays[name][:self._rows].copy()
+        return columns
@@ -0,0 +1,89 @@
+import math
+import time
+
+
+class DeadlineScheduler:
+    # Paces a sampling loop on absolute deadlines start + k * interval of the
+    # monotonic clock. Time spent on SCPI queries, saving and logging is
+    # absorbed by the next wait instead of adding to the period, so the
+    # sample times do not drift, and any fractional interval works. Deadlines
+    # that have already passed completely are skipped (and counted) rather
+    # than sampled in a burst. An interval of 0 samples back to back.
+    def __init__(self, interval, late_tolerance=None, clock=time.monotonic):
+        if interval < 0:
+            raise ValueError("Interval must not be negative")
+        self.interval = interval
+        # A wake-up later than this counts as a missed deadline
+        self.late_tolerance = late_tolerance if late_tolerance is not None else min(0.1 * interval, 0.05)
+        self.clock = clock
+        self.start_time = None
+        self.index = 0
+        self.last_jitter = 0.0  # s, how late the latest wake-up was
+        self.samples = 0
+        self.late = 0
+        self.skipped = 0
+        self._jitter_sum = 0.0
+        self._jitter_sq_sum = 0.0
+        self.max_jitter = 0.0
+
+    def start(self):
+        self.start_time = self.clock()
+        self.index = 0
+        return self.start_time
+
+    def elapsed(self):
+        return self.clock() - self.start_time
+
+    def next_offset(self):
+        # Scheduled time of the next sample, relative to start
+        if self.interval == 0:
+            return self.elapsed()
+        return (self.index + 1) * self.interval
+
+    def wait(self, sleep=time.sleep):
+        # Sleeps until the next deadline with sleep(seconds) and returns its
+        # scheduled offset from start. sleep may return early (e.g. the run was
+        # stopped); the caller checks its own flags after waiting.
+        self.index += 1
+        if self.interval == 0:
+            self._record(0.0)
+            return self.elapsed()
+        now = self.clock()
+        due = int(math.floor((now - self.start_time) / self.interval))
+        if due > self.index:
+            self.skipped += due - self.index
+            self.index = due
+        deadline = self.start_time + self.index * self.interval
+        if deadline > now:
+            sleep(deadline - now)
+        self._record(max(0.0, self.clock() - deadline))
+        return self.index * self.interval
+
+    def _record(self, jitter):
+        self.last_jitter = jitter
+        self.samples += 1
+        self._jitter_sum += jitter
+        self._jitter_sq_sum += jitter * jitter
+        self.max_jitter = max(self.max_jitter, jitter)
+        if jitter > self.late_tolerance:
+            self.late += 1
+
+    def stats(self):
+        n = self.samples
+        mean = self._jitter_sum / n if n else 0.0
+        variance = max(0.0, self._jitter_sq_sum / n - mean * mean) if n else 0.0
+        return {
+            'interval': self.interval,
+            'samples': n,
+            'mean_jitter': mean,
+            'std_jitter': math.sqrt(variance),
+            'max_jitter': self.max_jitter,
+            'late': self.late,
+            'skipped': self.skipped,
+        }
+
+    def summary(self):
+        s = self.stats()
+        return (f"Sampling every {s['interval']:g}s: jitter mean {s['mean_jitter'] * 1000:.1f} ms, "
+                f"std {s['std_jitter'] * 1000:.1f} ms, max {s['max_jitter'] * 1000:.1f} ms; "
+                f"{s['late']} late, {s['skipped']} skipped deadlines")
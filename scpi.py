@@ -0,0 +1,183 @@
+import json
+import time
+
+import numpy as np
+
+# Upper edges of the latency histogram bins: 10 per decade from 0.1 ms to 10 s
+LATENCY_BINS = 10.0 ** np.arange(-4.0, 1.05, 0.1)
+
+# Reads a recorded point: the voltage and the current actually delivered
+MEASURE_COMMANDS = ['MEASure:VOLTage?', 'MEASure:CURRent?']
+MEASURE_MESSAGE = ';:'.join(MEASURE_COMMANDS)
+
+
+def command_key(command):
+    # 'CURR 1.5;:MEAS:VOLT?' -> 'CURR;MEAS:VOLT?', the name latencies are filed under
+    parts = [part.strip().lstrip(':').split(' ', 1)[0].upper() for part in command.split(';')]
+    return ';'.join(part for part in parts if part)
+
+
+class LatencyHistogram:
+    # Round-trip times of one kind of command
+    def __init__(self):
+        self.counts = np.zeros(len(LATENCY_BINS) + 1, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, seconds):
+        self.counts[np.searchsorted(LATENCY_BINS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q):
+        # Estimated from the histogram, interpolating log-linearly in the bin
+        if not self.count:
+            return 0.0
+        cumulative = np.cumsum(self.counts)
+        target = q / 100.0 * self.count
+        index = int(np.searchsorted(cumulative, target))
+        lower = LATENCY_BINS[index - 1] if index > 0 else self.min
+        upper = LATENCY_BINS[index] if index < len(LATENCY_BINS) else self.max
+        below = cumulative[index - 1] if index > 0 else 0
+        fraction = (target - below) / self.counts[index] if self.counts[index] else 1.0
+        value = lower * (upper / lower) ** fraction if lower > 0 else upper
+        return float(min(max(value, self.min), self.max))
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'mean_s': self.mean,
+            'min_s': self.min,
+            'max_s': self.max,
+            'p50_s': self.percentile(50),
+            'p95_s': self.percentile(95),
+            'p99_s': self.percentile(99),
+            'bin_upper_edges_s': [float(edge) for edge in LATENCY_BINS] + [None],
+            'bin_counts': [int(n) for n in self.counts],
+        }
+
+
+class InstrumentIO:
+    # SCPI layer between the engine and an instrument session. Every write
+    # and query is timed into a per-command LatencyHistogram. transaction()
+    # sends several commands as one ';:'-joined message, so e.g. setting the
+    # current and reading back the voltage and current cost one USB round
+    # trip instead of three. check_pipelining() tries the combined read-only
+    # query of measure() once before the run; if the supply does not answer
+    # it, pipelining is switched off and the commands are sent one by one.
+    # The same happens if a combined message fails later on.
+    def __init__(self, session, pipelining=True, log=None):
+        self.session = session
+        self.pipelining = pipelining
+        self.log = log
+        self.latency = {}
+        self.round_trips = 0
+
+    def write(self, command):
+        start = time.perf_counter()
+        result = self.session.write(command)
+        self._record(command, start)
+        return result
+
+    def query(self, command):
+        start = time.perf_counter()
+        response = self.session.query(command)
+        self._record(command, start)
+        return response
+
+    def close(self):
+        self.session.close()
+
+    def check_pipelining(self):
+        # Sends the combined voltage and current query of measure(), which
+        # changes nothing on the supply. Bypasses the session's
+        # reconnect-and-retry, so a supply that lets combined messages time
+        # out is not reopened for it.
+        if not self.pipelining:
+            return False
+        query = getattr(self.session, 'query_without_retry', self.session.query)
+        start = time.perf_counter()
+        try:
+            responses = query(MEASURE_MESSAGE).strip().split(';')
+            reason = None if len(responses) == 2 else f"expected 2 responses, got {len(responses)}"
+        except Exception as e:
+            reason = str(e) or type(e).__name__
+        self._record(MEASURE_MESSAGE, start)
+        if reason is not None:
+            self.pipelining = False
+            if self.log is not None:
+                self.log(f"Combined SCPI commands not supported ({reason}); sending them one by one.")
+            try:
+                self.write('*CLS')  # drop the error the probe may have queued
+            except Exception:
+                pass
+        return self.pipelining
+
+    def transaction(self, commands):
+        # Sends commands in order and returns the responses of the queries
+        # among them, as stripped strings
+        queries = sum(1 for command in commands if command.rstrip().endswith('?'))
+        if self.pipelining and len(commands) > 1:
+            message = ';:'.join(command.strip().lstrip(':') for command in commands)
+            try:
+                if queries:
+                    responses = [value.strip() for value in self.query(message).strip().split(';')]
+                else:
+                    self.write(message)
+                    responses = []
+                if len(responses) == queries:
+                    return responses
+                reason = f"expected {queries} responses, got {len(responses)}"
+            except Exception as e:
+                reason = str(e)
+            self.pipelining = False
+            if self.log is not None:
+                self.log(f"Combined SCPI commands not supported ({reason}); sending them one by one.")
+        responses = []
+        for command in commands:
+            if command.rstrip().endswith('?'):
+                responses.append(self.query(command).strip())
+            else:
+                self.write(command)
+        return responses
+
+    def set_and_measure(self, current):
+        # Sets the current and reads (voltage, current) right after it
+        voltage, measured = self.transaction([f'CURR {current}'] + MEASURE_COMMANDS)
+        return float(voltage), float(measured)
+
+    def measure(self):
+        # (voltage, current) as measured by the supply, in one transaction
+        voltage, measured = self.transaction(MEASURE_COMMANDS)
+        return float(voltage), float(measured)
+
+    def _record(self, command, start):
+        elapsed = time.perf_counter() - start
+        self.round_trips += 1
+        key = command_key(command)
+        histogram = self.latency.get(key)
+        if histogram is None:
+            histogram = self.latency[key] = LatencyHistogram()
+        histogram.add(elapsed)
+
+    def summary_lines(self):
+        lines = [f"SCPI: {self.round_trips} round trips"
+                 f"{', pipelined' if self.pipelining else ''}"]
+        for key, histogram in sorted(self.latency.items(), key=lambda item: -item[1].total):
+            lines.append(f"  {key:24s} n={histogram.count:6d} mean {histogram.mean * 1000:7.2f} ms, "
+                         f"p50 {histogram.percentile(50) * 1000:7.2f} ms, p99 {histogram.percentile(99) * 1000:7.2f} ms, "
+                         f"max {histogram.max * 1000:7.2f} ms")
+        return lines
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'round_trips': self.round_trips, 'pipelining': self.pipelining,
+                       'commands': {key: h.as_dict() for key, h in self.latency.items()}}, f, indent=2)
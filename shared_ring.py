@@ -0,0 +1,86 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from sample_buffer import COLUMNS
+
+HEADER_BYTES = 8  # int64 number of rows ever written
+DEFAULT_CAPACITY = 65536
+
+
+class SharedSampleRing:
+    # Fixed-size ring of samples in shared memory with the columns of
+    # SampleBuffer. The acquisition process is the only writer; the GUI
+    # process maps the same block and reads it without any locking or
+    # pickling. The writer fills a row before it raises the row count in the
+    # header. A reader copies the rows after its cursor and checks the count
+    # again afterwards, so rows overwritten during the copy are dropped, never
+    # returned torn. The ring is created (and unlinked) by the reader; the
+    # writer attaches to it by name.
+    def __init__(self, name=None, capacity=DEFAULT_CAPACITY):
+        row_bytes = sum(np.dtype(dtype).itemsize for _, dtype in COLUMNS)
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=HEADER_BYTES + capacity * row_bytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self.capacity = capacity
+        self._count = np.ndarray((1,), dtype=np.int64, buffer=self.shm.buf)
+        if self.owner:
+            self._count[0] = 0
+        self._arrays = {}
+        offset = HEADER_BYTES
+        for column, dtype in COLUMNS:
+            array = np.ndarray((capacity,), dtype=dtype, buffer=self.shm.buf, offset=offset)
+            # Only the acquisition side may write samples
+            array.flags.writeable = not self.owner
+            self._arrays[column] = array
+            offset += array.nbytes
+        self.dropped = 0  # rows the reader lost because it fell a full ring behind
+
+    def __len__(self):
+        return int(self._count[0])
+
+    def append(self, t, current, voltage, dwell=np.nan, flags=0, measured_current=np.nan):
+        n = int(self._count[0])
+        i = n % self.capacity
+        arrays = self._arrays
+        arrays['time'][i] = t
+        arrays['current'][i] = current
+        arrays['voltage'][i] = voltage
+        arrays['dwell'][i] = np.nan if dwell is None else dwell
+        arrays['flags'][i] = flags
+        arrays['measured_current'][i] = measured_current
+        self._count[0] = n + 1
+
+    def read(self, cursor):
+        # Copies of the rows written since cursor, as a dict of columns, and
+        # the cursor for the next call
+        count = int(self._count[0])
+        start = max(cursor, count - self.capacity)
+        rows = {column: self._copy(array, start, count) for column, array in self._arrays.items()}
+        # Rows the writer may have overwritten while they were being copied,
+        # including the one it may be filling right now (its count is only
+        # raised once the row is complete)
+        overrun = int(self._count[0]) + 1 - self.capacity - start
+        if overrun > 0:
+            rows = {column: values[overrun:] for column, values in rows.items()}
+            start += overrun
+        self.dropped += start - cursor
+        # If even rows after count were overwritten, the next read starts
+        # past them, so they are not counted as dropped twice
+        return rows, max(count, start)
+
+    def _copy(self, array, start, stop):
+        i, j = start % self.capacity, stop % self.capacity
+        if stop - start == self.capacity or (j < i and stop > start):
+            return np.concatenate((array[i:], array[:j]))
+        return array[i:i + stop - start].copy()
+
+    def close(self):
+        self._count = None
+        self._arrays = {}
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
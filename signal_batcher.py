@@ -0,0 +1,67 @@
+import threading
+from collections import deque
+
+import numpy as np
+
+
+class SampleBatcher:
+    # Thread-safe hand-off between an acquisition thread and the GUI. The
+    # worker pushes single samples and log lines; the GUI drains everything
+    # accumulated since the last refresh tick as one batch.
+    def __init__(self, max_log_lines=1000):
+        self._lock = threading.Lock()
+        self._xs = []
+        self._ys = []
+        self._logs = deque(maxlen=max_log_lines)
+        self.points_pushed = 0
+        self.points_delivered = 0
+        self.point_frames = 0
+        self.logs_pushed = 0
+        self.logs_dropped = 0
+        self.frames = 0
+
+    def push_point(self, x, y):
+        with self._lock:
+            self._xs.append(x)
+            self._ys.append(y)
+            self.points_pushed += 1
+
+    def push_log(self, line):
+        with self._lock:
+            # a full backlog drops the oldest line rather than growing forever
+            if len(self._logs) == self._logs.maxlen:
+                self.logs_dropped += 1
+            self._logs.append(line)
+            self.logs_pushed += 1
+
+    def drain(self):
+        with self._lock:
+            xs, ys = self._xs, self._ys
+            self._xs, self._ys = [], []
+            logs = list(self._logs)
+            self._logs.clear()
+        if xs:
+            self.point_frames += 1
+            self.points_delivered += len(xs)
+        if xs or logs:
+            self.frames += 1
+        return np.asarray(xs, dtype=float), np.asarray(ys, dtype=float), logs
+
+    @property
+    def points_coalesced(self):
+        # points that arrived in a frame together with an earlier point
+        return self.points_delivered - self.point_frames
+
+    def stats(self):
+        return {
+            'points_pushed': self.points_pushed,
+            'points_delivered': self.points_delivered,
+            'points_coalesced': self.points_coalesced,
+            'logs_pushed': self.logs_pushed,
+            'logs_dropped': self.logs_dropped,
+            'frames': self.frames,
+        }
+
+    def summary(self):
+        return (f"GUI updates: {self.points_delivered} points in {self.point_frames} frames "
+                f"({self.points_coalesced} coalesced), {self.logs_dropped} log lines dropped")
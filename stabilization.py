@@ -0,0 +1,70 @@
+import time
+from collections import deque
+
+import numpy as np
+
+
+class StabilizationDetector:
+    # Decides whether the cell voltage has settled from a sliding window of
+    # readings: the least-squares slope (dV/dt) and the scatter around that
+    # fit must both be below their thresholds over a full window.
+    def __init__(self, window=30.0, max_slope=5e-5, max_noise=2e-3, min_samples=5):
+        self.window = window  # s
+        self.max_slope = max_slope  # V/s
+        self.max_noise = max_noise  # V, standard deviation of the residuals
+        self.min_samples = min_samples
+        self._samples = deque()
+
+    def reset(self):
+        self._samples.clear()
+
+    def add(self, t, voltage):
+        self._samples.append((t, voltage))
+        while self._samples and t - self._samples[0][0] > self.window:
+            self._samples.popleft()
+
+    def statistics(self):
+        # Returns (slope V/s, noise V) over the current window, or None
+        if len(self._samples) < self.min_samples:
+            return None
+        data = np.asarray(self._samples)
+        t = data[:, 0] - data[0, 0]
+        v = data[:, 1]
+        if t[-1] <= 0:
+            return None
+        slope, intercept = np.polyfit(t, v, 1)
+        noise = float(np.std(v - (slope * t + intercept)))
+        return float(slope), noise
+
+    def is_stable(self):
+        if not self._samples or self._samples[-1][0] - self._samples[0][0] < 0.9 * self.window:
+            return False
+        stats = self.statistics()
+        if stats is None:
+            return False
+        slope, noise = stats
+        return abs(slope) <= self.max_slope and noise <= self.max_noise
+
+
+def wait_until_stable(read_voltage, detector, sample_period=1.0, timeout=None, should_continue=None, min_time=0.0):
+    # Samples read_voltage() every sample_period seconds until the detector
+    # reports a stable voltage (not before min_time), the timeout expires or
+    # should_continue() returns False. Returns (last voltage, elapsed s,
+    # reason) where reason is 'stable', 'timeout' or 'interrupted'.
+    detector.reset()
+    start = time.monotonic()
+    voltage = None
+    while True:
+        now = time.monotonic()
+        voltage = read_voltage()
+        detector.add(now - start, voltage)
+        elapsed = now - start
+        if elapsed >= min_time and detector.is_stable():
+            return voltage, elapsed, 'stable'
+        if timeout is not None and elapsed >= timeout:
+            return voltage, elapsed, 'timeout'
+        deadline = now + sample_period
+        while time.monotonic() < deadline:
+            if should_continue is not None and not should_continue():
+                return voltage, time.monotonic() - start, 'interrupted'
+            time.sleep(min(0.1, max(0.0, deadline - time.monotonic())))
@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the top of the repository, next to this folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from instrument import SimulatedSupply
+
+
+@pytest.fixture
+def supply():
+    # Simulated cell without latency, noise or transient, so runs are fast
+    # and readings follow the polarization curve exactly
+    return SimulatedSupply(latency=0.0, noise=0.0, time_constant=0.0, seed=1)
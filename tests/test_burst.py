@@ -0,0 +1,90 @@
+import csv
+import os
+
+import numpy as np
+import pytest
+
+from burst import BurstRecorder, robust_summary, validate_burst
+from instrument import SimulatedSupply
+from protocol import ProtocolEngine
+
+READINGS = [1.00, 1.01, 0.99, 1.02, 0.98, 1.00, 1.01, 0.99, 1.00, 2.00]
+
+
+def test_robust_summary_rejects_the_spike():
+    summary, outliers = robust_summary(READINGS)
+    assert summary['n'] == 10
+    assert summary['median'] == pytest.approx(1.0)
+    assert summary['mean'] == pytest.approx(1.1)
+    assert summary['std'] == pytest.approx(np.std(READINGS, ddof=1))
+    assert list(outliers) == [False] * 9 + [True]
+    assert summary['outliers'] == 1
+    assert summary['clipped_mean'] == pytest.approx(1.0)
+    # 10 % trimmed: the lowest and the highest reading are left out
+    assert summary['trimmed_mean'] == pytest.approx(np.mean(sorted(READINGS)[1:-1]))
+
+
+def test_equal_readings_have_no_outliers():
+    summary, outliers = robust_summary([1.5] * 6 + [1.6, 1.7])
+    assert not outliers.any()
+    assert summary['clipped_mean'] == pytest.approx(summary['mean'])
+
+
+def test_single_reading():
+    summary, outliers = robust_summary([1.7])
+    assert summary['std'] == 0.0
+    assert summary['trimmed_mean'] == summary['clipped_mean'] == 1.7
+
+
+def test_validate_burst():
+    validate_burst(None)
+    validate_burst({'samples': 5, 'estimator': 'median', 'trim': 0.2})
+    with pytest.raises(ValueError):
+        validate_burst({'estimator': 'mode'})
+    with pytest.raises(ValueError):
+        validate_burst({'trim': 0.5})
+
+
+def test_recorder_columns():
+    recorder = BurstRecorder()
+    for sample, current in ((0, 0.5), (1, 1.0)):
+        summary, outliers = robust_summary(READINGS)
+        recorder.add(sample, current, summary['trimmed_mean'], np.arange(10) * 0.1, READINGS, summary, outliers)
+    assert len(recorder) == 2
+    summary = recorder.summary_columns()
+    assert list(summary['Current (A)']) == [0.5, 1.0]
+    assert list(summary['Outliers']) == [1, 1]
+    raw = recorder.raw_columns()
+    assert list(raw['Sample']) == [0] * 10 + [1] * 10
+    assert list(raw['Outlier']).count(True) == 2
+
+
+def test_sweep_records_a_burst_per_point(tmp_path):
+    supply = SimulatedSupply(latency=0.0, noise=0.002, time_constant=0.0, seed=3)
+    protocol = {
+        'name': 'Sweep',
+        'voltage_limit': 3.0,
+        'output': "sweep.xlsx",
+        'burst': {'samples': 8, 'period': 0.001, 'estimator': 'median'},
+        'steps': [
+            {'type': 'output', 'state': 'on'},
+            {'type': 'sweep', 'interval': 0.01, 'currents': [1.0, 2.0, 3.0]},
+        ],
+    }
+    engine = ProtocolEngine(supply, protocol, str(tmp_path), log=lambda message: None)
+    engine.run()
+    engine.wait_for_exports()
+    assert engine.error is None
+    assert len(engine.samples) == 3
+    summary = engine.bursts.summary
+    assert summary['sample'] == [0, 1, 2]
+    assert summary['n'] == [8, 8, 8]
+    # The recorded voltage is the estimator of the burst, and its current
+    # the mean of the measured currents
+    np.testing.assert_allclose(engine.samples.voltage, summary['median'])
+    np.testing.assert_allclose(engine.samples.measured_current, [1.0, 2.0, 3.0])
+    assert os.path.exists(tmp_path / "sweep_bursts.xlsx")
+    with open(tmp_path / "sweep_bursts_raw.csv", newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['Sample', 'Time (s)', 'Voltage (V)', 'Outlier']
+    assert len(rows) == 1 + 3 * 8
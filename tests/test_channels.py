@@ -0,0 +1,83 @@
+import csv
+import os
+import threading
+
+import pytest
+
+from instrument import SIMULATOR_SETTINGS, DeviceBusyError, SessionPool
+from protocol import ProtocolEngine
+
+CURRENTS = [0.5, 1.0, 2.0, 4.0]
+
+
+def sweep_protocol():
+    return {
+        'name': 'Sweep',
+        'voltage_limit': 3.0,
+        'stream': "sweep.csv",
+        'steps': [
+            {'type': 'output', 'state': 'on'},
+            {'type': 'sweep', 'interval': 0.02, 'currents': CURRENTS},
+        ],
+    }
+
+
+@pytest.fixture
+def fast_simulator(monkeypatch):
+    # The pool opens simulated devices with the global simulator settings
+    for key, value in (('latency', 0.0), ('noise', 0.0), ('time_constant', 0.0)):
+        monkeypatch.setitem(SIMULATOR_SETTINGS, key, value)
+
+
+def test_channels_run_concurrently_on_their_own_devices(tmp_path, fast_simulator):
+    pool = SessionPool()
+    engines = []
+    owners = []
+    for channel in range(3):
+        folder = tmp_path / f"channel_{channel + 1}"
+        folder.mkdir()
+        owner = object()
+        pwr = pool.acquire(f"SIM::CELL{channel}::INSTR", owner)
+        owners.append(owner)
+        engines.append(ProtocolEngine(pwr, sweep_protocol(), str(folder), log=lambda message: None))
+    threads = [threading.Thread(target=engine.run) for engine in engines]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    try:
+        for engine in engines:
+            assert engine.error is None
+            assert list(engine.samples.current) == CURRENTS
+            with open(os.path.join(engine.output_folder, "sweep.csv"), newline='') as f:
+                rows = list(csv.reader(f))
+            assert len(rows) == len(CURRENTS) + 1
+            assert [float(row[1]) for row in rows[1:]] == CURRENTS
+    finally:
+        for channel, owner in enumerate(owners):
+            pool.release(f"SIM::CELL{channel}::INSTR", owner)
+        pool.close_all()
+
+
+def test_device_has_one_owner_at_a_time():
+    pool = SessionPool()
+    first, second = object(), object()
+    pool.acquire("SIM::CELL::INSTR", first)
+    with pytest.raises(DeviceBusyError):
+        pool.acquire("SIM::CELL::INSTR", second)
+    # Only the owner can release the device
+    pool.release("SIM::CELL::INSTR", second)
+    assert pool.owner("SIM::CELL::INSTR") is first
+    pool.release("SIM::CELL::INSTR", first)
+    pool.acquire("SIM::CELL::INSTR", second)
+    assert pool.owner("SIM::CELL::INSTR") is second
+    pool.close_all()
+
+
+def test_session_stays_open_between_owners(fast_simulator):
+    pool = SessionPool()
+    first, second = object(), object()
+    session = pool.acquire("SIM::CELL::INSTR", first).session
+    pool.release("SIM::CELL::INSTR", first)
+    assert pool.acquire("SIM::CELL::INSTR", second).session is session
+    pool.close_all()
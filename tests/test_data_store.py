@@ -0,0 +1,113 @@
+import csv
+import os
+import tempfile
+
+import data_store
+from data_store import AsyncCsvWriter, ChunkedCsvStore
+
+COLUMNS = ['Time (s)', 'Voltage (V)']
+
+
+def read_rows(path):
+    with open(path, newline='') as f:
+        return list(csv.reader(f))
+
+
+def write_rows(writer, count):
+    for i in range(count):
+        writer.append((i, 1.5))
+    assert writer.close(5)
+
+
+class FlakyStore(ChunkedCsvStore):
+    # Fails the first `failures` flushes, like a file briefly locked by Excel
+    failures = 0
+
+    def flush(self):
+        if FlakyStore.failures > 0:
+            FlakyStore.failures -= 1
+            raise PermissionError("locked")
+        return super().flush()
+
+
+class LockedStore(ChunkedCsvStore):
+    # The requested file can never be written
+    locked = None
+
+    def flush(self):
+        if self.path == LockedStore.locked:
+            raise PermissionError("locked")
+        return super().flush()
+
+
+def test_rows_are_written_in_order(tmp_path):
+    path = str(tmp_path / "data.csv")
+    writer = AsyncCsvWriter(path, COLUMNS, flush_interval=0.01)
+    write_rows(writer, 1000)
+    rows = read_rows(path)
+    assert rows[0] == COLUMNS
+    assert [int(row[0]) for row in rows[1:]] == list(range(1000))
+    assert writer.rows_written == writer.rows_queued == 1000
+    assert writer.retry_count == 0 and not writer.fallback_active
+
+
+def test_append_mode_keeps_existing_rows(tmp_path):
+    path = str(tmp_path / "data.csv")
+    write_rows(AsyncCsvWriter(path, COLUMNS, flush_interval=0.0), 3)
+    write_rows(AsyncCsvWriter(path, COLUMNS, 'a', flush_interval=0.0), 2)
+    rows = read_rows(path)
+    assert rows[0] == COLUMNS
+    assert len(rows) == 6
+
+
+def test_failed_write_is_retried(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_store, 'ChunkedCsvStore', FlakyStore)
+    monkeypatch.setattr(FlakyStore, 'failures', 2)
+    path = str(tmp_path / "data.csv")
+    writer = AsyncCsvWriter(path, COLUMNS, flush_interval=0.0, retries=3, retry_delay=0.0)
+    write_rows(writer, 5)
+    assert writer.retry_count == 2
+    assert not writer.fallback_active
+    # The rows of the failed batch are written once, not duplicated
+    assert [int(row[0]) for row in read_rows(path)[1:]] == list(range(5))
+
+
+def test_unwritable_file_falls_back_to_a_sibling(tmp_path, monkeypatch):
+    path = str(tmp_path / "data.csv")
+    monkeypatch.setattr(data_store, 'ChunkedCsvStore', LockedStore)
+    monkeypatch.setattr(LockedStore, 'locked', path)
+    messages = []
+    writer = AsyncCsvWriter(path, COLUMNS, flush_interval=0.0, retries=1, retry_delay=0.0, log=messages.append)
+    write_rows(writer, 4)
+    assert writer.fallback_active
+    assert writer.path != path
+    assert os.path.dirname(writer.path) == str(tmp_path)
+    assert os.path.basename(writer.path).startswith("data_")
+    assert writer.rows_written == 4
+    rows = read_rows(writer.path)
+    assert rows[0] == COLUMNS
+    assert [int(row[0]) for row in rows[1:]] == list(range(4))
+    assert any(writer.path in message for message in messages)
+    assert writer.path in writer.summary()
+
+
+def test_unwritable_folder_falls_back_to_temp(tmp_path, monkeypatch):
+    temp = tmp_path / "temp"
+    temp.mkdir()
+    monkeypatch.setattr(tempfile, 'tempdir', str(temp))
+    path = str(tmp_path / "missing" / "data.csv")
+    writer = AsyncCsvWriter(path, COLUMNS, flush_interval=0.0, retries=0, retry_delay=0.0)
+    write_rows(writer, 3)
+    assert writer.fallback_active
+    assert os.path.dirname(writer.path) == str(temp)
+    assert len(read_rows(writer.path)) == 4
+
+
+def test_rows_are_reported_lost_when_nothing_can_be_written(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, 'tempdir', str(tmp_path / "missing_temp"))
+    messages = []
+    writer = AsyncCsvWriter(str(tmp_path / "missing" / "data.csv"), COLUMNS, flush_interval=0.0, retries=0,
+                            retry_delay=0.0, log=messages.append)
+    write_rows(writer, 2)
+    assert writer.rows_written == 0
+    assert "rows lost" in messages[-1]
@@ -0,0 +1,76 @@
+import json
+
+from job_queue import DONE, FAILED, INTERRUPTED, PENDING, RUNNING, JobQueue
+
+
+def test_queue_survives_a_restart(tmp_path):
+    path = str(tmp_path / "job_queue.json")
+    queue = JobQueue(path)
+    first = queue.add("SIM::A::INSTR", "Activation", {'num_cycles': 3})
+    second = queue.add("SIM::A::INSTR", "Polarization", {'interval_time': 5})
+    reloaded = JobQueue(path)
+    assert [job['id'] for job in reloaded.jobs] == [first['id'], second['id']]
+    assert reloaded.get(first['id'])['params'] == {'num_cycles': 3}
+    # Ids keep counting after a restart
+    assert reloaded.add("SIM::A::INSTR", "Stability", {})['id'] == second['id'] + 1
+    assert not (tmp_path / "job_queue.json.tmp").exists()
+
+
+def test_running_job_is_reloaded_as_interrupted(tmp_path):
+    path = str(tmp_path / "job_queue.json")
+    queue = JobQueue(path)
+    job = queue.add("SIM::A::INSTR", "Stability", {})
+    queue.mark_started(job, str(tmp_path / "run"))
+    reloaded = JobQueue(path)
+    job = reloaded.get(job['id'])
+    assert job['status'] == INTERRUPTED
+    assert job['finished'] is not None
+    # and the change is written back
+    with open(path, encoding='utf-8') as f:
+        assert json.load(f)['jobs'][0]['status'] == INTERRUPTED
+
+
+def test_jobs_of_a_device_run_in_order(tmp_path):
+    queue = JobQueue(str(tmp_path / "job_queue.json"))
+    a1 = queue.add("SIM::A::INSTR", "Activation", {})
+    b1 = queue.add("SIM::B::INSTR", "Stability", {})
+    a2 = queue.add("SIM::A::INSTR", "Polarization", {})
+    assert queue.devices() == ["SIM::A::INSTR", "SIM::B::INSTR"]
+    assert queue.next_pending("SIM::A::INSTR") is a1
+    queue.mark_started(a1, "a1")
+    # One job per device at a time, devices are independent
+    assert queue.next_pending("SIM::A::INSTR") is None
+    assert queue.next_pending("SIM::B::INSTR") is b1
+    queue.mark_finished(a1, DONE)
+    assert queue.next_pending("SIM::A::INSTR") is a2
+
+
+def test_move_retry_and_remove(tmp_path):
+    queue = JobQueue(str(tmp_path / "job_queue.json"))
+    first = queue.add("SIM::A::INSTR", "Activation", {})
+    second = queue.add("SIM::A::INSTR", "Polarization", {})
+    assert queue.move(second['id'], -1)
+    assert queue.jobs == [second, first]
+    assert not queue.move(second['id'], -1)
+    queue.mark_started(second, "out")
+    # A running job can be neither moved nor removed
+    assert not queue.move(second['id'], 1)
+    assert not queue.remove(second['id'])
+    assert not queue.retry(second['id'])
+    queue.mark_finished(second, FAILED)
+    assert queue.retry(second['id'])
+    assert second['status'] == PENDING and second['started'] is None
+    assert queue.remove(first['id'])
+    assert queue.jobs == [second]
+
+
+def test_clear_finished_keeps_pending_and_running(tmp_path):
+    queue = JobQueue(str(tmp_path / "job_queue.json"))
+    done = queue.add("SIM::A::INSTR", "Activation", {})
+    running = queue.add("SIM::B::INSTR", "Activation", {})
+    pending = queue.add("SIM::A::INSTR", "Stability", {})
+    queue.mark_finished(done, DONE)
+    queue.mark_started(running, "out")
+    queue.clear_finished()
+    assert [job['status'] for job in queue.jobs] == [RUNNING, PENDING]
+    assert queue.jobs == [running, pending]
@@ -0,0 +1,161 @@
+import csv
+import os
+
+import numpy as np
+import pytest
+
+from data_store import last_csv_row
+from instrument import SimulatedSupply
+from journal import JOURNAL_NAME, RunJournal, find_resumable, keep_interrupted_journal, load_journal
+from protocol import ProtocolEngine, stability_protocol
+from sample_buffer import FLAG_MONITOR
+
+
+def monitor_journal(path, samples=3, end=False):
+    protocol = stability_protocol(1.0, 1.0, 3.0)
+    journal = RunJournal(path)
+    journal.event('start', protocol=protocol, resource="SIM::CELL::INSTR", output_folder="out")
+    journal.event('step', index=0, type='output')
+    journal.event('step', index=1, type='monitor')
+    journal.event('monitor_start', t=0.5)
+    for i in range(samples):
+        journal.sample(0.5 + i, 1.0, 1.6 + i / 100, None, FLAG_MONITOR, 0.999)
+    if end:
+        journal.event('end', reason='stopped', samples=samples)
+    journal.close()
+    return protocol
+
+
+def test_journal_round_trip(tmp_path):
+    path = str(tmp_path / JOURNAL_NAME)
+    protocol = monitor_journal(path)
+    state = load_journal(path)
+    assert state.protocol == protocol
+    assert state.resource_name == "SIM::CELL::INSTR"
+    assert state.step_index == 1
+    assert state.monitor_start == 0.5
+    assert state.sample_count == 3
+    np.testing.assert_array_equal(state.samples['time'], [0.5, 1.5, 2.5])
+    np.testing.assert_array_equal(state.samples['voltage'], [1.6, 1.61, 1.62])
+    assert np.all(np.isnan(state.samples['dwell']))
+    np.testing.assert_array_equal(state.samples['measured_current'], [0.999] * 3)
+    assert state.last_time() == 2.5
+    assert state.resumable()
+
+
+def test_torn_last_line_and_old_sample_lines(tmp_path):
+    path = str(tmp_path / JOURNAL_NAME)
+    monitor_journal(path, samples=2)
+    with open(path, 'a', encoding='utf-8') as f:
+        # written before the measured current was journaled
+        f.write("2.5,1.0,1.62,nan,4,1700000000.000\n")
+        f.write("3.5,1.0,1.6")  # the crash came mid-line
+    state = load_journal(path)
+    assert state.sample_count == 3
+    assert state.samples['time'][-1] == 2.5
+    assert np.isnan(state.samples['measured_current'][-1])
+
+
+def test_only_interrupted_monitoring_is_resumable(tmp_path):
+    finished = str(tmp_path / "finished.journal")
+    monitor_journal(finished, end=True)
+    assert not load_journal(finished).resumable()
+    sweep = str(tmp_path / "sweep.journal")
+    journal = RunJournal(sweep)
+    journal.event('start', protocol={'voltage_limit': 2.0, 'steps': [{'type': 'sweep', 'step': 1.0}]})
+    journal.event('step', index=0, type='sweep')
+    journal.close()
+    assert not load_journal(sweep).resumable()
+    assert find_resumable(str(tmp_path)) is None
+    monitor_journal(str(tmp_path / JOURNAL_NAME))
+    assert find_resumable(str(tmp_path)).step_index == 1
+
+
+def test_not_a_journal(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("hello\n")
+    with pytest.raises(ValueError):
+        load_journal(str(path))
+
+
+def test_interrupted_journal_is_kept(tmp_path):
+    path = str(tmp_path / JOURNAL_NAME)
+    monitor_journal(path)
+    kept = keep_interrupted_journal(path)
+    assert kept.startswith(path + ".")
+    assert not os.path.exists(path)
+    assert load_journal(kept).sample_count == 3
+    # A finished run's journal may simply be overwritten
+    monitor_journal(path, end=True)
+    assert keep_interrupted_journal(path) is None
+    assert os.path.exists(path)
+
+
+def test_last_csv_row_cuts_a_torn_line(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_bytes(b"Time (s),Voltage (V)\n1.0,1.6\n2.0,1.7\n3.0,1.")
+    assert last_csv_row(str(path)) == ['2.0', '1.7']
+    assert path.read_bytes().endswith(b"2.0,1.7\n")
+    assert last_csv_row(str(tmp_path / "missing.csv")) is None
+
+
+def read_monitor_csv(path):
+    with open(path, newline='') as f:
+        rows = list(csv.reader(f))
+    return rows[0], np.array([[float(value) for value in row] for row in rows[1:]])
+
+
+def test_stability_run_resumes_after_a_crash(tmp_path, supply):
+    folder = str(tmp_path)
+    journal_path = os.path.join(folder, JOURNAL_NAME)
+    protocol = stability_protocol(0.01, 1.0, 3.0, duration=0.4)
+    points = []
+
+    def stop_after_ten(x, y):
+        points.append(y)
+        if len(points) == 10:
+            engine.stop()
+
+    engine = ProtocolEngine(supply, protocol, folder, log=lambda message: None, publish_point=stop_after_ten,
+                            journal_path=journal_path)
+    engine.run()
+    engine.wait_for_exports()
+    assert len(engine.samples) == 10
+
+    # A crash: the journal never got its end line, and the last rows and a
+    # torn line are all that reached the CSV file
+    with open(journal_path, encoding='utf-8') as f:
+        lines = f.readlines()
+    assert '"end"' in lines[-1]
+    with open(journal_path, 'w', encoding='utf-8') as f:
+        f.writelines(lines[:-1])
+    csv_path = os.path.join(folder, "stability_output.csv")
+    with open(csv_path, encoding='utf-8') as f:
+        rows = f.readlines()
+    with open(csv_path, 'w', encoding='utf-8') as f:
+        f.writelines(rows[:-3])
+        f.write(rows[-3][:5])
+
+    state = find_resumable(folder)
+    assert state is not None and state.sample_count == 10
+    messages = []
+    resumed = ProtocolEngine(SimulatedSupply(latency=0.0, noise=0.0, time_constant=0.0), state.protocol, folder,
+                             log=messages.append, journal_path=journal_path, resume=state)
+    resumed.run()
+    resumed.wait_for_exports()
+    assert resumed.error is None
+    assert any("3 journaled samples added" in message for message in messages)
+
+    times = resumed.samples.time
+    assert len(times) > 10
+    np.testing.assert_array_equal(times[:10], engine.samples.time)
+    assert np.all(np.diff(times) > 0)
+    final = load_journal(journal_path)
+    assert final.finished and final.end['reason'] == 'completed'
+    assert final.sample_count == len(times)
+    header, data = read_monitor_csv(csv_path)
+    assert header == ['Time (s)', 'Voltage (V)', 'Measured Current (A)', 'Jitter (ms)']
+    # Every sample is in the CSV file exactly once, in order
+    np.testing.assert_array_equal(data[:, 0], times)
+    np.testing.assert_allclose(data[:, 1], resumed.samples.voltage)
+    np.testing.assert_allclose(data[:, 2], 1.0)
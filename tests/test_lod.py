@@ -0,0 +1,99 @@
+import numpy as np
+
+from lod import MinMaxPyramid
+from sample_buffer import SampleBuffer
+
+
+def signal(n, seed=0):
+    rng = np.random.default_rng(seed)
+    x = np.arange(n, dtype=float) * 0.5
+    y = np.sin(x / 50) + rng.normal(0, 0.1, n)
+    return x, y
+
+
+def test_small_range_returns_raw_points():
+    x, y = signal(100)
+    pyramid = MinMaxPyramid()
+    pyramid.extend(x, y)
+    qx, qy = pyramid.query(max_points=1000)
+    np.testing.assert_array_equal(qx, x)
+    np.testing.assert_array_equal(qy, y)
+
+
+def test_empty_pyramid():
+    qx, qy = MinMaxPyramid().query()
+    assert len(qx) == len(qy) == 0
+
+
+def test_decimated_query_keeps_envelope_and_end_points():
+    x, y = signal(100000)
+    pyramid = MinMaxPyramid()
+    pyramid.extend(x, y)
+    qx, qy = pyramid.query(max_points=2000)
+    assert len(qx) <= 2 * 2000
+    assert qx[0] == x[0] and qx[-1] == x[-1]
+    assert np.all(np.diff(qx) >= 0)
+    assert qy.min() == y.min() and qy.max() == y.max()
+    # Every vertex is a raw point
+    index = np.searchsorted(x, qx)
+    np.testing.assert_array_equal(y[index], qy)
+
+
+def test_range_query_keeps_envelope_of_range():
+    x, y = signal(50000, seed=1)
+    pyramid = MinMaxPyramid()
+    pyramid.extend(x, y)
+    qx, qy = pyramid.query(5000.3, 15000.7, max_points=500)
+    inside = (x >= 5000.3) & (x <= 15000.7)
+    assert len(qx) <= 2 * 500
+    # One point on either side of the range keeps the line going to the edge
+    assert qx[0] <= 5000.3 and qx[-1] >= 15000.7
+    assert qy.min() <= y[inside].min() and qy.max() >= y[inside].max()
+
+
+def test_incremental_extend_matches_one_shot():
+    x, y = signal(10007, seed=2)
+    whole = MinMaxPyramid()
+    whole.extend(x, y)
+    pieces = MinMaxPyramid()
+    for start in range(0, len(x), 333):
+        pieces.extend(x[start:start + 333], y[start:start + 333])
+    pieces.append(10007 * 0.5, 0.0)
+    whole.append(10007 * 0.5, 0.0)
+    for budget in (100, 1000, 20000):
+        for a, b in zip(whole.query(max_points=budget), pieces.query(max_points=budget)):
+            np.testing.assert_array_equal(a, b)
+
+
+def test_sample_buffer_source_is_read_on_sync():
+    buffer = SampleBuffer()
+    pyramid = MinMaxPyramid(source=buffer)
+    x, y = signal(5000, seed=3)
+    for t, v in zip(x[:3000], y[:3000]):
+        buffer.append(t, 1.0, v)
+    # Rows appended since the last sync are not seen yet
+    assert len(pyramid) == 0
+    pyramid.sync()
+    assert len(pyramid) == 3000
+    for t, v in zip(x[3000:], y[3000:]):
+        buffer.append(t, 1.0, v)
+    pyramid.sync()
+    reference = MinMaxPyramid()
+    reference.extend(x, y)
+    for a, b in zip(reference.query(max_points=300), pyramid.query(max_points=300)):
+        np.testing.assert_array_equal(a, b)
+
+
+def test_cleared_source_starts_over():
+    buffer = SampleBuffer()
+    pyramid = MinMaxPyramid(source=buffer)
+    for i in range(100):
+        buffer.append(i, 1.0, 5.0)
+    pyramid.sync()
+    buffer.clear()
+    for i in range(10):
+        buffer.append(i, 1.0, 1.0)
+    pyramid.sync()
+    qx, qy = pyramid.query()
+    assert len(qx) == 10
+    assert np.all(qy == 1.0)
@@ -0,0 +1,93 @@
+import pytest
+
+from scheduler import DeadlineScheduler
+
+
+class FakeClock:
+    def __init__(self, oversleep=0.0):
+        self.now = 1000.0
+        self.oversleep = oversleep
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds + self.oversleep
+
+
+def test_work_does_not_add_to_the_period():
+    clock = FakeClock()
+    scheduler = DeadlineScheduler(1.0, clock=clock)
+    start = scheduler.start()
+    for k in range(1, 11):
+        clock.now += 0.3  # reading, saving, logging
+        assert scheduler.wait(clock.sleep) == k
+        assert clock.now == pytest.approx(start + k)
+    assert clock.sleeps == pytest.approx([0.7] * 10)
+    assert scheduler.stats()['late'] == 0
+
+
+def test_fractional_interval_does_not_drift():
+    clock = FakeClock()
+    scheduler = DeadlineScheduler(0.1, clock=clock)
+    start = scheduler.start()
+    for _ in range(10000):
+        clock.now += 0.013
+        offset = scheduler.wait(clock.sleep)
+    assert offset == pytest.approx(1000.0)
+    assert clock.now - start == pytest.approx(1000.0, abs=1e-9)
+
+
+def test_missed_deadlines_are_skipped_not_bunched():
+    clock = FakeClock()
+    scheduler = DeadlineScheduler(1.0, clock=clock)
+    scheduler.start()
+    clock.now += 3.5  # a stall spanning three deadlines
+    assert scheduler.wait(clock.sleep) == 3.0
+    assert clock.sleeps == []
+    assert scheduler.skipped == 2
+    assert scheduler.late == 1
+    assert scheduler.last_jitter == pytest.approx(0.5)
+    # Back on the grid from the next deadline on
+    assert scheduler.wait(clock.sleep) == 4.0
+    assert clock.now == pytest.approx(1004.0)
+
+
+def test_jitter_statistics():
+    clock = FakeClock(oversleep=0.002)
+    scheduler = DeadlineScheduler(0.5, clock=clock)
+    scheduler.start()
+    for _ in range(20):
+        scheduler.wait(clock.sleep)
+    stats = scheduler.stats()
+    assert stats['samples'] == 20
+    assert stats['mean_jitter'] == pytest.approx(0.002)
+    assert stats['std_jitter'] == pytest.approx(0.0, abs=1e-6)
+    assert stats['max_jitter'] == pytest.approx(0.002)
+    assert stats['late'] == 0 and stats['skipped'] == 0
+    assert "jitter mean 2.0 ms" in scheduler.summary()
+
+
+def test_late_wake_up_counts_as_late():
+    clock = FakeClock(oversleep=0.2)
+    scheduler = DeadlineScheduler(1.0, clock=clock)
+    scheduler.start()
+    scheduler.wait(clock.sleep)
+    assert scheduler.late == 1
+
+
+def test_zero_interval_samples_back_to_back():
+    clock = FakeClock()
+    scheduler = DeadlineScheduler(0, clock=clock)
+    scheduler.start()
+    clock.now += 0.25
+    assert scheduler.wait(clock.sleep) == pytest.approx(0.25)
+    assert scheduler.next_offset() == pytest.approx(0.25)
+    assert clock.sleeps == []
+
+
+def test_negative_interval_is_rejected():
+    with pytest.raises(ValueError):
+        DeadlineScheduler(-1)
@@ -0,0 +1,119 @@
+import json
+
+import pytest
+
+from scpi import MEASURE_MESSAGE, InstrumentIO, LatencyHistogram, command_key
+
+
+class SingleCommandSupply:
+    # A supply that does not accept ';'-joined commands
+    def __init__(self, supply):
+        self.supply = supply
+        self.messages = []
+
+    def write(self, command):
+        self.messages.append(command)
+        if ';' in command:
+            raise ValueError("-113,Undefined header")
+        return self.supply.write(command)
+
+    def query(self, command):
+        self.messages.append(command)
+        if ';' in command:
+            raise TimeoutError("VI_ERROR_TMO")
+        return self.supply.query(command)
+
+
+class FirstAnswerSupply(SingleCommandSupply):
+    # Executes a combined message but only answers its first query
+    def query(self, command):
+        self.messages.append(command)
+        return self.supply.query(command).split(';')[0] + "\n"
+
+
+def test_command_key():
+    assert command_key('CURR 1.5') == 'CURR'
+    assert command_key('CURR 1.5;:MEAS:VOLT?') == 'CURR;MEAS:VOLT?'
+    assert command_key(' :output on ') == 'OUTPUT'
+    assert command_key(MEASURE_MESSAGE) == 'MEASURE:VOLTAGE?;MEASURE:CURRENT?'
+
+
+def test_transaction_is_one_round_trip(supply):
+    io = InstrumentIO(supply)
+    assert io.transaction(['OUTPut ON', 'CURR 2.0', 'MEASure:CURRent?', 'CURRent?']) == ['2.0000', '2.0000']
+    assert io.round_trips == 1
+    assert list(io.latency) == ['OUTPUT;CURR;MEASURE:CURRENT?;CURRENT?']
+
+
+def test_set_and_measure_reads_voltage_and_current(supply):
+    io = InstrumentIO(supply)
+    io.write('OUTPut ON')
+    voltage, current = io.set_and_measure(1.5)
+    assert current == 1.5
+    assert voltage > 1.23
+    assert io.measure()[1] == 1.5
+    assert io.round_trips == 3
+
+
+def test_probe_turns_pipelining_off(supply):
+    session = SingleCommandSupply(supply)
+    messages = []
+    io = InstrumentIO(session, log=messages.append)
+    assert not io.check_pipelining()
+    assert not io.pipelining
+    assert "not supported" in messages[0]
+    session.messages.clear()
+    io.write('OUTPut ON')
+    voltage, current = io.set_and_measure(1.0)
+    assert current == 1.0
+    assert session.messages == ['OUTPut ON', 'CURR 1.0', 'MEASure:VOLTage?', 'MEASure:CURRent?']
+
+
+def test_probe_keeps_pipelining_on_a_capable_supply(supply):
+    io = InstrumentIO(supply)
+    assert io.check_pipelining()
+    assert io.pipelining
+
+
+def test_failed_combined_message_is_resent_one_by_one(supply):
+    session = SingleCommandSupply(supply)
+    io = InstrumentIO(session, log=lambda message: None)
+    io.write('OUTPut ON')
+    assert io.set_and_measure(2.0)[1] == 2.0
+    assert not io.pipelining
+    assert session.messages[1:] == ['CURR 2.0;:MEASure:VOLTage?;:MEASure:CURRent?', 'CURR 2.0', 'MEASure:VOLTage?',
+                                    'MEASure:CURRent?']
+
+
+def test_missing_responses_turn_pipelining_off(supply):
+    session = FirstAnswerSupply(supply)
+    io = InstrumentIO(session, log=lambda message: None)
+    io.write('OUTPut ON')
+    voltage, current = io.set_and_measure(3.0)
+    assert current == 3.0
+    assert not io.pipelining
+
+
+def test_latency_histogram():
+    histogram = LatencyHistogram()
+    for ms in (1, 1, 1, 2, 2, 3, 5, 8, 13, 100):
+        histogram.add(ms / 1000)
+    assert histogram.count == 10
+    assert histogram.mean == pytest.approx(0.0136)
+    assert 0.001 <= histogram.percentile(50) <= 0.003
+    assert histogram.percentile(100) == pytest.approx(0.1)
+    assert histogram.percentile(0) >= 0.001
+    assert LatencyHistogram().percentile(99) == 0.0
+
+
+def test_latencies_are_saved(tmp_path, supply):
+    io = InstrumentIO(supply)
+    io.measure()
+    io.measure()
+    path = tmp_path / "scpi_latency.json"
+    io.save(str(path))
+    saved = json.loads(path.read_text())
+    assert saved['round_trips'] == 2 and saved['pipelining']
+    commands = saved['commands']['MEASURE:VOLTAGE?;MEASURE:CURRENT?']
+    assert commands['count'] == 2
+    assert sum(commands['bin_counts']) == 2
@@ -0,0 +1,93 @@
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from shared_ring import SharedSampleRing
+
+
+@pytest.fixture
+def ring():
+    ring = SharedSampleRing(capacity=8)
+    yield ring
+    ring.close()
+
+
+def write(ring, first, count):
+    for i in range(first, first + count):
+        ring.append(float(i), i / 10, 1.5 + i / 1000, i % 2 or None, i % 4, i / 10 - 0.001)
+
+
+def writer_process(name, capacity, count):
+    ring = SharedSampleRing(name, capacity)
+    write(ring, 0, count)
+    ring.close()
+
+
+def test_rows_are_read_after_the_cursor(ring):
+    writer = SharedSampleRing(ring.name, ring.capacity)
+    write(writer, 0, 5)
+    rows, cursor = ring.read(0)
+    assert cursor == 5
+    np.testing.assert_array_equal(rows['time'], np.arange(5))
+    np.testing.assert_allclose(rows['current'], np.arange(5) / 10)
+    np.testing.assert_allclose(rows['measured_current'], np.arange(5) / 10 - 0.001)
+    assert np.isnan(rows['dwell'][0]) and rows['dwell'][1] == 1
+    assert rows['flags'].dtype == np.uint8
+    rows, cursor = ring.read(cursor)
+    assert cursor == 5 and len(rows['time']) == 0
+    writer.close()
+
+
+def test_reads_across_the_wraparound(ring):
+    writer = SharedSampleRing(ring.name, ring.capacity)
+    write(writer, 0, 6)
+    _, cursor = ring.read(0)
+    write(writer, 6, 7)  # rows 8 to 12 overwrite the start of the ring
+    rows, cursor = ring.read(cursor)
+    assert cursor == 13
+    np.testing.assert_array_equal(rows['time'], np.arange(6, 13))
+    np.testing.assert_allclose(rows['voltage'], 1.5 + np.arange(6, 13) / 1000)
+    assert ring.dropped == 0
+    writer.close()
+
+
+def test_a_reader_a_full_ring_behind_drops_the_oldest_rows(ring):
+    writer = SharedSampleRing(ring.name, ring.capacity)
+    write(writer, 0, 3)
+    _, cursor = ring.read(0)
+    write(writer, 3, 17)
+    rows, cursor = ring.read(cursor)
+    assert cursor == 20
+    # Row 12 shares its slot with the row the writer would fill next, so a
+    # reader cannot trust it either
+    np.testing.assert_array_equal(rows['time'], np.arange(13, 20))
+    assert ring.dropped == 10
+    writer.close()
+
+
+def test_reader_cannot_write(ring):
+    with pytest.raises(ValueError):
+        ring.append(0.0, 1.0, 1.5)
+
+
+def test_writer_in_another_process():
+    ring = SharedSampleRing(capacity=256)
+    count = 20000
+    process = multiprocessing.get_context('spawn').Process(target=writer_process, args=(ring.name, 256, count))
+    process.start()
+    received = []
+    cursor = 0
+    while process.is_alive() or cursor < count:
+        rows, cursor = ring.read(cursor)
+        received.append(rows['time'])
+        if not process.is_alive() and process.exitcode != 0:
+            break
+    process.join()
+    assert process.exitcode == 0
+    times = np.concatenate(received)
+    # Whatever the reader missed is counted, and nothing arrives torn or twice
+    assert len(times) + ring.dropped == count
+    assert np.all(np.diff(times) > 0)
+    assert times[-1] == count - 1
+    ring.close()
@@ -0,0 +1,22 @@
+import time
+from PyQt5.QtCore import QThread, pyqtSignal
+from instrument import list_devices, save_cached_devices
+
+class DeviceDiscoveryWorker(QThread):
+    # Scans for VISA resources off the GUI thread. Creating the resource
+    # manager and listing a busy USB/GPIB bus can take several seconds.
+    devices_found = pyqtSignal(list)
+
+    def __init__(self):
+        super().__init__()
+        self.duration = None
+
+    def run(self):
+        start = time.perf_counter()
+        devices = list_devices()
+        self.duration = time.perf_counter() - start
+        try:
+            save_cached_devices(devices)
+        except OSError:
+            pass
+        self.devices_found.emit(devices)
@@ -0,0 +1,29 @@
+import os
+from protocol import UNATTENDED_STABILIZATION
+from worker.activation_worker import ActivationWorker
+from worker.measurement_worker import MeasurementWorker
+from worker.stability_worker import StabilityWorker
+
+RUN_TYPES = ('Activation', 'Polarization', 'Stability')
+
+
+def create_worker(kind, resource_name, params, output_folder):
+    # Builds a worker from a plain parameter dict, with the same defaults as
+    # the single-run pages. Used by pages that start runs without their own
+    # form, e.g. the multi-channel page.
+    os.makedirs(output_folder, exist_ok=True)
+    voltage_limit = params.get('voltage_limit', 1.95)
+    stabilization = params.get('stabilization', UNATTENDED_STABILIZATION)
+    if kind == 'Activation':
+        return ActivationWorker(resource_name, params.get('activation_time', 60), voltage_limit,
+                                params.get('num_cycles', 30), params.get('interval_time', 60), output_folder,
+                                stabilization, params.get('dwell'), params.get('adaptive_grid'))
+    if kind == 'Polarization':
+        return MeasurementWorker(resource_name, params.get('activation_time', 60), voltage_limit,
+                                 params.get('interval_time', 20), params.get('current_start', 0.0),
+                                 params.get('current_step', 0.25), params.get('current_list'),
+                                 stabilization, params.get('dwell'), params.get('adaptive_grid'), output_folder)
+    if kind == 'Stability':
+        return StabilityWorker(resource_name, params.get('interval_time', 60), params.get('input_current', 1.0),
+                               voltage_limit, output_folder)
+    raise ValueError(f"Unknown run type '{kind}'")
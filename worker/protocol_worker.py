@@ -0,0 +1,13 @@
+from worker.worker import BaseWorker
+
+class ProtocolWorker(BaseWorker):
+    # Runs any protocol dict, e.g. one loaded from a recipe file
+    def __init__(self, resource_name, protocol, output_folder="."):
+        super().__init__(protocol.get('stabilization'), protocol.get('dwell'))
+        self.resource_name = resource_name
+        self.protocol = protocol
+        self.voltage_limit = protocol['voltage_limit']
+        self.output_folder = output_folder
+
+    def build_protocol(self):
+        return self.protocol
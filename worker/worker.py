@@ -0,0 +1,225 @@
+import queue
+import weakref
+import numpy as np
+from PyQt5.QtCore import QThread, QTimer, pyqtSignal
+from signal_batcher import SampleBatcher
+from protocol import ProtocolEngine
+from sample_buffer import SampleBuffer, FLAG_MONITOR
+from instrument import SIMULATOR_SETTINGS, get_pool
+from acquisition_process import acquisition_process, stop_acquisition_process
+
+class BaseWorker(QThread):
+    # Runs a protocol (see protocol.py) on the selected device. Subclasses
+    # describe their run in build_protocol(); the engine does the stepping,
+    # timing, voltage limit and saving for all of them.
+    # Samples and log lines are buffered by the acquisition thread and handed
+    # to the GUI in batches at REFRESH_HZ, so a fast run cannot flood the
+    # event queue with one redraw per sample.
+    # With separate_process the engine runs in the acquisition process of
+    # the instrument (acquisition_process.py) and this thread only relays:
+    # samples from the shared-memory ring into self.samples, log lines and
+    # prompts from the event queue. Nothing the GUI does can then delay a
+    # reading.
+    log_signal = pyqtSignal(list)
+    plot_signal = pyqtSignal(object, object)
+    finished_signal = pyqtSignal()
+    request_user_input = pyqtSignal()
+    stabilized_signal = pyqtSignal()
+
+    REFRESH_HZ = 20
+    separate_process = True
+    active = weakref.WeakSet()  # workers whose thread is running
+
+    def __init__(self, stabilization=None, dwell=None, watchdog_rate=10.0):
+        super().__init__()
+        self.running = True
+        self.watchdog_rate = watchdog_rate  # Hz, voltage limit sampling while waiting
+        self.engine = None
+        self.acquisition = None  # AcquisitionRun while the run is in the acquisition process
+        self.run_status = None  # RunStatus reported by that process
+        # Why the run failed, None if it completed, was stopped or hit the
+        # voltage limit; set when the thread finishes
+        self.error = None
+        # None waits for the operator; a dict of StabilizationDetector
+        # settings plus 'timeout' and optionally 'sample_period' (default a
+        # tenth of the window) detects it automatically
+        self.stabilization = stabilization
+        # None dwells the fixed interval at every step; a dict of
+        # StabilizationDetector settings plus 'min_dwell' and 'sample_period'
+        # advances as soon as the step has settled (interval is the maximum)
+        self.dwell = dwell
+        self.output_folder = "."
+        # Write-ahead journal of the run (journal.py), None for no journal;
+        # resume is a JournalState to continue instead of starting over
+        self.journal_path = None
+        self.resume = None
+        # Written by the engine, read live by pages and plots as array views
+        self.samples = SampleBuffer()
+        self.batcher = SampleBatcher()
+        # Created in the GUI thread, so the timer fires there
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setInterval(int(1000 / self.REFRESH_HZ))
+        self._refresh_timer.timeout.connect(self.flush_updates)
+        self.finished.connect(self._on_thread_finished)
+
+    def start(self, *args):
+        BaseWorker.active.add(self)
+        self._refresh_timer.start()
+        super().start(*args)
+
+    @classmethod
+    def stop_all(cls, timeout=60000):
+        # Stops every running worker and waits (ms) for each to switch its
+        # supply off and save, e.g. before the application exits
+        workers = list(cls.active)
+        for worker in workers:
+            worker.stop()
+        for worker in workers:
+            worker.wait(timeout)
+
+    def stop(self):
+        self.running = False
+        if self.engine is not None:
+            self.engine.stop()
+        if self.acquisition is not None:
+            self.acquisition.send('stop')
+
+    def confirm_stabilization(self):
+        # Operator pressed OK: continue without waiting any longer
+        if self.engine is not None:
+            self.engine.confirm()
+        if self.acquisition is not None:
+            self.acquisition.send('confirm')
+
+    def set_voltage_limit(self, voltage_limit):
+        if self.engine is not None:
+            self.engine.set_voltage_limit(voltage_limit)
+        if self.acquisition is not None:
+            self.acquisition.send('voltage_limit', voltage_limit)
+
+    @property
+    def watchdog(self):
+        # Only .tripped and .trip_voltage are meant for callers
+        if self.engine is not None:
+            return self.engine.watchdog
+        return self.run_status
+
+    def log(self, message):
+        if self.isFinished():
+            # e.g. a background export reporting after the run has ended
+            self.log_signal.emit([message])
+        else:
+            self.batcher.push_log(message)
+
+    def publish_point(self, x, y):
+        self.batcher.push_point(x, y)
+
+    @property
+    def owner_name(self):
+        return type(self).__name__
+
+    def open_session(self):
+        # Sessions come from the shared pool and stay open after the run; the
+        # device is reserved for this worker until the thread finishes. An
+        # acquisition process holding the device open lets go of it first.
+        stop_acquisition_process(self.resource_name)
+        return get_pool().acquire(self.resource_name, self)
+
+    def build_protocol(self):
+        raise NotImplementedError
+
+    def run(self):
+        if self.separate_process:
+            self.run_in_process()
+            return
+        try:
+            pwr = self.open_session()
+            self.engine = ProtocolEngine(pwr, self.build_protocol(), self.output_folder, self.log,
+                                         self.publish_point, self.request_user_input.emit,
+                                         self.stabilized_signal.emit, self.watchdog_rate, self.samples,
+                                         self.journal_path, self.resume, self.resource_name)
+            # stop() may have been called before the engine existed
+            self.engine.running = self.running
+            self.engine.run()
+            self.error = self.engine.error
+        except Exception as e:
+            self.error = e
+            self.log(f"Error: {e}")
+
+    def run_in_process(self):
+        try:
+            get_pool().reserve(self.resource_name, self)
+            process = acquisition_process(self.resource_name, simulator=dict(SIMULATOR_SETTINGS))
+            acquisition = process.start_run(self.build_protocol(), self.output_folder,
+                                            watchdog_rate=self.watchdog_rate, journal_path=self.journal_path,
+                                            resume=self.resume)
+        except Exception as e:
+            self.error = e
+            self.log(f"Error: {e}")
+            return
+        self.acquisition = acquisition
+        if not self.running:
+            acquisition.send('stop')
+        cursor = 0
+        try:
+            while self.run_status is None:
+                try:
+                    event = acquisition.events.get(timeout=1.0 / self.REFRESH_HZ)
+                except queue.Empty:
+                    event = None
+                    if not acquisition.process.is_alive():
+                        self.error = f"acquisition process exited with code {acquisition.process.exitcode}"
+                        self.log(f"Error: {self.error}")
+                        break
+                # Samples first, so they are in place before e.g. 'finished'
+                cursor = self._read_ring(cursor)
+                while event is not None:
+                    self._handle_event(event)
+                    try:
+                        event = acquisition.events.get_nowait()
+                    except queue.Empty:
+                        event = None
+            cursor = self._read_ring(cursor)
+            if acquisition.ring.dropped:
+                self.log(f"{acquisition.ring.dropped} samples were overwritten in the ring before the GUI read them")
+        finally:
+            acquisition.close()
+
+    def _read_ring(self, cursor):
+        rows, cursor = self.acquisition.ring.read(cursor)
+        if len(rows['time']):
+            self.samples.extend(rows['time'], rows['current'], rows['voltage'], rows['dwell'], rows['flags'],
+                                rows['measured_current'])
+            # The engine plots voltage over time while monitoring, over current otherwise
+            xs = np.where(rows['flags'] & FLAG_MONITOR, rows['time'], rows['current'])
+            for x, y in zip(xs, rows['voltage']):
+                self.publish_point(x, y)
+        return cursor
+
+    def _handle_event(self, event):
+        kind = event[0]
+        if kind == 'log':
+            self.log(event[1])
+        elif kind == 'request_confirmation':
+            self.request_user_input.emit()
+        elif kind == 'stabilized':
+            self.stabilized_signal.emit()
+        elif kind == 'finished':
+            self.run_status = event[1]
+            self.error = self.run_status.error
+
+    def flush_updates(self):
+        xs, ys, lines = self.batcher.drain()
+        if lines:
+            self.log_signal.emit(lines)
+        if len(xs):
+            self.plot_signal.emit(xs, ys)
+
+    def _on_thread_finished(self):
+        # Deliver whatever is still buffered before announcing the end of the run
+        self._refresh_timer.stop()
+        BaseWorker.active.discard(self)
+        get_pool().release(self.resource_name, self)
+        self.batcher.push_log(self.batcher.summary())
+        self.flush_updates()
+        self.finished_signal.emit()